@@ -0,0 +1,203 @@
+from __future__ import annotations
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import timeit
+from typing import Callable, Optional
+
+from zettel.id import Id, unique
+
+# Each benchmark gets the size to use for bulk operations and returns the function to time and the number of
+# operations one call of it performs, so results are comparable as seconds per operation.
+Benchmark = Callable[[int], tuple[Callable[[], object], int]]
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str):
+    def register(f: Benchmark) -> Benchmark:
+        BENCHMARKS[name] = f
+        return f
+    return register
+
+
+def luhmann_ids(n: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    values = []
+    for _ in range(n):
+        parts = []
+        is_num = True
+        for _ in range(rng.randint(1, 6)):
+            if is_num:
+                parts.append(str(rng.randint(1, 99)))
+            else:
+                parts.append(rng.choice("abcdefghijkZ") * rng.randint(1, 2))
+            is_num = not is_num
+        values.append(''.join(parts))
+    return values
+
+
+def _parse(value: str) -> Benchmark:
+    def setup(size: int):
+        return lambda: Id(value), 1
+    return setup
+
+
+benchmark("parse.short")(_parse("21a"))
+benchmark("parse.deep")(_parse("1a2b3c4d5e6f7g8h9i10j11k"))
+benchmark("parse.separators")(_parse("1.2/3-4\\5..6//7-.8"))
+benchmark("parse.structure")(_parse("202001020304"))
+
+
+@benchmark("parse.per_object")
+def _parse_per_object(size: int):
+    values = luhmann_ids(size // 10)
+    return lambda: [Id(v) for v in values], len(values)
+
+
+@benchmark("parse.parse_many")
+def _parse_many(size: int):
+    values = luhmann_ids(size // 10)
+    return lambda: Id.parse_many(values), len(values)
+
+
+def _next(value: str) -> Benchmark:
+    def setup(size: int):
+        i = Id(value)
+        return i.next, 1
+    return setup
+
+
+benchmark("next.luhmann")(_next("21a3"))
+benchmark("next.structure")(_next("202001020304"))
+benchmark("next.structure_end_of_year")(_next("202012312359"))
+
+
+def _next_n(value: str) -> Benchmark:
+    def setup(size: int):
+        i = Id(value)
+        return lambda: list(i.next_n(size).values()), size
+    return setup
+
+
+benchmark("next_n.luhmann")(_next_n("21a3"))
+benchmark("next_n.structure")(_next_n("202012312359"))
+
+
+def _part_next(value: str) -> Benchmark:
+    def setup(size: int):
+        part = Id(value).parts[-1]
+        return part.next, 1
+    return setup
+
+
+benchmark("part_next.no_rollover")(_part_next("21a3"))
+benchmark("part_next.digit_rollover")(_part_next("21a999"))
+benchmark("part_next.partial_rollover")(_part_next("21a1999"))
+benchmark("part_next.letter_rollover")(_part_next("21ZZZ"))
+
+
+@benchmark("compare")
+def _compare(size: int):
+    left = Id("21a3b")
+    right = Id("21a3c")
+    return lambda: left.compare(right), 1
+
+
+@benchmark("sort")
+def _sort(size: int):
+    ids = [Id(v) for v in luhmann_ids(size)]
+    return lambda: sorted(ids), len(ids)
+
+
+@benchmark("sort.key")
+def _sort_key(size: int):
+    ids = [Id(v) for v in luhmann_ids(size)]
+    return lambda: sorted(ids, key=Id.sort_key), len(ids)
+
+
+@benchmark("unique")
+def _unique(size: int):
+    ids = [Id(v) for v in luhmann_ids(size)] * 2
+    return lambda: unique(ids), len(ids)
+
+
+@benchmark("parent.chain")
+def _parent_chain(size: int):
+    deep = Id("1a2b3c4d5e6f7g8h9i10j11k")
+
+    def chain():
+        i = deep
+        while i.has_parent:
+            i = i.parent()
+    return chain, 1
+
+
+@benchmark("from_filename")
+def _from_filename(size: int):
+    return lambda: Id.from_filename("202001020304 A note about something.md"), 1
+
+
+def run(name: str, size: int, repeat: int) -> dict:
+    f, ops = BENCHMARKS[name](size)
+    timer = timeit.Timer(f)
+    loops, _ = timer.autorange()
+    times = [t / loops / ops for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        'min': min(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'loops': loops,
+        'ops': ops,
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    # Compares best times, which are the least sensitive to noise from the rest of the machine.
+    slower = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is not None and result['min'] > before['min'] * (1 + threshold):
+            slower.append(name)
+    return slower
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks for the zettel.id hot paths")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('-b', '--baseline', help="JSON file from an earlier run to compare against")
+    parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                        help="relative slowdown against the baseline that counts as a regression (default 0.1)")
+    parser.add_argument('-k', '--filter', default='', help="only run benchmarks whose name contains this")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timing runs per benchmark (default 5)")
+    parser.add_argument('-n', '--size', type=int, default=1_000_000,
+                        help="number of ids for the sort benchmark; parsing in bulk uses a tenth (default 1000000)")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    for name in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        result = results[name] = run(name, args.size, args.repeat)
+        line = f"{name:32} {result['min'] * 1e6:12.3f} us/op  +- {result['stdev'] * 1e6:.3f}"
+        before = baseline.get(name)
+        if before is not None:
+            line += f"  ({result['min'] / before['min']:.2f}x baseline)"
+        print(line, flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'size': args.size, 'results': results}, f, indent=2)
+
+    slower = regressions(results, baseline, args.threshold)
+    if slower:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(slower)}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+# The innermost loops of zettel.id, written so that mypyc can compile this file as it is:
+#
+#     mypyc zettel/_speedups.py
+#
+# builds an extension module next to it, which Python imports in place of this file. Without one, this file is used
+# as plain Python and gives the same results. Only str, int and bool are used here, no classes, so that the compiled
+# functions work on native strings and integers.
+
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_DIGITS = '0123456789'
+
+
+def next_part(value: str, start: int, last: int, is_num: bool) -> str:
+    # value with the part that runs from start to last (inclusive, without separators) replaced by the part after it
+    # (see IdPart.next). Trailing 9s or Zs roll over to 0s or as, and a part that is all 9s or Zs gets one longer.
+    if is_num:
+        rollover = '9'
+        first = '0'
+    else:
+        rollover = 'Z'
+        first = 'a'
+    i = last
+    while i >= start and value[i] == rollover:
+        i -= 1
+    if i < start:
+        return value[:start] + first * (last - start + 2) + value[last + 1:]
+    c = value[i]
+    if c == 'z' and not is_num:
+        c = 'A'
+    else:
+        c = chr(ord(c) + 1)
+    return value[:i] + c + first * (last - i) + value[last + 1:]
+
+
+def ordinal(ranks: str, base: int) -> int:
+    # Counts rank characters (a part's sort key without its length character) with the given number of symbols.
+    # Returns -1 if a rank does not fit, e.g. a letter past j for numeric parts.
+    n = 0
+    shorter = 0
+    count = 1
+    for c in ranks:
+        rank = ord(c) - 48
+        if rank < 0 or rank >= base:
+            return -1
+        n = n * base + rank
+        shorter += count
+        count *= base
+    # Parts with fewer characters come first: base + base ** 2 + ... of them.
+    return n + shorter - 1
+
+
+def text_for_ordinal(ordinal: int, is_num: bool) -> str:
+    # The part at the given position of the sequence IdPart.next walks through, the inverse of ordinal().
+    if is_num:
+        symbols = _DIGITS
+    else:
+        symbols = _LETTERS
+    base = len(symbols)
+    length = 1
+    count = base
+    while ordinal >= count:
+        ordinal -= count
+        length += 1
+        count *= base
+    out = [''] * length
+    for i in range(length - 1, -1, -1):
+        out[i] = symbols[ordinal % base]
+        ordinal //= base
+    return ''.join(out)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import AsyncIterator, Iterable, Optional
+
+from zettel import scan as _scan
+from zettel.allocator import IdAllocator
+from zettel.id import Id, IdScheme
+from zettel.scan import NOTE_EXTENSIONS
+from zettel.store import VaultIndex
+
+_BATCH_SIZE = 256
+_DONE = object()
+
+# Asyncio facade over the synchronous zettel modules. Nothing here touches the disk on the event loop: file system and
+# SQLite work runs in an executor (the loop's default one unless another is passed), in batches, so one executor job
+# covers many results instead of one job per note or per lookup.
+
+
+async def scan(vault: str, recursive: bool = True, extensions: Iterable[str] = NOTE_EXTENSIONS,
+               scheme: Optional[IdScheme] = None, batch_size: int = _BATCH_SIZE, prefetch: int = 4,
+               executor: Optional[Executor] = None) -> AsyncIterator[tuple[Id, str]]:
+    # Async version of zettel.scan.scan. Batches of batch_size results are read ahead in the executor, but never more
+    # than prefetch of them: when the consumer falls behind, reading pauses until it catches up.
+    loop = asyncio.get_running_loop()
+    notes = _scan.scan(vault, recursive, extensions, scheme=scheme)
+    # The executor may run each batch on a different thread. The lock keeps them, and closing the generator, from
+    # ever overlapping.
+    lock = threading.Lock()
+
+    def read() -> list[tuple[Id, str]]:
+        with lock:
+            batch = []
+            for item in notes:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    break
+            return batch
+
+    def close():
+        with lock:
+            notes.close()
+
+    batches: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+
+    async def produce():
+        try:
+            while True:
+                batch = await loop.run_in_executor(executor, read)
+                if not batch:
+                    break
+                await batches.put(batch)
+        except Exception as e:
+            await batches.put(e)
+            return
+        await batches.put(_DONE)
+
+    producer = loop.create_task(produce())
+    try:
+        while True:
+            batch = await batches.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            for item in batch:
+                yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        await loop.run_in_executor(executor, close)
+
+
+# Hands out structure ids from an IdAllocator. Without a state file an allocation is a bit of arithmetic under a lock
+# that is never held for long, so it runs right on the loop. With a state file it takes a file lock and does disk I/O,
+# so it runs in the executor.
+class AsyncAllocator:
+    def __init__(self, allocator: Optional[IdAllocator] = None, executor: Optional[Executor] = None):
+        if allocator is None:
+            allocator = IdAllocator()
+        self.allocator = allocator
+        self._executor = executor
+
+    async def next_structure(self) -> Id:
+        return (await self.allocate(1))[0]
+
+    async def allocate(self, n: int) -> list[Id]:
+        if self.allocator.state_file is None:
+            return self.allocator.allocate(n)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.allocator.allocate, n)
+
+
+# Async access to a VaultIndex. Lookups that are awaited in the same turn of the event loop, like the requests a busy
+# server handles concurrently, are answered together by one VaultIndex.lookup_many job in the executor.
+class AsyncVaultIndex:
+    @staticmethod
+    async def open(database: str, vault: str, recursive: bool = True, extensions: Iterable[str] = NOTE_EXTENSIONS,
+                   scheme: Optional[IdScheme] = None, executor: Optional[Executor] = None) -> AsyncVaultIndex:
+        index = await asyncio.get_running_loop().run_in_executor(
+            executor, lambda: VaultIndex(database, vault, recursive, extensions, scheme))
+        return AsyncVaultIndex(index, executor)
+
+    def __init__(self, index: VaultIndex, executor: Optional[Executor] = None):
+        self.index = index
+        self._executor = executor
+        self._pending: list[tuple[Id, asyncio.Future]] = []
+
+    async def refresh(self) -> tuple[int, int]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.index.refresh)
+
+    async def lookup(self, i: Id) -> list[str]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((i, future))
+        if len(self._pending) == 1:
+            loop.call_soon(self._flush, loop)
+        return await future
+
+    async def contains(self, i: Id) -> bool:
+        return bool(await self.lookup(i))
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        pending = self._pending
+        self._pending = []
+        job = loop.run_in_executor(self._executor, self.index.lookup_many, [i for i, _ in pending])
+        job.add_done_callback(lambda done: _resolve(pending, done))
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.index.close)
+
+    async def __aenter__(self) -> AsyncVaultIndex:
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _resolve(pending: list[tuple[Id, asyncio.Future]], job: asyncio.Future):
+    if job.cancelled():
+        for _, future in pending:
+            future.cancel()
+        return
+    error = job.exception()
+    if error is not None:
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(error)
+        return
+    for (_, future), paths in zip(pending, job.result()):
+        # A caller that was cancelled while waiting no longer wants its result.
+        if not future.done():
+            future.set_result(paths)
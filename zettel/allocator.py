@@ -0,0 +1,69 @@
+from __future__ import annotations
+import os
+from threading import Lock
+from typing import Callable, Optional
+
+from zettel.id import Id
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Hands out unique, increasing structure ids. Each allocation starts at the current minute, or right after the last id
+# handed out if that is already at or past the current minute, so ids created in the same minute never collide. All
+# state is updated under a lock that is never held across an await, so one allocator can be shared by threads and by
+# coroutines on an event loop.
+#
+# With a state_file, the last allocated id is also kept on disk and every allocation takes an exclusive flock on it, so
+# separate processes on one host that point at the same file never hand out the same id.
+class IdAllocator:
+    def __init__(self, state_file: Optional[str] = None, clock: Callable[[], Id] = Id.structure):
+        if state_file is not None and fcntl is None:
+            raise OSError("IdAllocator state files need fcntl file locking")
+        self.state_file = state_file
+        self._clock = clock
+        self._last: Optional[Id] = None
+        self._lock = Lock()
+
+    def next(self) -> Id:
+        return self.allocate(1)[0]
+
+    def allocate(self, n: int) -> list[Id]:
+        if n < 1:
+            raise ValueError(f"Cannot allocate {n} ids")
+        with self._lock:
+            if self.state_file is None:
+                first = self._claim(self._last, n)
+                self._last = first.advance(n - 1)
+            else:
+                first = self._claim_from_file(n)
+        ids = [first]
+        for _ in range(n - 1):
+            ids.append(ids[-1].next())
+        return ids
+
+    def _claim(self, last: Optional[Id], n: int) -> Id:
+        now = self._clock()
+        if last is None or now > last:
+            return now
+        return last.next()
+
+    def _claim_from_file(self, n: int) -> Id:
+        fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            stored = os.read(fd, 64).decode('ascii').strip()
+            last = Id(stored) if stored else None
+            if self._last is not None and (last is None or self._last > last):
+                last = self._last
+            first = self._claim(last, n)
+            self._last = first.advance(n - 1)
+            data = self._last.value.encode('ascii')
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        return first
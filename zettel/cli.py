@@ -0,0 +1,272 @@
+from __future__ import annotations
+import sys
+
+# Kept to the bare minimum at import time: python -m zettel is meant to be called from shell scripts and editor hooks
+# many times a day, where starting the interpreter is most of the work. Modules are only imported by the commands
+# that need them, and options are parsed by hand because importing argparse alone takes longer than most commands.
+
+USAGE = """usage: python -m zettel COMMAND [OPTIONS] [ID ...]
+
+commands:
+  next [-n N] [ID ...]           print the id after each ID, or the N ids after it
+  parent [ID ...]                print the parent of each ID
+  structure [-n N] [--state-file PATH]
+                                 print a new structure id for the current minute, or N of them
+  sort [ID ...]                  print the ids in Id.compare order
+  check-duplicates [ID ...]      print every group of ids that are equal but spelled differently or repeated,
+                                 one group per line, and exit with 1 if there are any
+  serve SOCKET [--state-file PATH]
+                                 answer commands sent to a Unix socket, one per line (see README)
+
+Without ID arguments, ids are read from standard input, one per line.
+"""
+
+# Lines of standard input handled at once in streaming mode.
+_CHUNK = 4096
+
+
+class UsageError(Exception):
+    pass
+
+
+def _options(args: list[str], names: dict[str, bool]) -> tuple[dict[str, str], list[str]]:
+    # Splits args into options (names maps each option to whether it takes a value) and the remaining arguments.
+    options = {}
+    rest = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == '--':
+            rest.extend(args[i + 1:])
+            break
+        if arg.startswith('-') and len(arg) > 1 and not arg[1].isdigit():
+            name, _, value = arg.partition('=')
+            if name not in names:
+                raise UsageError(f"unknown option {name}")
+            if names[name] and not value:
+                i += 1
+                if i == len(args):
+                    raise UsageError(f"option {name} needs a value")
+                value = args[i]
+            options[name] = value
+        else:
+            rest.append(arg)
+        i += 1
+    return options, rest
+
+
+def _count(options: dict[str, str]) -> int:
+    value = options.get('-n', '1')
+    if not value.isdigit() or int(value) < 1:
+        raise UsageError(f"-n needs a positive number, got {value}")
+    return int(value)
+
+
+def _chunks(lines):
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            chunk.append(line)
+            if len(chunk) >= _CHUNK:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Session:
+    # Runs commands, writing results to out and problems to err. Keeps the allocator between commands so a server
+    # never hands out the same structure id twice.
+    def __init__(self, out, err):
+        self.out = out
+        self.err = err
+        self.failed = False
+        self._allocator = None
+
+    def error(self, message: str):
+        self.failed = True
+        self.err(f"zettel: {message}\n")
+
+    def run(self, command: str, args: list[str], stdin=None) -> int:
+        self.failed = False
+        if command in ('-h', '--help', 'help'):
+            self.out(USAGE)
+            return 0
+        handler = _COMMANDS.get(command)
+        if handler is None:
+            raise UsageError(f"unknown command {command!r}")
+        handler(self, args, stdin)
+        return 1 if self.failed else 0
+
+    def _values(self, values: list[str], stdin):
+        if values:
+            yield values
+        elif stdin is not None:
+            yield from _chunks(stdin)
+
+    def _map(self, values: list[str], stdin, f):
+        from zettel.id import Id
+        for chunk in self._values(values, stdin):
+            out = []
+            for value in chunk:
+                try:
+                    out.append(f(Id(value)))
+                except (ValueError, OverflowError) as e:
+                    self.error(f"{value}: {e}")
+            if out:
+                out.append('')
+                self.out('\n'.join(out))
+
+    def next(self, args: list[str], stdin):
+        options, values = _options(args, {'-n': True})
+        n = _count(options)
+        if n == 1:
+            self._map(values, stdin, lambda i: i.next().value)
+        else:
+            self._map(values, stdin, lambda i: '\n'.join(i.next_n(n).values()))
+
+    def parent(self, args: list[str], stdin):
+        _, values = _options(args, {})
+        self._map(values, stdin, lambda i: i.parent().value)
+
+    def structure(self, args: list[str], stdin):
+        options, rest = _options(args, {'-n': True, '--state-file': True})
+        if rest:
+            raise UsageError("structure takes no ids")
+        if self._allocator is None:
+            from zettel.allocator import IdAllocator
+            self._allocator = IdAllocator(options.get('--state-file'))
+        elif '--state-file' in options:
+            # A server's allocator, which was set up with the server's own state file.
+            raise UsageError("--state-file can only be given when the server is started")
+        self.out(''.join(i.value + '\n' for i in self._allocator.allocate(_count(options))))
+
+    def _parse_all(self, values: list[str], stdin):
+        # Values and sort keys of every valid id, parsed in bulk.
+        from zettel.id import Id
+        values = [value for chunk in self._values(values, stdin) for value in chunk]
+        try:
+            batch = Id.parse_many(values)
+            return values, batch.keys
+        except ValueError:
+            pass
+        valid = []
+        keys = []
+        for value in values:
+            try:
+                keys.append(Id(value).sort_key())
+                valid.append(value)
+            except ValueError as e:
+                self.error(f"{value}: {e}")
+        return valid, keys
+
+    def sort(self, args: list[str], stdin):
+        _, values = _options(args, {})
+        values, keys = self._parse_all(values, stdin)
+        order = sorted(range(len(values)), key=keys.__getitem__)
+        self.out(''.join(values[k] + '\n' for k in order))
+
+    def check_duplicates(self, args: list[str], stdin):
+        _, values = _options(args, {})
+        values, keys = self._parse_all(values, stdin)
+        groups: dict[str, list[str]] = {}
+        for value, key in zip(values, keys):
+            groups.setdefault(key, []).append(value)
+        out = [' '.join(group) + '\n' for group in groups.values() if len(group) > 1]
+        self.out(''.join(out))
+        if out:
+            self.failed = True
+
+    def serve(self, args: list[str], stdin):
+        options, rest = _options(args, {'--state-file': True})
+        if len(rest) != 1:
+            raise UsageError("serve needs the path of a socket")
+        serve(rest[0], options.get('--state-file'))
+
+
+_COMMANDS = {
+    'next': _Session.next,
+    'parent': _Session.parent,
+    'structure': _Session.structure,
+    'sort': _Session.sort,
+    'check-duplicates': _Session.check_duplicates,
+    'serve': _Session.serve,
+}
+
+
+def serve(path: str, state_file=None):
+    # Answers commands on a Unix socket until interrupted. Every line a client sends is a command with its ids, like
+    # the arguments of python -m zettel. Its output follows, then an empty line. Lines of the output that start with
+    # "zettel: " are errors. Commands never read more ids than are on their line.
+    import os
+
+    with _server(path, state_file) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+
+
+def _server(path: str, state_file=None):
+    import os
+    import socketserver
+    import stat
+
+    from zettel.allocator import IdAllocator
+
+    # IdAllocator is thread safe, so one is shared by all connections.
+    allocator = IdAllocator(state_file)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                args = raw.decode('utf-8', 'replace').split()
+                if not args:
+                    continue
+                out = []
+                session = _Session(out.append, out.append)
+                session._allocator = allocator
+                try:
+                    if args[0] == 'serve':
+                        raise UsageError("already serving")
+                    session.run(args[0], args[1:])
+                except UsageError as e:
+                    session.error(str(e))
+                text = ''.join(out)
+                if text and not text.endswith('\n'):
+                    text += '\n'
+                self.wfile.write((text + '\n').encode())
+                self.wfile.flush()
+
+    # A socket left behind by a server that is gone is replaced, anything else at path is left alone.
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        pass
+    else:
+        if not stat.S_ISSOCK(mode):
+            raise UsageError(f"{path} exists and is not a socket")
+        os.remove(path)
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    session = _Session(sys.stdout.write, sys.stderr.write)
+    if not argv:
+        sys.stderr.write(USAGE)
+        return 2
+    try:
+        return session.run(argv[0], argv[1:], sys.stdin)
+    except UsageError as e:
+        sys.stderr.write(f"zettel: {e}\n\n{USAGE}")
+        return 2
+    except BrokenPipeError:
+        # Output piped into head and the like.
+        return 0
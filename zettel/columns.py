@@ -0,0 +1,124 @@
+from __future__ import annotations
+from array import array
+from typing import Iterable, Optional
+
+from zettel.id import Id, IdBatch, _STRUCTURE_KEY_PREFIX, _ordinal, _structure_to_minutes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Parts are encoded as their position in the sequence a, b, ..., Z, aa, ab, ... (see IdPart.ordinal), with digits
+# counted as the first ten letters the same way IdPart.compare ranks them. That orders codes exactly like part keys.
+# Every part of up to eleven characters fits in an int64, longer ones mostly do not.
+_PART_BASE = 52
+_MAX_CODE = 2 ** 63 - 1
+# Fills the columns of parts an id does not have, so that 21 sorts before 21a.
+MISSING = -1
+
+
+def part_code(part_key: str) -> int:
+    # The int64 code of a part, given its sort key (see IdPart.sort_key).
+    code = _ordinal(part_key[1:], _PART_BASE)
+    if code < 0:
+        raise ValueError(f"Part key {part_key!r} has characters that cannot be encoded")
+    if code > _MAX_CODE:
+        raise OverflowError(f"Part key {part_key!r} is too long to be encoded in 64 bits")
+    return code
+
+
+def _split_key(key: str) -> list[str]:
+    parts = []
+    pos = 0
+    while pos < len(key):
+        end = pos + 1 + ord(key[pos])
+        parts.append(key[pos:end])
+        pos = end
+    return parts
+
+
+# Ids as columns. Row r describes values[r]:
+#
+# - is_structure[r] is 1 for structure ids.
+# - minutes[r] is the number of minutes since 0001-01-01 00:00 for structure ids, 0 for Luhmann-style ids.
+# - depth[r] is the number of parts of Luhmann-style ids, 0 for structure ids.
+# - parts[r] holds width part codes (see part_code), padded with MISSING.
+#
+# With NumPy installed the columns are numpy arrays (int8, int64, int32 and an int64 matrix of shape (rows, width)),
+# otherwise array.array with parts flattened row by row.
+class IdColumns:
+    def __init__(self, values: list[str], is_structure, minutes, depth, parts, width: int):
+        self.values = values
+        self.is_structure = is_structure
+        self.minutes = minutes
+        self.depth = depth
+        self.parts = parts
+        self.width = width
+
+    def order(self):
+        # Row indices in Id.compare order: structure ids by time first, then Luhmann-style ids part by part.
+        if numpy is not None and isinstance(self.minutes, numpy.ndarray):
+            keys = [self.parts[:, column] for column in range(self.width - 1, -1, -1)]
+            keys.append(self.minutes)
+            keys.append(1 - self.is_structure)
+            return numpy.lexsort(keys)
+        width = self.width
+        parts = self.parts
+
+        def key(r: int):
+            return -self.is_structure[r], self.minutes[r], parts[r * width:(r + 1) * width]
+        return array('q', sorted(range(len(self.values)), key=key))
+
+    def __len__(self):
+        return len(self.values)
+
+
+def to_columns(ids: Iterable[Id], width: Optional[int] = None, use_numpy: Optional[bool] = None) -> IdColumns:
+    # Converts ids, or an IdBatch without building its Ids, into columns. width defaults to the depth of the deepest
+    # id. Ids with more parts than width raise ValueError. use_numpy defaults to whether NumPy is installed.
+    if isinstance(ids, IdBatch):
+        values = ids.values
+        keys = ids.keys
+    else:
+        ids = list(ids)
+        values = [i.value for i in ids]
+        keys = [i.sort_key() for i in ids]
+    is_structure = array('b')
+    minutes = array('q')
+    depth = array('l')
+    rows = []
+    for value, key in zip(values, keys):
+        if key.startswith(_STRUCTURE_KEY_PREFIX):
+            is_structure.append(1)
+            minutes.append(_structure_to_minutes(value))
+            depth.append(0)
+            rows.append(())
+        else:
+            codes = [part_code(part) for part in _split_key(key)]
+            is_structure.append(0)
+            minutes.append(0)
+            depth.append(len(codes))
+            rows.append(codes)
+    if width is None:
+        width = max(depth, default=0)
+    parts = array('q')
+    for value, codes in zip(values, rows):
+        if len(codes) > width:
+            raise ValueError(f"Id {value} has more than {width} parts")
+        parts.extend(codes)
+        parts.extend([MISSING] * (width - len(codes)))
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    if not use_numpy:
+        return IdColumns(values, is_structure, minutes, depth, parts, width)
+    if numpy is None:
+        raise ImportError("NumPy is not installed")
+    return IdColumns(
+        values,
+        numpy.frombuffer(is_structure, dtype=numpy.int8).copy(),
+        numpy.frombuffer(minutes, dtype=numpy.int64).copy(),
+        numpy.array(depth, dtype=numpy.int32),
+        numpy.frombuffer(parts, dtype=numpy.int64).reshape(len(values), width).copy(),
+        width,
+    )
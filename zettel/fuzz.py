@@ -0,0 +1,420 @@
+from __future__ import annotations
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from functools import cmp_to_key
+from time import perf_counter
+from typing import Callable, Optional
+
+from zettel.id import Id, IdScheme, _DAYS_IN_MONTH, _is_leap, default_scheme
+
+# Property and differential checks of zettel.id on random ids. The fast paths (the regex tokenizer, flat sort keys,
+# parse_many, interning, next_n and the _speedups functions) are compared against copies of the original code with
+# only the fixes named in DEVIATIONS, and every run also times parse and next on the same ids, so that one run catches
+# both changed results and lost speed. Ids that are already in a vault must never change meaning, so anything else
+# that disagrees is a failure, even where the reference looks odd.
+#
+#     python -m zettel.fuzz [-n CASES] [--seed SEED] [--separators CHARS] [--min-parse RATE] [--min-next RATE]
+
+
+# The ways zettel.id intentionally differs from the original code, which zettel._original keeps as it was. The
+# reference functions below are copies of the original ones with each of these switched on by name; with none of them,
+# they give exactly what the original gives. Any other difference from the original is a failure.
+DEVIATIONS = {
+    'separator-skip': "after a run of separators the original went on with i += i instead of i += 1, and missed the "
+                      "kind changes in the characters it skipped over, so 21.3a was 21 and 3a",
+    'numeric-part-kind': "a numeric part ended by a letter was marked as a letter part, which ranked its digits after "
+                         "every letter, so 22 sorted before 21a",
+    'trailing-separators': "two or more separators at the end made an empty last part",
+    'part-length': "parts were ordered by where they end in the id instead of by their length, so a separator in "
+                   "front of a part made it greater, and a.1 sorted after a1",
+    'structure-order': "structure ids have no parts, so comparing one raised AttributeError, now they sort before "
+                       "every other id, in time order",
+}
+
+
+# Spans (start, end, sep_start, is_num) of the parts of a Luhmann-style id, like the IdParts of Id.parts. The original
+# Id._parse with the deviations in fixed.
+def reference_parse(value: str, separators, fixed=DEVIATIONS) -> list[tuple[int, int, int, bool]]:
+    parts = []
+    start = 0
+    is_num = value[0].isdigit()
+    i = 1
+    l = len(value)
+    while i < l:
+        c = value[i]
+        if c in separators:
+            parts.append([start, i, i, is_num])
+            i += 1
+            start = i
+            ii = 0
+            while i + ii < l:
+                cc = value[i + ii]
+                if cc in separators:
+                    ii += 1
+                    continue
+                parts[-1][1] = i + ii - 1
+                i += ii
+                start = i
+                i += 1 if 'separator-skip' in fixed else i
+                is_num = cc.isdigit()
+                break
+            else:
+                if 'trailing-separators' in fixed:
+                    start = i = l
+            continue
+        if is_num and c.isalpha():
+            parts.append([start, i, -1, 'numeric-part-kind' in fixed])
+            start = i
+            is_num = False
+        elif not is_num and c.isdigit():
+            parts.append([start, i, -1, False])
+            start = i
+            is_num = True
+        i += 1
+    if start < l:
+        parts.append([start, l, -1, is_num])
+    return [tuple(p) for p in parts]
+
+
+def _is_structure(value: str) -> bool:
+    return len(value) >= 12 and value.isdigit()
+
+
+def _text(value: str, span) -> str:
+    start, end, sep_start, _ = span
+    return value[start:end if sep_start == -1 else sep_start]
+
+
+def _rank(c: str, is_num: bool) -> int:
+    # As the original IdPart.compare ranked characters: digits from 0, letters a-z then A-Z from 0 as well.
+    c = ord(c)
+    if is_num:
+        return c - ord('0')
+    elif c >= ord('a'):
+        return c - ord('a')
+    else:
+        return c - ord('A') + 26
+
+
+def reference_compare(a: str, b: str, separators, fixed=DEVIATIONS) -> int:
+    # The original Id.compare and IdPart.compare with the deviations in fixed: a longer part is greater, parts of the
+    # same length compare rank by rank, and an id that runs out of parts first is smaller.
+    if _is_structure(a) or _is_structure(b):
+        if 'structure-order' not in fixed:
+            raise AttributeError("'Id' object has no attribute 'parts'")
+        if not _is_structure(b):
+            return -1
+        if not _is_structure(a):
+            return 1
+        return (a > b) - (a < b)
+    left = reference_parse(a, separators, fixed)
+    right = reference_parse(b, separators, fixed)
+    for l, r in zip(left, right):
+        l_text = _text(a, l)
+        r_text = _text(b, r)
+        if 'part-length' in fixed:
+            l_end, r_end = len(l_text), len(r_text)
+        else:
+            l_end, r_end = l[1], r[1]
+        if l_end != r_end:
+            return -1 if l_end < r_end else 1
+        for lc, rc in zip(l_text, r_text):
+            lr = _rank(lc, l[3])
+            rr = _rank(rc, r[3])
+            if lr != rr:
+                return -1 if lr < rr else 1
+    return (len(left) > len(right)) - (len(left) < len(right))
+
+
+# value with the part from start to last (inclusive, without separators) replaced by the part after it, the way the
+# original IdPart.next built it up piece by piece.
+def reference_next_part(value: str, start: int, last: int, is_num: bool) -> str:
+    rc = '9' if is_num else 'Z'
+    rolled_over = '0' if is_num else 'a'
+
+    def next_char(i):
+        c = ord(value[i]) + 1
+        if not is_num and c == ord('z') + 1:
+            c = ord('A')
+        return chr(c)
+    last_rollover = -1
+    for i in range(last, start - 1, -1):
+        if value[i] != rc:
+            break
+        last_rollover = i
+    out = [value[:start]]
+    if last_rollover == -1:
+        out.append(value[start:last])
+        out.append(next_char(last))
+    elif last_rollover == start:
+        out.append(rolled_over)
+        out.append(rolled_over * (last - start + 1))
+    else:
+        out.append(value[start:last_rollover - 1])
+        out.append(next_char(last_rollover - 1))
+        out.append(rolled_over * (last - last_rollover + 1))
+    out.append(value[last + 1:])
+    return ''.join(filter(lambda v: len(v) > 0, out))
+
+
+def reference_next(value: str, separators) -> str:
+    if _is_structure(value):
+        d = datetime.strptime(value, "%Y%m%d%H%M") + timedelta(minutes=1)
+        return f"{d.year:04d}{d.month:02d}{d.day:02d}{d.hour:02d}{d.minute:02d}"
+    start, end, sep_start, is_num = reference_parse(value, separators)[-1]
+    return reference_next_part(value, start, end - 1 if sep_start == -1 else sep_start - 1, is_num)
+
+
+def other_kind(value: str, separators) -> Optional[str]:
+    # value with its last part spelled with the same ranks in the other kind, 21b for 21.1 and 21.1 for 21b, or None
+    # if that part has no such spelling. These are the pairs that are easiest to mistake for equal ids.
+    if _is_structure(value):
+        return None
+    spans = reference_parse(value, separators)
+    start, end, sep_start, is_num = spans[-1]
+    text = _text(value, spans[-1])
+    if is_num:
+        if not text.isdigit() or not text.isascii():
+            return None
+        swapped = ''.join('abcdefghij'[int(c)] for c in text)
+    else:
+        if any(_rank(c, False) > 9 for c in text):
+            return None
+        swapped = ''.join(str(_rank(c, False)) for c in text)
+    head = value[:start]
+    if len(spans) > 1 and spans[-2][2] == -1 and spans[-2][3] != is_num:
+        # Now of the same kind as the part before it, which needs a separator to stay apart.
+        joiners = sorted(s for s in separators if len(s) == 1)
+        if not joiners:
+            return None
+        head += joiners[0]
+    return head + swapped + value[start + len(text):]
+
+
+def reference_parent(value: str, separators) -> Optional[str]:
+    if _is_structure(value):
+        return None
+    spans = reference_parse(value, separators)
+    if len(spans) < 2:
+        return None
+    if spans[-2][2] > -1:
+        return value[:spans[-2][2]]
+    return value[:spans[-1][0]]
+
+
+def random_luhmann(rng: random.Random, scheme: IdScheme) -> str:
+    # Alternating numeric and letter parts, heavy on 9s and Zs so that rollovers come up often, with the odd pair of
+    # same-kind parts split by separators and the odd separator left at the end.
+    separators = sorted(s for s in scheme.separators if len(s) == 1)
+    out = []
+    is_num = rng.random() < 0.8
+    for k in range(rng.randint(1, 7)):
+        if k:
+            if separators and rng.random() < 0.2:
+                out.append(rng.choice(separators) * rng.randint(1, 2))
+            else:
+                is_num = not is_num
+                if separators and rng.random() < 0.2:
+                    out.append(rng.choice(separators))
+        if is_num:
+            out.append(rng.choice([str(rng.randint(1, 99)), '9' * rng.randint(1, 3), str(rng.randint(0, 9999))]))
+        else:
+            alphabet = rng.choice(['abyzAYZ', 'zZ', 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'])
+            out.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 3))))
+    if separators and rng.random() < 0.05:
+        out.append(rng.choice(separators))
+    return ''.join(out)
+
+
+def random_structure(rng: random.Random) -> str:
+    year = rng.choice([rng.randint(1, 9998), rng.randint(1990, 2100)])
+    month = rng.randint(1, 12)
+    days = _DAYS_IN_MONTH[month - 1] + (month == 2 and _is_leap(year))
+    # Mostly the last minute of a day, so next() has to carry into the date.
+    if rng.random() < 0.5:
+        return f"{year:04d}{month:02d}{days:02d}2359"
+    return f"{year:04d}{month:02d}{rng.randint(1, days):02d}{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}"
+
+
+def random_text(rng: random.Random) -> str:
+    # Anything at all, for the parser: digits, letters, separators, punctuation and non-ASCII.
+    return ''.join(rng.choice("0129azAZé._-/\\!_ ") for _ in range(rng.randint(1, 14)))
+
+
+class FuzzReport:
+    def __init__(self, seed: int, scheme: IdScheme):
+        self.seed = seed
+        self.scheme = scheme
+        self.cases = 0
+        self.failed = 0
+        # The first failures, each with the check that failed and the ids involved.
+        self.failures: list[str] = []
+        # Ids per second of Id(), Id.parse_many and Id.next on the generated Luhmann-style and structure ids.
+        self.parse_rate = 0.0
+        self.parse_many_rate = 0.0
+        self.next_rate = 0.0
+        # For each of DEVIATIONS, in how many of the parse and compare cases the original code gives something else.
+        self.deviations = dict.fromkeys(DEVIATIONS, 0)
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+    def __str__(self):
+        lines = [
+            f"{self.cases} cases with seed {self.seed} and {self.scheme}: {self.failed} failed",
+            f"parse      {self.parse_rate:12,.0f} ids/s",
+            f"parse_many {self.parse_many_rate:12,.0f} ids/s",
+            f"next       {self.next_rate:12,.0f} ids/s",
+            "differs from the original by " + ', '.join(f"{name} {n}" for name, n in self.deviations.items()),
+        ]
+        lines.extend(self.failures)
+        return '\n'.join(lines)
+
+
+def _rate(f: Callable[[], object], n: int, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        f()
+        best = min(best, perf_counter() - start)
+    return n / max(best, 1e-9)
+
+
+def _count_deviations(report: FuzzReport, reference: Callable, *args):
+    # Counts the deviations that change what reference gives for args, an error being a result of its own.
+    def outcome(fixed):
+        try:
+            return reference(*args, fixed=fixed)
+        except (AttributeError, IndexError) as e:
+            return type(e)
+    expected = outcome(DEVIATIONS)
+    for name in DEVIATIONS:
+        if outcome(DEVIATIONS.keys() - {name}) != expected:
+            report.deviations[name] += 1
+
+
+def run(cases: int = 10000, seed: Optional[int] = None, scheme: Optional[IdScheme] = None,
+        max_failures: int = 20) -> FuzzReport:
+    # Generates cases ids of each kind (Luhmann-style, structure and arbitrary text) and checks them all. The same
+    # seed and scheme always produce the same ids, and the seed is in the report, so failures can be replayed.
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if scheme is None:
+        scheme = default_scheme()
+    separators = scheme.separators
+    rng = random.Random(seed)
+    report = FuzzReport(seed, scheme)
+
+    def fail(check: str, *values):
+        report.failed += 1
+        if len(report.failures) < max_failures:
+            report.failures.append(f"{check}: {', '.join(repr(v) for v in values)}")
+
+    luhmann = [random_luhmann(rng, scheme) for _ in range(cases)]
+    structure = [random_structure(rng) for _ in range(cases)]
+    text = [random_text(rng) for _ in range(cases)]
+    values = luhmann + structure
+    report.cases = len(values) + len(text)
+
+    report.parse_rate = _rate(lambda: [Id(v, scheme) for v in values], len(values))
+    report.parse_many_rate = _rate(lambda: Id.parse_many(values, scheme), len(values))
+    ids = [Id(v, scheme) for v in values]
+    report.next_rate = _rate(lambda: [i.next() for i in ids], len(ids))
+
+    # Parsing: the same parts as the reference, the same keys from every way of parsing, and nothing else accepted.
+    batch = Id.parse_many(values, scheme)
+    for value, key in zip(values, batch.keys):
+        i = Id(value, scheme)
+        if key != i.sort_key() or Id.intern(value, scheme).sort_key() != i.sort_key():
+            fail("parse_many or intern differ from Id", value)
+    for value in luhmann + text:
+        if _is_structure(value):
+            continue
+        try:
+            spans = [(p.start, p.end, p.sep_start, p.is_num) for p in Id(value, scheme).parts]
+        except ValueError:
+            spans = None
+        if spans != reference_parse(value, separators):
+            fail("parts differ from the reference parser", value)
+        _count_deviations(report, reference_parse, value, separators)
+
+    for i in ids:
+        value = i.value
+        try:
+            n = i.next()
+            if n.value != reference_next(value, separators):
+                fail("next differs from the reference", value, n.value)
+            if not n > i:
+                fail("next is not greater", value, n.value)
+            if i.has_parent:
+                if i.parent().value != reference_parent(value, separators):
+                    fail("parent differs from the reference", value, i.parent().value)
+                if n.parent() != i.parent():
+                    fail("next changed the parent", value, n.value)
+            elif reference_parent(value, separators) is not None:
+                fail("parent missing", value)
+            if [v for v in i.next_n(3).values()] != [n.value, n.next().value, n.next().next().value]:
+                fail("next_n differs from next", value)
+            # Round trips: spelling the id again, or canonically, gives an equal id with an equal hash.
+            again = Id(value, scheme)
+            canonical = Id(i.canonical(), scheme)
+            if again.value != value or again != i:
+                fail("parsing again changed the id", value)
+            if canonical != i or hash(canonical) != hash(i) or canonical.canonical() != i.canonical():
+                fail("canonical spelling is not equivalent", value, i.canonical())
+        except (ValueError, OverflowError, AttributeError) as e:
+            fail(f"raised {e!r}", value)
+
+    # Ordering: pairs agree with the reference, in both directions and with == and hash, and the order of a sorted
+    # list holds between far apart entries as well, which it only can if the ordering is transitive.
+    for _ in range(cases):
+        a = rng.choice(ids)
+        b = rng.choice(ids) if rng.random() < 0.5 else rng.choice([a.next(), Id(a.canonical(), scheme)])
+        swapped = other_kind(a.value, separators)
+        if swapped is not None and rng.random() < 0.3:
+            b = Id(swapped, scheme)
+        expected = reference_compare(a.value, b.value, separators)
+        _count_deviations(report, reference_compare, a.value, b.value, separators)
+        if a.compare(b) != expected or b.compare(a) != -expected or (a < b) != (expected < 0):
+            fail("compare differs from the reference", a.value, b.value)
+        if (a == b) != (expected == 0) or (a == b and hash(a) != hash(b)):
+            fail("equality or hash differ from compare", a.value, b.value)
+        if (a == b) != (a.canonical() == b.canonical()):
+            fail("equality differs from the canonical spelling", a.value, b.value)
+    ordered = sorted(ids)
+    if ordered != sorted(ids, key=cmp_to_key(lambda x, y: reference_compare(x.value, y.value, separators))):
+        fail("sorted order differs from the reference")
+    for _ in range(cases):
+        j, k = sorted(rng.randrange(len(ordered)) for _ in range(2))
+        if ordered[k] < ordered[j]:
+            fail("ordering is not transitive", ordered[j].value, ordered[k].value)
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m zettel.fuzz", description="Property and differential checks "
+                                     "of zettel.id on random ids, with parse and next throughput")
+    parser.add_argument('-n', '--cases', type=int, default=10000, help="ids of each kind to check (default 10000)")
+    parser.add_argument('-s', '--seed', type=int, help="seed to replay, random by default")
+    parser.add_argument('--separators', help="check a scheme with these separators instead of the default one")
+    parser.add_argument('--min-parse', type=float, default=0, help="fail if parse is slower than this many ids/s")
+    parser.add_argument('--min-next', type=float, default=0, help="fail if next is slower than this many ids/s")
+    args = parser.parse_args(argv)
+    scheme = None if args.separators is None else IdScheme(args.separators)
+    report = run(args.cases, args.seed, scheme)
+    print(report)
+    status = 0 if report.ok else 1
+    if report.parse_rate < args.min_parse:
+        print(f"parse is below {args.min_parse:,.0f} ids/s", file=sys.stderr)
+        status = 1
+    if report.next_rate < args.min_next:
+        print(f"next is below {args.min_next:,.0f} ids/s", file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,34 +1,254 @@
 from __future__ import annotations
-from datetime import datetime, timedelta
-
-SEPARATORS = {'.', '-', '/', '\\'}
+import re
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from itertools import compress
+from operator import add, not_
+from threading import Lock
+from typing import Iterable, Iterator, Optional
+
+from zettel._speedups import next_part as _next_part, ordinal as _ordinal, text_for_ordinal as _text_for_ordinal
+
+DEFAULT_SEPARATORS = frozenset({'.', '-', '/', '\\'})
 _STRUCTURE_ID_FORMAT = "%Y%m%d%H%M"
+# Structure ids sort before all Luhmann-style ids, whose keys start with the (non-zero) length of their first part.
+_STRUCTURE_KEY_PREFIX = '\x00'
+_MINUTES_PER_DAY = 24 * 60
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+class _LetterRanks(dict):
+    # str.translate table that maps each character of a letter part to a character whose code point orders the
+    # same way as the rank used by IdPart.compare: a-z, then A-Z. Digits already order correctly as themselves.
+    def __missing__(self, c: int) -> int:
+        if c >= 97:
+            r = c - 49
+        else:
+            r = c + 9
+        self[c] = r
+        return r
+
+
+_LETTER_RANKS = _LetterRanks()
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+# _LETTER_RANKS for ids of only ASCII digits and letters, as a plain table that leaves everything else as it is.
+_ASCII_LETTER_RANKS = str.maketrans(_LETTERS, ''.join(chr(48 + r) for r in range(len(_LETTERS))))
+_plain_runs = re.compile('[0-9]+|[a-zA-Z]+').findall
+
+
+class _KeyPieces(dict):
+    # The sort key piece (length, then ranks) of each run of ASCII digits or of letters. Most ids are made of a few
+    # thousand short runs, which are kept; any others are built again every time.
+    def __missing__(self, run: str) -> str:
+        piece = chr(len(run)) + run.translate(_ASCII_LETTER_RANKS)
+        if len(self) < 4096:
+            self[run] = piece
+        return piece
+
+
+_KEY_PIECES = _KeyPieces()
+
+
+# The rules for splitting ids into parts, compiled once. The separators are turned into a regex equivalent to the
+# part rules of the original character by character parser: a numeric part is a digit followed by anything that is not
+# a letter or a separator, and a letter part is a run of anything that is not a digit or a separator. The first
+# character always belongs to the first part, even if it is a separator. A bare newline matches on its own so that
+# many ids can be tokenized from one joined string. The alphabet and rollover rules (0-9 rolling over to 00, a-z then
+# A-Z rolling over to aa) are the Luhmann conventions and the same for every scheme.
+#
+# A scheme never changes after it is created, so it can be shared by any number of ids and threads, and several
+# schemes can be used side by side in one process.
+class IdScheme:
+    __slots__ = ('separators', 'joiner', '_tokens', '_plain', '_not_plain', '_plain_parts', '_cache')
+
+    def __init__(self, separators: Iterable[str] = DEFAULT_SEPARATORS, intern_size: int = 65536):
+        self.separators = frozenset(separators)
+        # The separator written between two parts of the same kind when an id is spelled out, see Id.canonical.
+        single = sorted(s for s in self.separators if len(s) == 1)
+        if '.' in single:
+            self.joiner = '.'
+        elif single:
+            self.joiner = single[0]
+        else:
+            self.joiner = None
+        chars = ''.join(re.escape(s) for s in sorted(self.separators) if len(s) == 1)
+        digits = '\\d' if '_' in self.separators else '[\\d_]'
+        if chars:
+            letters = f'[^\\d\\n{chars}]+|^[{chars}][^\\d\\n{chars}]*'
+            sep = f'[{chars}]*'
+        else:
+            letters = '[^\\d\\n]+'
+            sep = ''
+        pattern = rf'(?:(\d{digits}*(?:[^\w\n{chars}]+{digits}*)*)|({letters}))({sep})|\n'
+        self._tokens = re.compile(pattern, re.MULTILINE).findall
+        # Whether an id is only ASCII digits, letters and separators and starts with a digit or letter, see Id._parse.
+        self._plain = re.compile(f'[0-9a-zA-Z][0-9a-zA-Z{chars}]*').fullmatch
+        # Finds the first character that makes a line of ids more than ASCII digits, letters and separators (or that
+        # starts it with a separator), see _plain_keys.
+        leading = f'|^[{chars}]' if chars else ''
+        self._not_plain = re.compile(f'[^0-9a-zA-Z\\n{chars}]{leading}', re.MULTILINE).search
+        self._plain_parts = re.compile('[0-9]+|[a-zA-Z]+|\\n').findall
+        self._cache = IdCache(intern_size, self)
+
+    def parse(self, value: str) -> Id:
+        return Id(value, self)
+
+    def parse_many(self, values: Iterable[str]) -> IdBatch:
+        return Id.parse_many(values, self)
+
+    def intern(self, value: str) -> Id:
+        return self._cache.get(value)
+
+    def __repr__(self):
+        return f"IdScheme({''.join(sorted(self.separators))!r})"
+
+
+def _changes_separators(method):
+    def changed(self, *args):
+        global _default_separators
+        _default_separators = None
+        return method(self, *args)
+    return changed
+
+
+# The type of SEPARATORS: a set that makes default_scheme compare it again after any change. As long as it is
+# unchanged, Id() uses the cached default scheme without comparing the separators on every construction.
+class _Separators(set):
+    add = _changes_separators(set.add)
+    discard = _changes_separators(set.discard)
+    remove = _changes_separators(set.remove)
+    pop = _changes_separators(set.pop)
+    clear = _changes_separators(set.clear)
+    update = _changes_separators(set.update)
+    difference_update = _changes_separators(set.difference_update)
+    intersection_update = _changes_separators(set.intersection_update)
+    symmetric_difference_update = _changes_separators(set.symmetric_difference_update)
+    __ior__ = _changes_separators(set.__ior__)
+    __iand__ = _changes_separators(set.__iand__)
+    __isub__ = _changes_separators(set.__isub__)
+    __ixor__ = _changes_separators(set.__ixor__)
+
+
+SEPARATORS = _Separators(DEFAULT_SEPARATORS)
+_default_scheme: Optional[IdScheme] = None
+# The SEPARATORS set _default_scheme is known to match, None when it has to be compared again. Sets other than
+# _Separators (SEPARATORS replaced with a plain set) are compared every time.
+_default_separators: Optional[set] = None
+
+
+def default_scheme() -> IdScheme:
+    # The scheme for the current contents of SEPARATORS, rebuilt whenever they are changed.
+    global _default_scheme, _default_separators
+    scheme = _default_scheme
+    if scheme is None or scheme.separators != SEPARATORS:
+        scheme = _default_scheme = IdScheme(SEPARATORS)
+    _default_separators = SEPARATORS if type(SEPARATORS) is _Separators else None
+    return scheme
 
 
 class Id:
+    __slots__ = ('value', 'scheme', 'is_structure', '_parts', '_key')
+
+    @staticmethod
+    def structure(scheme: Optional[IdScheme] = None) -> Id:
+        return Id(datetime.now().strftime(_STRUCTURE_ID_FORMAT), scheme)
+
+    @staticmethod
+    def from_filename(name: str, scheme: Optional[IdScheme] = None) -> Id:
+        return Id(name.split(' ')[0], scheme)
+
     @staticmethod
-    def structure() -> Id:
-        return Id(datetime.now().strftime(_STRUCTURE_ID_FORMAT))
+    def intern(value: str, scheme: Optional[IdScheme] = None) -> Id:
+        if scheme is None:
+            return intern_cache.get(value)
+        return scheme.intern(value)
 
     @staticmethod
-    def from_filename(name: str) -> Id:
-        return Id(name.split(' ')[0])
+    def parse_many(values: Iterable[str], scheme: Optional[IdScheme] = None) -> IdBatch:
+        if scheme is None:
+            scheme = default_scheme()
+        batch = IdBatch(scheme)
+        batch.values = values = list(values)
+        if not values:
+            return batch
+        is_structure = [len(v) >= 12 and v.isdigit() for v in values]
+        batch.is_structure = array('b', is_structure)
+        text = '\n'.join(['' if s else v for v, s in zip(values, is_structure)])
+        if text.count('\n') != len(values) - 1:
+            raise ValueError("Cannot parse Ids that contain a newline")
+        keys = _plain_keys(text, scheme)
+        if keys is None:
+            batch._split()
+            return batch
+        for i in compress(range(len(keys)), map(not_, keys)):
+            if not is_structure[i]:
+                raise ValueError("Cannot parse an empty Id")
+            keys[i] = _STRUCTURE_KEY_PREFIX + values[i]
+        batch.keys = keys
+        return batch
 
-    def __init__(self, value: str):
+    @staticmethod
+    def _build(value: str, scheme: IdScheme, is_structure: bool, parts: Optional[list[IdPart]], key: str) -> Id:
+        built = object.__new__(Id)
+        built.value = value
+        built.scheme = scheme
+        built.is_structure = is_structure
+        built._parts = parts
+        built._key = key
+        return built
+
+    def __init__(self, value: str, scheme: Optional[IdScheme] = None):
         self.value = value
+        if scheme is None:
+            scheme = _default_scheme if SEPARATORS is _default_separators else default_scheme()
+        self.scheme = scheme
         self.is_structure = len(value) >= 12 and value.isdigit()
+        self._parts = None
         if not self.is_structure:
-            self.parts = self._parse()
-            self.has_parent = len(self.parts) > 1
+            self._parse()
         else:
-            self.has_parent = False
+            self._key = _STRUCTURE_KEY_PREFIX + value
+
+    @property
+    def parts(self) -> list[IdPart]:
+        # Only the sort key is built up front, most ids are only ever compared and hashed. The parts are split out
+        # the first time they are needed.
+        parts = self._parts
+        if parts is None:
+            if self.is_structure:
+                raise AttributeError(f"Structure Id {self.value} has no parts")
+            parts = self._parts = self._split()
+        return parts
+
+    @property
+    def has_parent(self) -> bool:
+        return not self.is_structure and len(self.parts) > 1
 
     def next(self) -> Id:
         if self.is_structure:
-            d = datetime.strptime(self.value, _STRUCTURE_ID_FORMAT)
-            d = d + timedelta(minutes=1)
-            return Id(d.strftime(_STRUCTURE_ID_FORMAT))
-        return Id(self.parts[-1].next())
+            return Id(_minutes_to_structure(_structure_to_minutes(self.value) + 1), self.scheme)
+        return Id(self.parts[-1].next(), self.scheme)
+
+    def next_n(self, n: int) -> IdRange:
+        # The n ids that repeatedly calling next() would give, as a lazy IdRange.
+        if n < 0:
+            raise ValueError(f"Cannot get a negative number of Ids, got {n}")
+        if self.is_structure:
+            first = _structure_to_minutes(self.value) + 1
+        else:
+            first = self.parts[-1].ordinal() + 1
+        return IdRange._of(self, first, first + n)
+
+    def advance(self, n_minutes: int) -> Id:
+        if not self.is_structure:
+            raise ValueError(f"Cannot advance Luhmann-style Id {self.value} by minutes")
+        return Id(_minutes_to_structure(_structure_to_minutes(self.value) + n_minutes), self.scheme)
+
+    def distance(self, other: Id) -> int:
+        if not self.is_structure or not other.is_structure:
+            raise ValueError(f"Cannot get the distance in minutes between {self.value} and {other.value}")
+        return _structure_to_minutes(other.value) - _structure_to_minutes(self.value)
 
     def parent(self) -> Id:
         if not self.has_parent:
@@ -36,102 +256,446 @@ class Id:
         last = self.parts[-1]
         snd_last = self.parts[-2]
         if snd_last.sep_start > -1:
-            return Id(self.value[:snd_last.sep_start])
-        return Id(self.value[:last.start])
-
-    def _parse(self) -> list[IdPart]:
-        global SEPARATORS
-
+            return Id(self.value[:snd_last.sep_start], self.scheme)
+        return Id(self.value[:last.start], self.scheme)
+
+    def _parse(self):
+        value = self.value
+        if value.isascii() and (value.isalnum() or self.scheme._plain(value)):
+            # Only ASCII digits, letters and separators (nearly every id): the parts are the runs of digits and of
+            # letters, whose key pieces are cached.
+            self._key = ''.join(map(_KEY_PIECES.__getitem__, _plain_runs(value)))
+            return
+        key = []
+        length = 0
+        for num, letters, seps in self.scheme._tokens(self.value):
+            if num:
+                key.append(chr(len(num)) + num)
+                length += len(num) + len(seps)
+            else:
+                key.append(chr(len(letters)) + letters.translate(_LETTER_RANKS))
+                length += len(letters) + len(seps)
+        if not key:
+            raise ValueError("Cannot parse an empty Id")
+        if length != len(self.value):
+            raise ValueError(f"Cannot parse Id {self.value!r}")
+        self._key = ''.join(key)
+
+    def _split(self) -> list[IdPart]:
+        value = self.value
+        l = len(value)
         parts = []
-        start = 0
-        is_num = self.value[0].isdigit()
-        i = 1
-        l = len(self.value)
-        while i < l:
-            c = self.value[i]
-            if c in SEPARATORS:
-                parts.append(IdPart(self.value, start, i, i, is_num))
-                i += 1
-                start = i
-                ii = 0
-                while i + ii < l:
-                    cc = self.value[i + ii]
-                    if cc in SEPARATORS:
-                        ii += 1
-                        continue
-                    parts[-1].end = i + ii - 1
-                    i += ii
-                    start = i
-                    i += i
-                    is_num = cc.isdigit()
-                    break
-                continue
-            if is_num and c.isalpha():
-                parts.append(IdPart(self.value, start, i, -1, False))
-                start = i
-                is_num = False
-            elif not is_num and c.isdigit():
-                parts.append(IdPart(self.value, start, i, -1, False))
-                start = i
-                is_num = True
-            i += 1
-        if start < l:
-            parts.append(IdPart(self.value, start, l, -1, is_num))
+        pos = 0
+        for num, letters, seps in self.scheme._tokens(value):
+            start = pos
+            pos += len(num or letters)
+            if seps:
+                sep_start = pos
+                pos += len(seps)
+                # Separators at the very end of an id belong to its last part.
+                end = pos - 1 if pos < l else sep_start
+            else:
+                sep_start = -1
+                end = pos
+            parts.append(IdPart(value, start, end, sep_start, bool(num)))
         return parts
 
+    def canonical(self) -> str:
+        # The id spelled with a separator (the scheme's joiner) only where one is needed and none at the end: 21.3a
+        # for 21/3a, 21..3-a or 21.3a/. A separator is needed between parts of the same kind, and after a numeric
+        # part unless the next part starts with a letter, since a numeric part also takes in underscores and
+        # punctuation. A part of digits or of the letters a-j equals the part of the other kind with the same ranks
+        # (21.1 is 21b), so such parts are spelled as the kind that alternates with their neighbours, starting
+        # numeric: 21.1 and 21b are both 21b, 1.2.3 is 1b3. For ids made of digits, letters and separators, two ids
+        # of one scheme are equal (and hash the same) exactly when their canonical spellings are the same.
+        if self.is_structure:
+            return self.value
+        # Parts of either kind take the kind opposite to the next part's, or to the previous part's at the end.
+        kinds = [_fixed_kind(part) for part in self.parts]
+        for n in range(len(kinds) - 2, -1, -1):
+            if kinds[n] is None and kinds[n + 1] is not None:
+                kinds[n] = not kinds[n + 1]
+        previous_kind = False
+        out = []
+        previous = None
+        for part, kind in zip(self.parts, kinds):
+            if kind is None:
+                kind = not previous_kind
+            text = part.id_str()
+            if _fixed_kind(part) is None:
+                ranks = part.sort_key()[1:]
+                text = ranks if kind else ''.join(_LETTERS[ord(c) - 48] for c in ranks)
+            if previous is not None and (kind == previous_kind or previous_kind and not text[0].isalpha()):
+                out.append(self.scheme.joiner)
+            out.append(text)
+            previous = part
+            previous_kind = kind
+        return ''.join(out)
+
+    def sort_key(self) -> str:
+        # Orders all ids, structure and Luhmann-style alike, the same way compare does. Sorting with
+        # sorted(ids, key=Id.sort_key) compares plain strings instead of calling back into Python for every pair.
+        return self._key
+
     def compare(self, other: Id):
-        parts_l = len(self.parts)
-        other_parts_l = len(other.parts)
-        smaller_l = min(parts_l, other_parts_l)
-        for i in range(smaller_l):
-            left = self.parts[i]
-            right = other.parts[i]
-            r = left.compare(right)
-            if r != 0:
-                return r
-        if parts_l == other_parts_l:
-            return 0
-        elif parts_l < other_parts_l:
-            return -1
-        else:
-            return 1
+        key = self._key
+        other_key = other._key
+        return (key > other_key) - (key < other_key)
 
     def __eq__(self, other):
-        return self.compare(other) == 0
+        if not isinstance(other, Id):
+            return NotImplemented
+        return self._key == other._key
 
     def __ne__(self, other):
-        return self.compare(other) != 0
+        if not isinstance(other, Id):
+            return NotImplemented
+        return self._key != other._key
 
     def __lt__(self, other):
-        return self.compare(other) < 0
+        return self._key < other._key
 
     def __le__(self, other):
-        return self.compare(other) <= 0
+        return self._key <= other._key
 
     def __gt__(self, other):
-        return self.compare(other) > 0
+        return self._key > other._key
 
     def __ge__(self, other):
-        return self.compare(other) >= 0
+        return self._key >= other._key
 
     def __hash__(self):
-        return hash(self.value)
+        # Ids that compare equal, like 21.3 and 21/3, have the same key, so they also hash the same.
+        return hash(self._key)
 
     def __repr__(self):
         return self.value
 
 
+def unique(ids: Iterable[Id]) -> list[Id]:
+    # The first of every group of equal ids, in the order they came in. Equal ids hash the same, so this takes one
+    # pass instead of comparing every pair.
+    return list(dict.fromkeys(ids))
+
+
+# Columnar result of Id.parse_many. The parts of the i-th id are at indices offsets[i] up to offsets[i + 1] of the
+# part_* arrays (none for structure ids), with the same start, end and sep_start as the IdParts Id would build, and a
+# kind of 1 for numeric and 0 for letter parts. Id objects are only built when indexing or iterating. The sort keys
+# are there right away; the part columns are split out of the values the first time one of them is read.
+class IdBatch:
+    __slots__ = ('scheme', 'values', 'is_structure', 'keys', 'offsets', 'part_starts', 'part_ends', 'part_seps', 'part_kinds')
+
+    def __init__(self, scheme: IdScheme):
+        self.scheme = scheme
+        self.values: list[str] = []
+        self.is_structure = array('b')
+        self.keys: list[str] = []
+
+    def __getattr__(self, name: str):
+        if name not in _PART_COLUMNS:
+            raise AttributeError(name)
+        self._split()
+        return getattr(self, name)
+
+    def _split(self):
+        text = '\n'.join(['' if s else v for v, s in zip(self.values, self.is_structure)])
+        values = self.values
+        is_structure = self.is_structure
+        letter_ranks = _LETTER_RANKS
+        keys = []
+        add_key = keys.append
+        offsets = array('q', [0])
+        add_offset = offsets.append
+        starts = []
+        ends = []
+        seps = []
+        kinds = []
+        i = 0
+        pos = 0
+        key = []
+        for num, letters, sep in self.scheme._tokens(text + '\n'):
+            if num:
+                part = num
+                kinds.append(1)
+                key.append(chr(len(num)) + num)
+            elif letters:
+                part = letters
+                kinds.append(0)
+                key.append(chr(len(letters)) + letters.translate(letter_ranks))
+            else:
+                if not key:
+                    if not is_structure[i]:
+                        raise ValueError("Cannot parse an empty Id")
+                    add_key(_STRUCTURE_KEY_PREFIX + values[i])
+                else:
+                    if seps[-1] != -1:
+                        # Separators at the very end of an id belong to its last part.
+                        ends[-1] = seps[-1]
+                    add_key(''.join(key))
+                    key = []
+                add_offset(len(kinds))
+                i += 1
+                pos = 0
+                continue
+            starts.append(pos)
+            pos += len(part)
+            if sep:
+                seps.append(pos)
+                pos += len(sep)
+                ends.append(pos - 1)
+            else:
+                seps.append(-1)
+                ends.append(pos)
+        self.keys = keys
+        self.offsets = offsets
+        self.part_starts = array('q', starts)
+        self.part_ends = array('q', ends)
+        self.part_seps = array('q', seps)
+        self.part_kinds = array('b', kinds)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i: int) -> Id:
+        return Id._build(self.values[i], self.scheme, bool(self.is_structure[i]), None, self.keys[i])
+
+    def __iter__(self) -> Iterator[Id]:
+        for i in range(len(self.values)):
+            yield self[i]
+
+
+_PART_COLUMNS = frozenset({'offsets', 'part_starts', 'part_ends', 'part_seps', 'part_kinds'})
+
+
+def _plain_keys(text: str, scheme: IdScheme) -> Optional[list[str]]:
+    # The sort keys of the newline separated ids in text, or None unless they are made only of ASCII digits, letters
+    # and separators (nearly all ids are). All parts come from one findall without groups. Each part's length goes in
+    # front of it and all keys are translated at once, which leaves the lengths alone as long as they are below
+    # ord('A'). The newline ending each id becomes '\x01\n', which no key part can contain, so it splits the keys.
+    if scheme._not_plain(text):
+        return None
+    parts = scheme._plain_parts(text + '\n')
+    lengths = list(map(len, parts))
+    if max(lengths) >= ord('A'):
+        return None
+    return ''.join(map(add, map(chr, lengths), parts)).translate(_ASCII_LETTER_RANKS).split('\x01\n')[:-1]
+
+
+# Every "HHMM" of a day, indexed by minute of the day.
+_DAY_MINUTES = tuple(f"{h:02d}{m:02d}" for h in range(24) for m in range(60))
+
+
+def _fixed_kind(part: IdPart) -> bool | None:
+    # Whether a part can only be spelled numeric (True) or only with letters (False); None for digits and a-j.
+    text = part.id_str()
+    if text.isdigit() and text.isascii() or text.isalpha() and text.isascii() and max(part.sort_key()[1:]) <= '9':
+        return None
+    return part.is_num
+
+
+def _part_texts(ordinal: int, stop: int, is_num: bool) -> Iterator[str]:
+    # IdPart.text_for_ordinal for every ordinal up to stop. Only the last character changes between most neighbours,
+    # so the rest of the text is built once per run of the last character instead of once per ordinal.
+    if is_num:
+        symbols = '0123456789'
+    else:
+        symbols = _LETTERS
+    base = len(symbols)
+    while ordinal < stop:
+        text = IdPart.text_for_ordinal(ordinal, is_num)
+        head = text[:-1]
+        first = symbols.index(text[-1])
+        count = min(base - first, stop - ordinal)
+        for c in symbols[first:first + count]:
+            yield head + c
+        ordinal += count
+
+
+# Lazy, immutable sequence of consecutive sibling ids, [start, stop) in next() order like range. Luhmann-style ranges
+# step the ordinal (see IdPart.ordinal) of the last part and keep everything around it as it was in start, structure
+# ranges step minutes. Nothing is parsed: values() and value(i) only build strings, and Ids are built straight from
+# their sort key when they are iterated or indexed. len() and "in" are computed from the ordinals without walking the
+# range.
+class IdRange:
+    __slots__ = ('scheme', 'is_structure', 'is_num', '_start', '_stop', '_prefix', '_suffix', '_parent_key')
+
+    def __init__(self, start: Id, stop: Id):
+        if start.is_structure != stop.is_structure:
+            raise ValueError(f"Cannot make a range from {start.value} to {stop.value}")
+        if start.is_structure:
+            self._init(start, _structure_to_minutes(start.value), _structure_to_minutes(stop.value))
+            return
+        last = stop.parts[-1]
+        self._init(start, start.parts[-1].ordinal(), last.ordinal())
+        if last.is_num != self.is_num or stop._key[:len(stop._key) - len(last.sort_key())] != self._parent_key:
+            raise ValueError(f"Cannot make a range from {start.value} to {stop.value}, they are not siblings")
+
+    @staticmethod
+    def _of(template: Id, start: int, stop: int) -> IdRange:
+        r = object.__new__(IdRange)
+        r._init(template, start, stop)
+        return r
+
+    def _init(self, template: Id, start: int, stop: int):
+        self.scheme = template.scheme
+        self.is_structure = template.is_structure
+        self._start = start
+        self._stop = max(start, stop)
+        if template.is_structure:
+            self.is_num = True
+            self._prefix = self._suffix = self._parent_key = ''
+            return
+        last = template.parts[-1]
+        value = template.value
+        self.is_num = last.is_num
+        self._prefix = value[:last.start]
+        self._suffix = value[last._last_idx() + 1:]
+        self._parent_key = template._key[:len(template._key) - len(last.sort_key())]
+
+    def value(self, i: int) -> str:
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("IdRange index out of range")
+        if self.is_structure:
+            return _minutes_to_structure(self._start + i)
+        return self._prefix + IdPart.text_for_ordinal(self._start + i, self.is_num) + self._suffix
+
+    def values(self) -> Iterator[str]:
+        if self.is_structure:
+            # Only the date changes once a day, the time comes from a table.
+            minutes = self._start
+            while minutes < self._stop:
+                days, minute = divmod(minutes, _MINUTES_PER_DAY)
+                date = _minutes_to_structure(days * _MINUTES_PER_DAY)[:8]
+                count = min(_MINUTES_PER_DAY - minute, self._stop - minutes)
+                for time in _DAY_MINUTES[minute:minute + count]:
+                    yield date + time
+                minutes += count
+            return
+        prefix = self._prefix
+        suffix = self._suffix
+        for text in _part_texts(self._start, self._stop, self.is_num):
+            yield prefix + text + suffix
+
+    def _id(self, value: str, text: str) -> Id:
+        if self.is_structure:
+            return Id._build(value, self.scheme, True, None, _STRUCTURE_KEY_PREFIX + value)
+        if not self.is_num:
+            text = text.translate(_LETTER_RANKS)
+        return Id._build(value, self.scheme, False, None, self._parent_key + chr(len(text)) + text)
+
+    def __getitem__(self, i: int) -> Id:
+        value = self.value(i)
+        return self._id(value, value[len(self._prefix):len(value) - len(self._suffix)])
+
+    def __iter__(self) -> Iterator[Id]:
+        if self.is_structure:
+            for value in self.values():
+                yield self._id(value, value)
+            return
+        prefix = self._prefix
+        suffix = self._suffix
+        for text in _part_texts(self._start, self._stop, self.is_num):
+            yield self._id(prefix + text + suffix, text)
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __contains__(self, i):
+        # Like equality, membership goes by sort key, so 21.3 is in a range that was built from 21/3.
+        if isinstance(i, str):
+            try:
+                i = Id(i, self.scheme)
+            except ValueError:
+                return False
+        if not isinstance(i, Id) or i.is_structure != self.is_structure:
+            return False
+        if self.is_structure:
+            try:
+                ordinal = _structure_to_minutes(i.value)
+            except ValueError:
+                return False
+        else:
+            key = i._key
+            n = len(self._parent_key)
+            if not key.startswith(self._parent_key) or len(key) == n or len(key) != n + 1 + ord(key[n]):
+                return False
+            ordinal = _ordinal(key[n + 1:], 10 if self.is_num else 52)
+        return self._start <= ordinal < self._stop
+
+    def __repr__(self):
+        if not self:
+            return "IdRange()"
+        return f"IdRange({self.value(0)}..{self.value(-1)})"
+
+
+def _is_leap(year: int) -> bool:
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+# Structure ids are converted to and from a count of minutes since 0001-01-01 00:00 using plain integer arithmetic on
+# the digits (days from civil date as in the proleptic Gregorian calendar datetime uses), which is much cheaper than a
+# strptime/strftime round trip and produces the same ids.
+def _structure_to_minutes(value: str) -> int:
+    if len(value) != 12:
+        raise ValueError(f"Structure Id {value} does not have exactly 12 digits")
+    year = int(value[0:4])
+    month = int(value[4:6])
+    day = int(value[6:8])
+    hour = int(value[8:10])
+    minute = int(value[10:12])
+    if year < 1 or not 1 <= month <= 12 or hour > 23 or minute > 59:
+        raise ValueError(f"Structure Id {value} is not a valid date and time")
+    days_in_month = _DAYS_IN_MONTH[month - 1]
+    if month == 2 and _is_leap(year):
+        days_in_month = 29
+    if not 1 <= day <= days_in_month:
+        raise ValueError(f"Structure Id {value} is not a valid date and time")
+    if month <= 2:
+        year -= 1
+        month += 9
+    else:
+        month -= 3
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * month + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 306
+    return days * _MINUTES_PER_DAY + hour * 60 + minute
+
+
+def _minutes_to_structure(minutes: int) -> str:
+    days, minute = divmod(minutes, _MINUTES_PER_DAY)
+    hour, minute = divmod(minute, 60)
+    days += 306
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month + 2) // 5 + 1
+    year = year_of_era + era * 400
+    if month < 10:
+        month += 3
+    else:
+        month -= 9
+        year += 1
+    if not 1 <= year <= 9999:
+        raise OverflowError(f"Structure Id for year {year} is out of range")
+    return f"{year:04d}{month:02d}{day:02d}{hour:02d}{minute:02d}"
+
+
 class IdPart:
+    __slots__ = ('value', 'start', 'end', 'sep_start', 'is_num')
+
     def __init__(self, value, start, end, sep_start, is_num):
         self.value = value
         self.start = start
         self.end = end
         self.sep_start = sep_start
         self.is_num = is_num
-        if is_num:
-            self._rollover_char = '9'
-        else:
-            self._rollover_char = 'Z'
 
     def id_str(self):
         if self.sep_start == -1:
@@ -140,98 +704,42 @@ class IdPart:
             return self.value[self.start:self.sep_start]
 
     def next(self) -> str:
-        last_idx = self._last_idx()
-        out: list[str] = [self.value[:self.start]]
-        last_rollover_idx = self._find_last_rollover_idx(last_idx)
-        if last_rollover_idx == -1:
-            self._add_part_with_rollover_last(last_idx, out)
-        elif last_rollover_idx == self.start:
-            self._add_part_with_rollover_all(last_idx, out)
-        else:
-            self._add_part_with_partial_rollover(last_idx, last_rollover_idx, out)
-        out.append(self.value[last_idx + 1:])
-        return ''.join(filter(lambda v: len(v) > 0, out))
+        return _next_part(self.value, self.start, self._last_idx(), self.is_num)
 
-    def compare(self, other):
-        if self.end < other.end:
-            return -1
-        if self.end > other.end:
-            return 1
+    def sort_key(self) -> str:
+        # A longer part always sorts after a shorter one, and parts of the same length compare rank by rank. Both
+        # are folded into one string (length character followed by one character per rank) so that the key of a
+        # whole Id is simply the concatenation of the keys of its parts.
         id_s = self.id_str()
-        other_id_s = other.id_str()
-        min_len = min(len(id_s), len(other_id_s))
-        for i in range(min_len):
-            c = ord(id_s[i])
-            oc = ord(other_id_s[i])
-            if self.is_num:
-                rank = c - ord('0')
-            elif c >= ord('a'):
-                rank = c - ord('a')
-            else:
-                rank = c - ord('A') + 26
-            if other.is_num:
-                other_rank = oc - ord('0')
-            elif oc >= ord('a'):
-                other_rank = oc - ord('a')
-            else:
-                other_rank = oc - ord('A') + 26
-            if rank < other_rank:
-                return -1
-            elif rank > other_rank:
-                return 1
-        return 0
+        if self.is_num:
+            return chr(len(id_s)) + id_s
+        return chr(len(id_s)) + id_s.translate(_LETTER_RANKS)
+
+    def compare(self, other):
+        key = self.sort_key()
+        other_key = other.sort_key()
+        return (key > other_key) - (key < other_key)
+
+    def ordinal(self) -> int:
+        # Position of this part in the sequence IdPart.next walks through for its kind: 0-9, 00-99, 000-999, ...
+        # for numeric parts and a-Z, aa-ZZ, ... for letter parts.
+        base = 10 if self.is_num else 52
+        ordinal = _ordinal(self.sort_key()[1:], base)
+        if ordinal < 0:
+            raise ValueError(f"Part {self.id_str()} cannot be counted with {base} symbols")
+        return ordinal
+
+    @staticmethod
+    def text_for_ordinal(ordinal: int, is_num: bool) -> str:
+        if ordinal < 0:
+            raise ValueError(f"Part ordinal must not be negative, got {ordinal}")
+        return _text_for_ordinal(ordinal, is_num)
 
     def _last_idx(self):
         if self.sep_start < 0:
             return self.end - 1
         return self.sep_start - 1
 
-    def _first_part(self):
-        return self.value[:self.start]
-
-    def _last_part(self, last_idx):
-        return self.value[last_idx:]
-
-    def _next_char_at(self, i):
-        c: int = ord(self.value[i])
-        c += 1
-        if not self.is_num:
-            if c == ord('z') + 1:
-                c = ord('A')
-        return chr(c)
-
-    def _find_last_rollover_idx(self, last_idx):
-        rc = self._rollover_char
-        idx = -1
-        for i in range(last_idx, self.start - 1, -1):
-            c = self.value[i]
-            if c == rc:
-                idx = i
-            else:
-                break
-        return idx
-
-    def _add_part_with_rollover_last(self, last_idx, out: list[str]):
-        out.append(self.value[self.start:last_idx])
-        out.append(self._next_char_at(last_idx))
-
-    def _add_part_with_rollover_all(self, last_idx, out: list[str]):
-        rolled_over = 'a'
-        if self.is_num:
-            out.append('0')
-            rolled_over = '0'
-        else:
-            out.append('a')
-        out.append(rolled_over * (last_idx - self.start + 1))
-
-    def _add_part_with_partial_rollover(self, last_idx, last_rollover_idx, out: list[str]):
-        out.append(self.value[self.start:last_rollover_idx - 1])
-        out.append(self._next_char_at(last_rollover_idx - 1))
-        rolled_over = 'a'
-        if self.is_num:
-            rolled_over = '0'
-        out.append(rolled_over * (last_idx - last_rollover_idx + 1))
-
     def __eq__(self, other):
         return self.compare(other) == 0
 
@@ -252,3 +760,72 @@ class IdPart:
 
     def __repr__(self):
         return self.id_str()
+
+
+# Bounded LRU cache of parsed Ids keyed by their string value. It hands out the same Id instance for a value it has
+# already seen, so callers must treat interned Ids as read-only. Without a scheme the cache parses with
+# default_scheme() and empties itself whenever SEPARATORS is modified or replaced, since a different set of
+# separators can parse the same string into different parts.
+class IdCache:
+    def __init__(self, maxsize: int = 65536, scheme: Optional[IdScheme] = None):
+        if maxsize < 1:
+            raise ValueError(f"IdCache maxsize must be at least 1, got {maxsize}")
+        self.hits = 0
+        self.misses = 0
+        self._maxsize = maxsize
+        self._ids: OrderedDict[str, Id] = OrderedDict()
+        self._scheme = scheme
+        self._current = scheme
+        self._lock = Lock()
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError(f"IdCache maxsize must be at least 1, got {maxsize}")
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._ids) > maxsize:
+                self._ids.popitem(last=False)
+
+    def get(self, value: str) -> Id:
+        scheme = self._scheme
+        if scheme is None:
+            scheme = default_scheme()
+        with self._lock:
+            if scheme is not self._current:
+                self._ids.clear()
+                self._current = scheme
+            found = self._ids.get(value)
+            if found is not None:
+                self._ids.move_to_end(value)
+                self.hits += 1
+                return found
+            self.misses += 1
+        # Parse outside of the lock; two threads racing on the same new value both parse it and the last one wins.
+        parsed = Id(value, scheme)
+        with self._lock:
+            if scheme is not self._current:
+                return parsed
+            self._ids[value] = parsed
+            if len(self._ids) > self._maxsize:
+                self._ids.popitem(last=False)
+        return parsed
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, value: str):
+        return value in self._ids
+
+
+intern_cache = IdCache()
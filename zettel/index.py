@@ -0,0 +1,162 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id, IdPart, _minutes_to_structure, _ordinal, _structure_to_minutes
+
+# Sorts after every continuation of a key, so [key, key + _AFTER) is the range of all ids under key.
+_AFTER = chr(0x10FFFF)
+
+
+def _first_free(taken: list[int], ordinal: int) -> int:
+    # taken is sorted without duplicates, so taken[k] - k never decreases and stays the same exactly while the values
+    # are consecutive. That lets the end of the run starting at ordinal be found with a binary search.
+    j = bisect_left(taken, ordinal)
+    if j == len(taken) or taken[j] != ordinal:
+        return ordinal
+    run = taken[j] - j
+    lo = j
+    hi = len(taken) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if taken[mid] - mid == run:
+            lo = mid
+        else:
+            hi = mid - 1
+    return taken[lo] + 1
+
+
+def _remove(taken: list[int], ordinal: int):
+    j = bisect_left(taken, ordinal)
+    if j < len(taken) and taken[j] == ordinal:
+        del taken[j]
+
+
+# Set of Ids kept in Id.compare order in a sorted array of sort keys. Because the key of an Id starts with the key of
+# each of its ancestors, children and descendants are contiguous ranges that are found by bisection.
+#
+# For free slot lookups the index also keeps, per parent, the sorted ordinals (see IdPart.ordinal) of the children that
+# exist, once counted as numeric parts and once as letter parts. Structure ids are kept as sorted minutes.
+class ZettelIndex:
+    def __init__(self, ids: Iterable[Id] = ()):
+        self._keys: list[str] = []
+        self._ids: dict[str, Id] = {}
+        self._children: dict[str, tuple[list[int], list[int]]] = {}
+        self._minutes: list[int] = []
+        for i in ids:
+            self.add(i)
+
+    def add(self, i: Id) -> bool:
+        key = i._key
+        if key in self._ids:
+            return False
+        insort(self._keys, key)
+        self._ids[key] = i
+        if i.is_structure:
+            insort(self._minutes, _structure_to_minutes(i.value))
+            return True
+        numeric, letters = self._taken(i)
+        ranks = i.parts[-1].sort_key()[1:]
+        for taken, base in ((numeric, 10), (letters, 52)):
+            ordinal = _ordinal(ranks, base)
+            if ordinal >= 0:
+                insort(taken, ordinal)
+        return True
+
+    def remove(self, i: Id):
+        key = i._key
+        if key not in self._ids:
+            raise KeyError(i)
+        del self._ids[key]
+        del self._keys[bisect_left(self._keys, key)]
+        if i.is_structure:
+            _remove(self._minutes, _structure_to_minutes(i.value))
+            return
+        parent_key = self._parent_key(i)
+        children = self._children.get(parent_key)
+        if children is None:
+            return
+        numeric, letters = children
+        ranks = i.parts[-1].sort_key()[1:]
+        for taken, base in ((numeric, 10), (letters, 52)):
+            ordinal = _ordinal(ranks, base)
+            if ordinal >= 0:
+                _remove(taken, ordinal)
+        if not numeric and not letters:
+            del self._children[parent_key]
+
+    def get(self, i: Id) -> Optional[Id]:
+        return self._ids.get(i._key)
+
+    def children(self, i: Id) -> list[Id]:
+        if i.is_structure:
+            return []
+        key = i._key
+        keys = self._keys
+        found = []
+        pos = bisect_right(keys, key)
+        n = len(key)
+        while pos < len(keys) and keys[pos].startswith(key):
+            # Every key under i starts with the key of the child it belongs to, whether or not that child exists.
+            child_key = keys[pos][:n + 1 + ord(keys[pos][n])]
+            child = self._ids.get(child_key)
+            if child is not None:
+                found.append(child)
+            pos = bisect_left(keys, child_key + _AFTER, pos)
+        return found
+
+    def descendants(self, i: Id) -> list[Id]:
+        if i.is_structure:
+            return []
+        key = i._key
+        start = bisect_right(self._keys, key)
+        end = bisect_left(self._keys, key + _AFTER, start)
+        return [self._ids[k] for k in self._keys[start:end]]
+
+    def first_free_sibling(self, i: Id) -> Id:
+        if i.is_structure:
+            minutes = _first_free(self._minutes, _structure_to_minutes(i.value) + 1)
+            return Id(_minutes_to_structure(minutes), i.scheme)
+        last = i.parts[-1]
+        return self._first_free_part(i, last, last.ordinal() + 1)
+
+    def first_free_child(self, i: Id) -> Id:
+        if i.is_structure:
+            raise ValueError(f"Structure Id {i.value} cannot have children")
+        # Children switch between numbers and letters: 21 -> 21a -> 21a1.
+        if i.parts[-1].is_num:
+            child = Id(i.value + 'a', i.scheme)
+        else:
+            child = Id(i.value + '1', i.scheme)
+        last = child.parts[-1]
+        return self._first_free_part(child, last, last.ordinal())
+
+    def _first_free_part(self, i: Id, last: IdPart, ordinal: int) -> Id:
+        taken = self._children.get(self._parent_key(i))
+        if taken is not None:
+            if last.is_num:
+                ordinal = _first_free(taken[0], ordinal)
+            else:
+                ordinal = _first_free(taken[1], ordinal)
+        return Id(i.value[:last.start] + IdPart.text_for_ordinal(ordinal, last.is_num), i.scheme)
+
+    def _parent_key(self, i: Id) -> str:
+        return i._key[:len(i._key) - len(i.parts[-1].sort_key())]
+
+    def _taken(self, i: Id) -> tuple[list[int], list[int]]:
+        parent_key = self._parent_key(i)
+        taken = self._children.get(parent_key)
+        if taken is None:
+            taken = self._children[parent_key] = ([], [])
+        return taken
+
+    def __contains__(self, i: Id):
+        return i._key in self._ids
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Id]:
+        ids = self._ids
+        for key in self._keys:
+            yield ids[key]
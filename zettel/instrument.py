@@ -0,0 +1,115 @@
+from __future__ import annotations
+import functools
+from threading import Lock
+from time import perf_counter_ns
+from typing import Callable, Optional
+
+from zettel.id import Id
+
+# Histogram buckets by the bit length of the duration in nanoseconds, so bucket k counts calls that took at least
+# 2 ** (k - 1) and less than 2 ** k ns. 40 buckets reach about 9 minutes, anything longer lands in the last one.
+BUCKETS = 40
+
+# The instrumented operations and the attributes of Id that implement them. parse counts every Id that is made, with
+# Id() (structure ids too) or with Id._build from a key that is already known (IdBatch items, IdRange, IdTrie.loads),
+# and every split of an id into its parts, which happens the first time .parts is used. The rich comparisons count as
+# compare, so sorted(ids) and == are counted too (sorting with key=Id.sort_key compares plain strings and is not).
+# from_filename and _build are staticmethods and are swapped as such.
+OPERATIONS = {
+    'parse': ('__init__', '_build', '_split'),
+    'next': ('next',),
+    'parent': ('parent',),
+    'compare': ('compare', '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__'),
+    'from_filename': ('from_filename',),
+}
+
+
+class OpStats:
+    __slots__ = ('count', 'total_ns', 'buckets', '_lock')
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total_ns = 0
+            self.buckets = [0] * BUCKETS
+
+    def record(self, elapsed_ns: int):
+        with self._lock:
+            self.count += 1
+            self.total_ns += elapsed_ns
+            self.buckets[min(elapsed_ns.bit_length(), BUCKETS - 1)] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'count': self.count, 'total_ns': self.total_ns, 'buckets': list(self.buckets)}
+
+
+class Stats:
+    def __init__(self):
+        self.ops = {name: OpStats() for name in OPERATIONS}
+
+    def snapshot(self) -> dict[str, dict]:
+        # Plain dicts and lists, ready to hand to a metrics exporter or json.dumps.
+        return {name: op.snapshot() for name, op in self.ops.items()}
+
+    def reset(self):
+        for op in self.ops.values():
+            op.reset()
+
+
+stats = Stats()
+_originals: dict[str, object] = {}
+_switch = Lock()
+
+
+def _timed(name: str, f: Callable, callback: Optional[Callable[[str, int], None]]) -> Callable:
+    op = stats.ops[name]
+
+    @functools.wraps(f)
+    def timed(*args, **kwargs):
+        start = perf_counter_ns()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            elapsed = perf_counter_ns() - start
+            op.record(elapsed)
+            if callback is not None:
+                callback(name, elapsed)
+    return timed
+
+
+def enable(callback: Optional[Callable[[str, int], None]] = None) -> Stats:
+    # Swaps timed versions of the operations into Id. Every call is counted in stats, and passed to callback as
+    # (operation, nanoseconds) if one is given. Ids created before or after are affected alike, because the methods
+    # live on the class. Enabling again replaces the callback.
+    with _switch:
+        _restore()
+        for name, attrs in OPERATIONS.items():
+            for attr in attrs:
+                original = Id.__dict__[attr]
+                _originals[attr] = original
+                if isinstance(original, staticmethod):
+                    setattr(Id, attr, staticmethod(_timed(name, original.__func__, callback)))
+                else:
+                    setattr(Id, attr, _timed(name, original, callback))
+    return stats
+
+
+def disable():
+    # Puts the original methods back, after which instrumentation costs nothing at all.
+    with _switch:
+        _restore()
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def _restore():
+    for attr, original in _originals.items():
+        setattr(Id, attr, original)
+    _originals.clear()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import re
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id, IdScheme, default_scheme
+from zettel.scan import NOTE_EXTENSIONS, notes
+
+# [[target]] or [[target Title]] links as The Archive writes them, matched on raw bytes so files never have to be
+# decoded as a whole.
+LINK = re.compile(rb'\[\[([^\]\r\n]+)\]\]')
+
+
+def link_target(text: bytes, scheme: IdScheme) -> Optional[Id]:
+    # The interned Id a link points to, given what is between its brackets, or None if it does not point to a note.
+    # Like note file names, link targets have to start with a digit, which skips [[Wiki style]] links without
+    # trying to parse them, and with them links to letter-start ids like [[a1]] (see scan.note_stem).
+    target = text.partition(b' ')[0]
+    if not target[:1].isdigit():
+        return None
+    try:
+        return scheme.intern(target.decode())
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def read_links(path: str, scheme: Optional[IdScheme] = None) -> Iterator[Id]:
+    # Streams the note at path line by line and yields the target of every link in it, in order.
+    if scheme is None:
+        scheme = default_scheme()
+    with open(path, 'rb') as f:
+        for line in f:
+            if b'[[' not in line:
+                continue
+            for match in LINK.finditer(line):
+                i = link_target(match.group(1), scheme)
+                if i is not None:
+                    yield i
+
+
+# Forward and backward links between the notes of a vault. Forward links are kept per note path in the order they
+# first appear, backlinks per interned target Id, so ids that only differ in their separators share one entry.
+# update() re-reads a single note and only touches the backlinks of targets that were added or dropped.
+class LinkIndex:
+    @staticmethod
+    def from_vault(vault: str, recursive: bool = True, extensions: Iterable[str] = NOTE_EXTENSIONS,
+                   scheme: Optional[IdScheme] = None) -> LinkIndex:
+        index = LinkIndex(scheme)
+        for entry in notes(vault, recursive, extensions):
+            index.update(entry.path)
+        return index
+
+    def __init__(self, scheme: Optional[IdScheme] = None):
+        if scheme is None:
+            scheme = default_scheme()
+        self.scheme = scheme
+        self._forward: dict[str, tuple[Id, ...]] = {}
+        self._backward: dict[Id, set[str]] = {}
+
+    def update(self, path: str):
+        # Call whenever the note at path was created, changed or deleted.
+        try:
+            targets = tuple(dict.fromkeys(read_links(path, self.scheme)))
+        except FileNotFoundError:
+            self.remove(path)
+            return
+        old = self._forward.get(path, ())
+        self._forward[path] = targets
+        if old == targets:
+            return
+        new = set(targets)
+        for i in old:
+            if i not in new:
+                self._unlink(i, path)
+        old = set(old)
+        for i in targets:
+            if i not in old:
+                self._backward.setdefault(i, set()).add(path)
+
+    def remove(self, path: str):
+        for i in self._forward.pop(path, ()):
+            self._unlink(i, path)
+
+    def _unlink(self, i: Id, path: str):
+        paths = self._backward[i]
+        paths.discard(path)
+        if not paths:
+            del self._backward[i]
+
+    def links(self, path: str) -> tuple[Id, ...]:
+        return self._forward.get(path, ())
+
+    def backlinks(self, i: Id) -> list[str]:
+        return sorted(self._backward.get(i, ()))
+
+    def __contains__(self, path: str):
+        return path in self._forward
+
+    def __len__(self):
+        return len(self._forward)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional
+
+from zettel.id import Id, IdScheme, default_scheme
+from zettel.links import LINK, link_target
+from zettel.scan import NOTE_EXTENSIONS, note_id, notes
+from zettel.tree import IdTree
+
+_TEMP_SUFFIX = '.renumber-tmp'
+_COPY_SIZE = 1024 * 1024
+
+
+def _renamed(i: Id, source: Id, target: Id, target_text: str) -> Id:
+    # The parts of i below source, moved under target. When the first of them is not separated from source and is
+    # of the same kind as the last part of target, a separator keeps it from running into that part.
+    depth = len(source.parts)
+    rest = i.value[i.parts[depth - 1]._last_idx() + 1:]
+    if rest and rest[0] not in i.scheme.separators and i.parts[depth].is_num == target.parts[-1].is_num:
+        if i.scheme.joiner is None:
+            raise ValueError(f"{i.scheme} has no separator to join parts of the same kind with")
+        rest = i.scheme.joiner + rest
+    moved = Id(target_text + rest, i.scheme)
+    if len(moved.parts) != len(target.parts) + len(i.parts) - depth:
+        raise ValueError(f"Cannot move {i.value} to {moved.value}")
+    return moved
+
+
+def plan_move(tree: IdTree, source: Id, target: Id) -> dict[Id, Id]:
+    # Maps source and every present id below it to its new id under target. Fails if any new id is already taken by
+    # an id that is not moved itself, so applying the plan never merges two notes.
+    if source.is_structure or target.is_structure:
+        raise ValueError(f"Cannot move {source.value} to {target.value}, only Luhmann-style ids can be moved")
+    if target.sort_key().startswith(source.sort_key()):
+        raise ValueError(f"Cannot move {source.value} into its own subtree at {target.value}")
+    if tree.subtree_size(source) == 0:
+        raise ValueError(f"Cannot move {source.value}, there are no notes at or below it")
+    target_text = target.value[:target.parts[-1]._last_idx() + 1]
+    plan = {}
+    stack = [tree.node(source)]
+    while stack:
+        node = stack.pop()
+        if node.present:
+            if node.id == source:
+                plan[node.id] = target
+            else:
+                plan[node.id] = _renamed(node.id, source, target, target_text)
+        stack.extend(node.children)
+    for old, new in plan.items():
+        if new in tree and new not in plan:
+            raise ValueError(f"Cannot move {old.value} to {new.value}, it is already taken")
+    return plan
+
+
+# Per worker process state, set once by _init_worker so the mapping is not sent along with every file.
+_scheme: Optional[IdScheme] = None
+_targets: dict[str, bytes] = {}
+
+
+def _init_worker(mapping: dict[str, str], separators: str):
+    global _scheme, _targets
+    _scheme = IdScheme(separators)
+    _targets = {Id(old, _scheme).sort_key(): new.encode() for old, new in mapping.items()}
+
+
+def _replace(match: re.Match) -> bytes:
+    text = match.group(1)
+    i = link_target(text, _scheme)
+    if i is None:
+        return match.group(0)
+    new = _targets.get(i.sort_key())
+    if new is None:
+        return match.group(0)
+    _, space, title = text.partition(b' ')
+    return b'[[' + new + space + title + b']]'
+
+
+def _copy_head(path: str, out, size: int):
+    with open(path, 'rb') as f:
+        while size > 0:
+            chunk = f.read(min(size, _COPY_SIZE))
+            if not chunk:
+                break
+            out.write(chunk)
+            size -= len(chunk)
+
+
+def _rewrite(path: str) -> Optional[str]:
+    # Streams path line by line and writes a copy with its links renamed next to it. Nothing is written until the
+    # first line that changes, then everything before it is copied over in one go. Returns the path of the copy, or
+    # None if no link in the file had to change.
+    out = None
+    temp = path + _TEMP_SUFFIX
+    try:
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                new = LINK.sub(_replace, line) if b'[[' in line else line
+                if out is None:
+                    if new == line:
+                        offset += len(line)
+                        continue
+                    out = open(temp, 'wb')
+                    _copy_head(path, out, offset)
+                out.write(new)
+        if out is None:
+            return None
+        out.flush()
+        os.fsync(out.fileno())
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(temp)
+        raise
+    out.close()
+    shutil.copymode(path, temp)
+    return temp
+
+
+# Append-only record of a renumbering. The first line holds the mapping and the renames, every following line a note
+# whose rewritten copy is about to replace it, or a rename that is about to happen. A note is recorded before its copy
+# is moved into place, so after an interruption finished notes are never rewritten a second time (which could rename a
+# link twice when old and new ids overlap) and a copy that was recorded but not yet moved is simply moved on the next
+# run.
+class _Journal:
+    def __init__(self, path: str, header: dict):
+        self.path = path
+        self.header = header
+        self.done: set[str] = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                f.readline()
+                self.done.update(line[:-1] for line in f if line.endswith('\n'))
+            self._file = open(path, 'a', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+            try:
+                self._write(json.dumps(header))
+            except BaseException:
+                self._file.close()
+                raise
+
+    @staticmethod
+    def load(path: str) -> dict:
+        with open(path, encoding='utf-8') as f:
+            return json.loads(f.readline())
+
+    def _write(self, line: str):
+        self._file.write(line + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, path: str):
+        self._write(path)
+        self.done.add(path)
+
+    @property
+    def renaming(self) -> bool:
+        # Whether the renames have started, which only happens once every note was rewritten.
+        return any(path.startswith('\0') for path in self.done)
+
+    def close(self):
+        self._file.close()
+
+    def finish(self):
+        os.remove(self.path)
+
+
+def renumber(vault: str, mapping: dict[Id, Id], journal: str, workers: Optional[int] = None,
+             extensions: Iterable[str] = NOTE_EXTENSIONS, scheme: Optional[IdScheme] = None) -> tuple[int, int]:
+    # Renames the notes in mapping and rewrites every link to them in every note of the vault. Returns how many notes
+    # had links rewritten and how many were renamed.
+    #
+    # With workers, files are rewritten by a pool of that many processes. Progress is kept in the journal file, so a
+    # run that was interrupted picks up where it stopped when it is started again with the same mapping. The journal
+    # is removed once everything is done.
+    if scheme is None:
+        scheme = default_scheme()
+    extensions = tuple(extensions)
+    separators = ''.join(sorted(scheme.separators))
+    values = {old.value: new.value for old, new in mapping.items()}
+    if os.path.exists(journal):
+        header = _Journal.load(journal)
+        if header['mapping'] != values or header['separators'] != separators:
+            raise ValueError(f"Journal {journal} belongs to a different renumbering")
+    else:
+        header = {'mapping': values, 'separators': separators,
+                  'renames': _plan_renames(vault, mapping, scheme, extensions)}
+    return _apply(vault, _Journal(journal, header), workers, extensions)
+
+
+def _plan_renames(vault: str, mapping: dict[Id, Id], scheme: IdScheme, extensions: tuple[str, ...]) -> list[list[str]]:
+    # [old path, new path] of every note that gets a new id. A note can only be renamed to the path of another
+    # moved note when a subtree moves up under one of its own ancestors, and then the new id is always shallower than
+    # the old one, so renaming shallow ids first frees every path before it is reused.
+    renames = []
+    for entry in notes(vault, True, extensions):
+        old = note_id(entry.name, extensions, scheme)
+        new = None if old is None else mapping.get(old)
+        if new is not None:
+            path = os.path.join(os.path.dirname(entry.path), new.value + entry.name[len(old.value):])
+            renames.append((len(old.parts), entry.path, path))
+    renames.sort()
+    return [[old_path, path] for _, old_path, path in renames]
+
+
+def _apply(vault: str, log: _Journal, workers: Optional[int], extensions: tuple[str, ...]) -> tuple[int, int]:
+    try:
+        rewritten = _rewrite_all(vault, log, workers, extensions)
+        renamed = _rename_all(log)
+    finally:
+        log.close()
+    log.finish()
+    return rewritten, renamed
+
+
+def _rewrite_all(vault: str, log: _Journal, workers: Optional[int], extensions: tuple[str, ...]) -> int:
+    mapping = log.header['mapping']
+    separators = log.header['separators']
+    for path in log.done:
+        # Recorded, but interrupted before the copy was moved into place.
+        if os.path.exists(path + _TEMP_SUFFIX):
+            os.replace(path + _TEMP_SUFFIX, path)
+    if log.renaming:
+        # Every note was rewritten before the first rename. Scanning again would find the renamed notes under paths
+        # that are not in the journal and rewrite their links a second time.
+        return 0
+    todo = [entry.path for entry in notes(vault, True, extensions) if entry.path not in log.done]
+    for path in todo:
+        if os.path.exists(path + _TEMP_SUFFIX):
+            os.remove(path + _TEMP_SUFFIX)
+    if workers:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(mapping, separators)) as pool:
+            rewritten = _commit(log, todo, pool.map(_rewrite, todo, chunksize=64))
+    else:
+        _init_worker(mapping, separators)
+        rewritten = _commit(log, todo, map(_rewrite, todo))
+    return rewritten
+
+
+def _rename_all(log: _Journal) -> int:
+    renamed = 0
+    for k, (old_path, path) in enumerate(log.header['renames']):
+        # Renames are recorded like rewrites, under a name no path can have, because after a subtree moved up under
+        # its own ancestor another note may already sit at the old path of a finished rename.
+        mark = f'\0{k}'
+        if mark in log.done:
+            if os.path.exists(old_path) and not os.path.exists(path):
+                os.rename(old_path, path)
+                renamed += 1
+            continue
+        if os.path.exists(path):
+            raise FileExistsError(f"Cannot rename {old_path} to {path}, it already exists")
+        log.record(mark)
+        os.rename(old_path, path)
+        renamed += 1
+    return renamed
+
+
+def _commit(log: _Journal, paths: list[str], results: Iterable[Optional[str]]) -> int:
+    rewritten = 0
+    for path, temp in zip(paths, results):
+        log.record(path)
+        if temp is not None:
+            os.replace(temp, path)
+            rewritten += 1
+    return rewritten
+
+
+def move(vault: str, source: Id, target: Id, journal: str, workers: Optional[int] = None,
+         extensions: Iterable[str] = NOTE_EXTENSIONS) -> tuple[int, int]:
+    # Moves the subtree at source to target, see plan_move and renumber. If journal exists, the move it records is
+    # resumed instead. Once nothing is left at or below source and there are notes at or below target, there is
+    # nothing left to do and nothing is touched.
+    extensions = tuple(extensions)
+    if os.path.exists(journal):
+        return _apply(vault, _Journal(journal, _Journal.load(journal)), workers, extensions)
+    tree = IdTree(i for i in (note_id(entry.name, extensions, source.scheme) for entry in notes(vault, True, extensions))
+                  if i is not None)
+    if tree.subtree_size(source) == 0 and tree.subtree_size(target) > 0:
+        return 0, 0
+    return renumber(vault, plan_move(tree, source, target), journal, workers, extensions, source.scheme)
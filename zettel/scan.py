@@ -0,0 +1,143 @@
+from __future__ import annotations
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id, IdScheme
+
+NOTE_EXTENSIONS = ('.md', '.txt', '.markdown')
+
+_BATCH_SIZE = 256
+_DONE = object()
+
+
+def note_stem(name: str, extensions: Iterable[str] = NOTE_EXTENSIONS) -> Optional[str]:
+    # Returns the name without its extension if it looks like a note named the way The Archive names them, e.g.
+    # "202001020304 Title.md" or "21a Title.md", and None otherwise. Only looks at the name, never touches the disk.
+    # Letter-start ids are left out on purpose: "a1 Title.md" cannot be told apart from "README.md" by its name.
+    if not name or not name[0].isdigit():
+        return None
+    for ext in extensions:
+        if name.endswith(ext):
+            return name[:-len(ext)]
+    return None
+
+
+def note_id(name: str, extensions: Iterable[str] = NOTE_EXTENSIONS, scheme: Optional[IdScheme] = None) -> Optional[Id]:
+    # The id of the note named name, or None if it is not a note or its name is not an id of scheme, e.g. "1\nx.md".
+    # Walks over a vault skip such files instead of stopping at them.
+    stem = note_stem(name, extensions)
+    if stem is None:
+        return None
+    try:
+        return Id.from_filename(stem, scheme)
+    except ValueError:
+        return None
+
+
+def _visit(directory: str, recursive: bool, extensions: tuple[str, ...]) -> Iterator[tuple[bool, os.DirEntry]]:
+    # Yields (is_dir, entry) for the note files and, when recursive, the subdirectories of one directory.
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                continue
+            if note_stem(name, extensions) is not None:
+                if entry.is_file():
+                    yield False, entry
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                yield True, entry
+
+
+def notes(vault: str, recursive: bool = True, extensions: Iterable[str] = NOTE_EXTENSIONS) -> Iterator[os.DirEntry]:
+    # Lazily yields the os.DirEntry of every note in vault without parsing any ids. Hidden files and directories are
+    # skipped. Nothing is collected up front, so memory use does not grow with the size of the vault.
+    extensions = tuple(extensions)
+    directories = [vault]
+    while directories:
+        for is_dir, entry in _visit(directories.pop(), recursive, extensions):
+            if is_dir:
+                directories.append(entry.path)
+            else:
+                yield entry
+
+
+def scan(vault: str, recursive: bool = True, extensions: Iterable[str] = NOTE_EXTENSIONS,
+         workers: Optional[int] = None, scheme: Optional[IdScheme] = None) -> Iterator[tuple[Id, str]]:
+    # Lazily yields (Id, path) for every note in vault, see notes().
+    #
+    # With workers, directories are listed by a thread pool, which helps on network filesystems where every
+    # directory read and stat is a round trip. Results are then yielded in no particular order.
+    extensions = tuple(extensions)
+    if workers:
+        yield from _scan_threaded(vault, recursive, extensions, workers, scheme)
+        return
+    for entry in notes(vault, recursive, extensions):
+        i = note_id(entry.name, extensions, scheme)
+        if i is not None:
+            yield i, entry.path
+
+
+def _scan_threaded(vault: str, recursive: bool, extensions: tuple[str, ...], workers: int,
+                   scheme: Optional[IdScheme]) -> Iterator[tuple[Id, str]]:
+    # Workers hand batches of results to the consumer through a bounded queue, so a slow consumer makes them wait
+    # instead of letting results pile up.
+    results: queue.Queue = queue.Queue(maxsize=workers * 4)
+    stop = threading.Event()
+    lock = threading.Lock()
+    pending = 1
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def visit(directory: str):
+        nonlocal pending
+        try:
+            batch = []
+            for is_dir, entry in _visit(directory, recursive, extensions):
+                if stop.is_set():
+                    return
+                if is_dir:
+                    with lock:
+                        pending += 1
+                    pool.submit(visit, entry.path)
+                    continue
+                i = note_id(entry.name, extensions, scheme)
+                if i is None:
+                    continue
+                batch.append((i, entry.path))
+                if len(batch) >= _BATCH_SIZE:
+                    if not put(batch):
+                        return
+                    batch = []
+            if batch:
+                put(batch)
+        except BaseException as e:
+            put(e)
+        finally:
+            with lock:
+                pending -= 1
+                done = pending == 0
+            if done:
+                put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pool.submit(visit, vault)
+        try:
+            while True:
+                batch = results.get()
+                if batch is _DONE:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                yield from batch
+        finally:
+            stop.set()
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id, IdScheme, _STRUCTURE_KEY_PREFIX, default_scheme
+from zettel.scan import NOTE_EXTENSIONS
+from zettel.store import VaultIndex
+
+# Free slots are looked for this many candidates at a time.
+_FREE_BATCH = 64
+
+
+def _refresh(database: str, vault: str, recursive: bool, extensions: tuple[str, ...],
+             separators: str) -> tuple[int, int]:
+    # Runs in a worker process, which opens the shard itself because SQLite connections cannot be shared between
+    # processes.
+    with VaultIndex(database, vault, recursive, extensions, IdScheme(separators)) as index:
+        return index.refresh()
+
+
+# The notes of many vaults, one VaultIndex shard per vault, all kept in one directory as <name>.sqlite. vaults maps
+# the name of every vault to its path. Shards are refreshed side by side, and queries go to every shard's own key index,
+# so nothing is held in memory except what a query returns: iteration merges the shards' ordered cursors and lookups
+# are index searches.
+class ShardedIndex:
+    def __init__(self, directory: str, vaults: dict[str, str], recursive: bool = True,
+                 extensions: Iterable[str] = NOTE_EXTENSIONS, scheme: Optional[IdScheme] = None):
+        if scheme is None:
+            scheme = default_scheme()
+        self.directory = directory
+        self.recursive = recursive
+        self.extensions = tuple(extensions)
+        self.scheme = scheme
+        self.shards: dict[str, VaultIndex] = {}
+        os.makedirs(directory, exist_ok=True)
+        try:
+            # In name order, which is the order vaults are listed in for ids that are in more than one.
+            for name in sorted(vaults):
+                if not name or name.startswith('.') or os.sep in name or (os.altsep and os.altsep in name):
+                    raise ValueError(f"Cannot use {name!r} as the name of a shard")
+                self.shards[name] = VaultIndex(self._database(name), vaults[name], recursive, self.extensions, scheme)
+        except BaseException:
+            self.close()
+            raise
+
+    def _database(self, name: str) -> str:
+        return os.path.join(self.directory, name + '.sqlite')
+
+    def refresh(self, workers: Optional[int] = None) -> dict[str, tuple[int, int]]:
+        # Refreshes every shard (see VaultIndex.refresh) and returns what changed per vault. With workers, shards are
+        # refreshed by a pool of that many processes.
+        if workers is None:
+            return {name: shard.refresh() for name, shard in self.shards.items()}
+        names = list(self.shards)
+        separators = ''.join(sorted(self.scheme.separators))
+        with ProcessPoolExecutor(workers) as pool:
+            results = pool.map(_refresh, [self._database(name) for name in names],
+                               [self.shards[name].vault for name in names], [self.recursive] * len(names),
+                               [self.extensions] * len(names), [separators] * len(names))
+            return dict(zip(names, results))
+
+    def lookup(self, i: Id) -> list[tuple[str, str]]:
+        # (vault, path) of every note with the id, in any vault.
+        return [(name, path) for name, shard in self.shards.items() for path in shard.lookup(i)]
+
+    def lookup_many(self, ids: Iterable[Id]) -> list[list[tuple[str, str]]]:
+        ids = list(ids)
+        found: list[list[tuple[str, str]]] = [[] for _ in ids]
+        for name, shard in self.shards.items():
+            for paths, out in zip(shard.lookup_many(ids), found):
+                out.extend((name, path) for path in paths)
+        return found
+
+    def first_free_sibling(self, i: Id) -> Id:
+        # The first id after i, in next() order, that no vault uses.
+        while True:
+            candidates = list(i.next_n(_FREE_BATCH))
+            for candidate, found in zip(candidates, self.lookup_many(candidates)):
+                if not found:
+                    return candidate
+            i = candidates[-1]
+
+    def values(self) -> Iterator[tuple[str, str, str]]:
+        # (value, vault, path) of the notes of all vaults in Id order, without parsing anything.
+        for _, value, name, path in self._merged():
+            yield value, name, path
+
+    def _merged(self) -> Iterator[tuple[str, str, str, str]]:
+        # A k-way merge of the shards, which are each read in Id order a batch at a time.
+        def rows(name: str, shard: VaultIndex) -> Iterator[tuple[str, str, str, str]]:
+            for key, value, path in shard.rows():
+                yield key, value, name, path
+        return heapq.merge(*(rows(name, shard) for name, shard in self.shards.items()), key=lambda row: row[0])
+
+    def close(self):
+        for shard in self.shards.values():
+            shard.close()
+
+    def __enter__(self) -> ShardedIndex:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, i: Id):
+        return any(i in shard for shard in self.shards.values())
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards.values())
+
+    def __iter__(self) -> Iterator[tuple[Id, str, str]]:
+        # (Id, vault, path) in Id order. The Ids are built from their stored sort keys instead of being parsed again.
+        scheme = self.scheme
+        for key, value, name, path in self._merged():
+            yield Id._build(value, scheme, key.startswith(_STRUCTURE_KEY_PREFIX), None, key), name, path
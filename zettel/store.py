@@ -0,0 +1,124 @@
+from __future__ import annotations
+import sqlite3
+from threading import Lock
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id, IdScheme, default_scheme
+from zettel.scan import NOTE_EXTENSIONS, note_id, notes
+
+# Bump whenever the format of Id sort keys changes, so indexes written with the old keys are rebuilt.
+KEY_VERSION = 2
+_MMAP_SIZE = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_key ON notes (key);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# Persistent index of the notes in a vault, stored in an SQLite file that is read through mmap. refresh() only parses
+# the ids of files whose mtime or inode changed since they were last indexed. Rows are ordered by Id sort key, which
+# SQLite compares as UTF-8 bytes and so in the same order as Id.compare. The index is rebuilt from scratch when it was
+# written with a different KEY_VERSION or with different separators.
+class VaultIndex:
+    def __init__(self, database: str, vault: str, recursive: bool = True,
+                 extensions: Iterable[str] = NOTE_EXTENSIONS, scheme: Optional[IdScheme] = None):
+        self.vault = vault
+        self.recursive = recursive
+        self.extensions = tuple(extensions)
+        if scheme is None:
+            scheme = default_scheme()
+        self.scheme = scheme
+        separators = ''.join(sorted(scheme.separators))
+        self._lock = Lock()
+        self._db = sqlite3.connect(database, check_same_thread=False)
+        self._db.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        self._db.executescript(_SCHEMA)
+        stored = self._db.execute("SELECT value FROM meta WHERE name = 'separators'").fetchone()
+        if version != KEY_VERSION or stored is None or stored[0] != separators:
+            with self._db:
+                self._db.execute("DELETE FROM notes")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('separators', ?)", (separators,))
+        self._db.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        self._db.commit()
+
+    def refresh(self) -> tuple[int, int]:
+        # Returns how many files were (re)parsed and how many were dropped because they no longer exist.
+        with self._lock:
+            known = {path: (mtime_ns, inode) for path, mtime_ns, inode in
+                     self._db.execute("SELECT path, mtime_ns, inode FROM notes")}
+            changed = []
+            for entry in notes(self.vault, self.recursive, self.extensions):
+                i = note_id(entry.name, self.extensions, self.scheme)
+                if i is None:
+                    continue
+                stat = entry.stat()
+                state = known.pop(entry.path, None)
+                if state == (stat.st_mtime_ns, stat.st_ino):
+                    continue
+                changed.append((entry.path, stat.st_mtime_ns, stat.st_ino, i.value, i._key))
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?)", changed)
+                self._db.executemany("DELETE FROM notes WHERE path = ?", ((path,) for path in known))
+            return len(changed), len(known)
+
+    def lookup(self, i: Id) -> list[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT path FROM notes WHERE key = ? ORDER BY path", (i._key,)).fetchall()
+        return [path for path, in rows]
+
+    def lookup_many(self, ids: Iterable[Id]) -> list[list[str]]:
+        # lookup for every id in one go, taking the lock once.
+        query = "SELECT path FROM notes WHERE key = ? ORDER BY path"
+        with self._lock:
+            return [[path for path, in self._db.execute(query, (i._key,))] for i in ids]
+
+    def values(self) -> Iterator[tuple[str, str]]:
+        # (value, path) in Id order, without parsing anything.
+        return self._stream("SELECT value, path FROM notes ORDER BY key, path")
+
+    def rows(self) -> Iterator[tuple[str, str, str]]:
+        # (sort key, value, path) in Id order, for merging with other indexes without parsing anything.
+        return self._stream("SELECT key, value, path FROM notes ORDER BY key, path")
+
+    def _stream(self, query: str) -> Iterator[tuple]:
+        with self._lock:
+            cursor = self._db.execute(query)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(1024)
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self) -> VaultIndex:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, i: Id):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM notes WHERE key = ? LIMIT 1", (i._key,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def __iter__(self) -> Iterator[tuple[Id, str]]:
+        for value, path in self.values():
+            yield Id(value, self.scheme), path
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase
+
+from zettel import aio
+from zettel.aio import AsyncAllocator, AsyncVaultIndex
+from zettel.allocator import IdAllocator
+from zettel.id import Id
+
+
+def _touch(*parts):
+    with open(os.path.join(*parts), 'w'):
+        pass
+
+
+class FixedClock:
+    def __call__(self):
+        return Id("200010111223")
+
+
+class TestScan(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = self._dir.name
+        for n in range(50):
+            _touch(self.vault, f"{n + 1} Note.md")
+        os.mkdir(os.path.join(self.vault, "sub"))
+        _touch(self.vault, "sub", "21a1 Nested.md")
+        _touch(self.vault, "README.md")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    async def test_scan(self):
+        found = [(i.value, path) async for i, path in aio.scan(self.vault, batch_size=7, prefetch=1)]
+        self.assertEqual(51, len(found))
+        self.assertIn(("21a1", os.path.join(self.vault, "sub", "21a1 Nested.md")), found)
+
+    async def test_stop_early(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            scan = aio.scan(self.vault, batch_size=2, prefetch=1, executor=executor)
+            async for _ in scan:
+                break
+            await scan.aclose()
+
+    async def test_missing(self):
+        with self.assertRaises(FileNotFoundError):
+            async for _ in aio.scan(os.path.join(self.vault, "missing")):
+                pass
+
+
+class TestAsyncAllocator(IsolatedAsyncioTestCase):
+    async def test_next_structure(self):
+        allocator = AsyncAllocator(IdAllocator(clock=FixedClock()))
+        self.assertEqual("200010111223", (await allocator.next_structure()).value)
+        self.assertEqual(["200010111224", "200010111225"], [i.value for i in await allocator.allocate(2)])
+
+    async def test_state_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            allocator = AsyncAllocator(IdAllocator(os.path.join(d, "ids"), clock=FixedClock()))
+            ids = await asyncio.gather(*(allocator.next_structure() for _ in range(10)))
+            self.assertEqual(10, len(set(ids)))
+
+
+class TestAsyncVaultIndex(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = os.path.join(self._dir.name, "vault")
+        os.mkdir(self.vault)
+        self.database = os.path.join(self._dir.name, "index.sqlite")
+        _touch(self.vault, "21 First.md")
+        _touch(self.vault, "21a Second.md")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    async def test_lookup(self):
+        async with await AsyncVaultIndex.open(self.database, self.vault) as index:
+            self.assertEqual((2, 0), await index.refresh())
+            self.assertEqual([os.path.join(self.vault, "21a Second.md")], await index.lookup(Id("21a")))
+            self.assertFalse(await index.contains(Id("22")))
+
+    async def test_lookups_are_batched(self):
+        async with await AsyncVaultIndex.open(self.database, self.vault) as index:
+            await index.refresh()
+            calls = []
+            lookup_many = index.index.lookup_many
+
+            def counted(ids):
+                calls.append(len(ids))
+                return lookup_many(ids)
+            index.index.lookup_many = counted
+            results = await asyncio.gather(*(index.lookup(Id(v)) for v in ["21", "21a", "22"] * 10))
+            self.assertEqual([30], calls)
+            self.assertEqual([1, 1, 0] * 10, [len(paths) for paths in results])
+
+
+if __name__ == '__main__':
+    unittest.main()
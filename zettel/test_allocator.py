@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from zettel import allocator
+from zettel.allocator import IdAllocator
+from zettel.id import Id
+
+
+class FixedClock:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return Id(self.value)
+
+
+class TestIdAllocator(TestCase):
+    def test_first_is_now(self):
+        a = IdAllocator(clock=FixedClock("200010111223"))
+        self.assertEqual("200010111223", a.next().value)
+
+    def test_same_minute(self):
+        a = IdAllocator(clock=FixedClock("200010111259"))
+        values = [a.next().value for _ in range(3)]
+        self.assertEqual(["200010111259", "200010111300", "200010111301"], values)
+
+    def test_clock_moves_ahead(self):
+        clock = FixedClock("200010111223")
+        a = IdAllocator(clock=clock)
+        a.next()
+        clock.value = "200010111300"
+        self.assertEqual("200010111300", a.next().value)
+
+    def test_clock_moves_back(self):
+        clock = FixedClock("200010111223")
+        a = IdAllocator(clock=clock)
+        a.next()
+        clock.value = "200010111200"
+        self.assertEqual("200010111224", a.next().value)
+
+    def test_allocate_batch(self):
+        a = IdAllocator(clock=FixedClock("200012312358"))
+        values = [i.value for i in a.allocate(3)]
+        self.assertEqual(["200012312358", "200012312359", "200101010000"], values)
+        self.assertEqual("200101010001", a.next().value)
+
+    def test_allocate_nothing(self):
+        a = IdAllocator()
+        self.assertRaises(ValueError, a.allocate, 0)
+
+    def test_threads(self):
+        a = IdAllocator(clock=FixedClock("200010111223"))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            batches = list(pool.map(lambda _: a.allocate(5), range(200)))
+        values = [i.value for batch in batches for i in batch]
+        self.assertEqual(1000, len(set(values)))
+        for batch in batches:
+            self.assertEqual(4, batch[0].distance(batch[-1]))
+
+    def test_state_file_shared(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "ids")
+            clock = FixedClock("200010111223")
+            first = IdAllocator(path, clock=clock)
+            second = IdAllocator(path, clock=clock)
+            values = []
+            for _ in range(5):
+                values.append(first.next().value)
+                values.extend(i.value for i in second.allocate(2))
+            self.assertEqual(15, len(set(values)))
+            self.assertEqual(values, sorted(values))
+            with open(path) as f:
+                self.assertEqual(values[-1], f.read())
+
+    def test_state_file_survives_restart(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "ids")
+            clock = FixedClock("200010111223")
+            IdAllocator(path, clock=clock).allocate(3)
+            self.assertEqual("200010111226", IdAllocator(path, clock=clock).next().value)
+
+    def test_state_file_without_fcntl(self):
+        with mock.patch.object(allocator, 'fcntl', None):
+            self.assertRaises(OSError, IdAllocator, "ids")
+            IdAllocator()
+
+
+if __name__ == '__main__':
+    unittest.main()
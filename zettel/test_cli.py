@@ -0,0 +1,158 @@
+import io
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import TestCase
+
+from zettel import cli
+
+
+def _run(*argv, stdin=''):
+    out = io.StringIO()
+    err = io.StringIO()
+    old = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = io.StringIO(stdin), out, err
+    try:
+        code = cli.main(list(argv))
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = old
+    return code, out.getvalue(), err.getvalue()
+
+
+class TestCli(TestCase):
+    def test_next(self):
+        self.assertEqual((0, "21b\n21.4\n", ""), _run("next", "21a", "21.3"))
+        self.assertEqual((0, "21b\n21c\n21d\n", ""), _run("next", "-n", "3", "21a"))
+        self.assertEqual((0, "21b\n21c\n", ""), _run("next", "-n=2", "21a"))
+
+    def test_stdin(self):
+        self.assertEqual((0, "21b\n3\n", ""), _run("next", stdin="21a\n\n  2  \n"))
+        self.assertEqual((0, "3\n21a\n21/3\n", ""), _run("sort", stdin="21/3\n3\n21a\n"))
+
+    def test_streams_stdin_in_chunks(self):
+        values = [str(n) for n in range(1, cli._CHUNK * 2 + 2)]
+        code, out, _ = _run("parent", stdin=''.join(f"1a{v}\n" for v in values))
+        self.assertEqual(0, code)
+        self.assertEqual(len(values), out.count("1a\n"))
+
+    def test_parent(self):
+        code, out, err = _run("parent", "21a3", "21")
+        self.assertEqual(1, code)
+        self.assertEqual("21a\n", out)
+        self.assertTrue(err.startswith("zettel: 21: "))
+
+    def test_sort(self):
+        self.assertEqual((0, "202001020304\n3\n21a\n21/3\n", ""), _run("sort", "21/3", "21a", "3", "202001020304"))
+
+    def test_check_duplicates(self):
+        self.assertEqual((0, "", ""), _run("check-duplicates", "21", "21a"))
+        self.assertEqual((1, "3 3\n21/3 21.3\n", ""), _run("check-duplicates", "21a", "3", "21/3", "21.3", "3"))
+        self.assertEqual((1, "21.1 21b 21/1\n2.0 2a\n1 b\n", ""),
+                         _run("check-duplicates", "21.1", "21b", "2.0", "2a", "1", "b", "21/1"))
+
+    def test_structure(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            state = os.path.join(tmp, "state")
+            _, first, _ = _run("structure", "--state-file", state)
+            _, more, _ = _run("structure", "-n", "2", "--state-file", state)
+        first = first.split()
+        more = more.split()
+        self.assertEqual(1, len(first))
+        self.assertEqual(2, len(more))
+        self.assertEqual(3, len(set(first + more)))
+        self.assertTrue(all(len(v) == 12 and v.isdigit() for v in first + more))
+
+    def test_usage(self):
+        self.assertEqual(2, _run()[0])
+        code, _, err = _run("bogus")
+        self.assertEqual(2, code)
+        self.assertIn("unknown command", err)
+        self.assertEqual(2, _run("next", "-x", "21")[0])
+        self.assertEqual(2, _run("next", "-n", "0", "21")[0])
+        self.assertEqual(2, _run("next", "-n")[0])
+        self.assertEqual(2, _run("structure", "21")[0])
+        code, out, _ = _run("--help")
+        self.assertEqual(0, code)
+        self.assertEqual(cli.USAGE, out)
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), "needs Unix sockets")
+class TestServe(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "zettel.sock")
+        self.server = cli._server(self.path, os.path.join(self.tmp.name, "state"))
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _connect(self):
+        client = socket.socket(socket.AF_UNIX)
+        client.connect(self.path)
+        self.addCleanup(client.close)
+        return client, client.makefile('rwb')
+
+    def _ask(self, f, line):
+        f.write(line.encode() + b'\n')
+        f.flush()
+        lines = []
+        while True:
+            answer = f.readline().decode()
+            if answer == '\n':
+                return lines
+            lines.append(answer.rstrip('\n'))
+
+    def test_commands(self):
+        _, f = self._connect()
+        self.assertEqual(["21b", "21.4"], self._ask(f, "next 21a 21.3"))
+        self.assertEqual(["21a", "21/3"], self._ask(f, "sort 21/3 21a"))
+        self.assertEqual(["3 3"], self._ask(f, "check-duplicates 3 3"))
+        # Nothing was given, so nothing is read.
+        self.assertEqual([], self._ask(f, "next"))
+
+    def test_errors(self):
+        _, f = self._connect()
+        answer = self._ask(f, "parent 21 21a")
+        self.assertEqual("21", answer[1])
+        self.assertTrue(answer[0].startswith("zettel: 21: "))
+        self.assertEqual(["zettel: unknown command 'bogus'"], self._ask(f, "bogus"))
+        self.assertEqual(["zettel: already serving"], self._ask(f, "serve x"))
+        answer = self._ask(f, f"structure --state-file {os.path.join(self.tmp.name, 'other')}")
+        self.assertEqual(["zettel: --state-file can only be given when the server is started"], answer)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'other')))
+
+    def test_existing_paths(self):
+        path = os.path.join(self.tmp.name, "notes.md")
+        with open(path, 'w') as f:
+            f.write("21 Keep me")
+        self.assertRaises(cli.UsageError, cli._server, path)
+        code, _, err = _run("serve", path)
+        self.assertEqual(2, code)
+        self.assertIn("exists and is not a socket", err)
+        with open(path) as f:
+            self.assertEqual("21 Keep me", f.read())
+        self.assertRaises(cli.UsageError, cli._server, self.tmp.name)
+        # A socket nobody listens on any more is replaced.
+        path = os.path.join(self.tmp.name, "stale.sock")
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(path)
+        stale.close()
+        cli._server(path).server_close()
+
+    def test_structure_is_shared(self):
+        _, a = self._connect()
+        _, b = self._connect()
+        values = self._ask(a, "structure -n 2") + self._ask(b, "structure") + self._ask(a, "structure")
+        self.assertEqual(4, len(set(values)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import random
+import unittest
+from unittest import TestCase
+
+from zettel import columns
+from zettel.columns import MISSING, part_code, to_columns
+from zettel.id import Id
+
+
+def _ids(*values):
+    return [Id(v) for v in values]
+
+
+class TestPartCode(TestCase):
+    def test_orders_like_parts(self):
+        values = ["1", "9", "a", "z", "A", "Z", "10", "aa", "ZZ", "100", "aaa"]
+        keys = sorted((Id(v).parts[0].sort_key() for v in values))
+        codes = [part_code(k) for k in keys]
+        self.assertEqual(sorted(codes), codes)
+        self.assertEqual(len(set(codes)), len(codes))
+
+    def test_equal_parts_have_equal_codes(self):
+        # Like Id.compare, 1 and b are the same part.
+        self.assertEqual(part_code(Id("1").parts[0].sort_key()), part_code(Id("b").parts[0].sort_key()))
+        self.assertEqual(list(to_columns(_ids("21.1"), use_numpy=False).parts),
+                         list(to_columns(_ids("21b"), use_numpy=False).parts))
+
+    def test_too_long(self):
+        self.assertRaises(OverflowError, part_code, Id("a" * 13).parts[0].sort_key())
+        part_code(Id("Z" * 11).parts[0].sort_key())
+
+    def test_not_encodable(self):
+        self.assertRaises(ValueError, part_code, Id("1ä").parts[1].sort_key())
+
+
+class TestToColumns(TestCase):
+    def test_columns(self):
+        c = to_columns(_ids("21a3", "202001020304", "3"), use_numpy=False)
+        self.assertEqual(["21a3", "202001020304", "3"], c.values)
+        self.assertEqual([0, 1, 0], list(c.is_structure))
+        self.assertEqual([0, Id("000101010000").distance(Id("202001020304")), 0], list(c.minutes))
+        self.assertEqual([3, 0, 1], list(c.depth))
+        self.assertEqual(3, c.width)
+        self.assertEqual([MISSING] * 3, list(c.parts[3:6]))
+        self.assertEqual(MISSING, c.parts[7])
+
+    def test_width(self):
+        self.assertEqual(5, to_columns(_ids("21a"), width=5, use_numpy=False).width)
+        self.assertRaises(ValueError, to_columns, _ids("21a3"), width=2, use_numpy=False)
+        self.assertEqual(0, len(to_columns([], use_numpy=False)))
+
+    def test_batch(self):
+        values = ["21a3", "202001020304", "3"]
+        batch = to_columns(Id.parse_many(values), use_numpy=False)
+        ids = to_columns(_ids(*values), use_numpy=False)
+        self.assertEqual(list(ids.parts), list(batch.parts))
+        self.assertEqual(list(ids.minutes), list(batch.minutes))
+
+    def _check_order(self, use_numpy):
+        rng = random.Random(2)
+        values = ["202001020304", "200001020304", "21", "21a", "21.3", "211", "3", "21.1", "21b", "21.1a", "21bb"]
+        values += [str(rng.randint(1, 30)) + rng.choice(["", "a", "b1", "Z.2"]) for _ in range(200)]
+        rng.shuffle(values)
+        c = to_columns(_ids(*values), use_numpy=use_numpy)
+        self.assertEqual(sorted(_ids(*values)), [Id(values[r]) for r in c.order()])
+
+    def test_order(self):
+        self._check_order(False)
+
+    @unittest.skipIf(columns.numpy is None, "NumPy is not installed")
+    def test_order_numpy(self):
+        self._check_order(True)
+
+    @unittest.skipIf(columns.numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        c = to_columns(_ids("21a3", "202001020304", "3"))
+        self.assertEqual((3, 3), c.parts.shape)
+        self.assertEqual("int64", str(c.minutes.dtype))
+
+    @unittest.skipIf(columns.numpy is not None, "NumPy is installed")
+    def test_without_numpy(self):
+        self.assertRaises(ImportError, to_columns, _ids("21"), use_numpy=True)
+        self.assertEqual(1, len(to_columns(_ids("21")).depth))
+
+
+if __name__ == '__main__':
+    unittest.main()
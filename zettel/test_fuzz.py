@@ -0,0 +1,139 @@
+import contextlib
+import io
+import random
+import unittest
+from unittest import TestCase, mock
+
+from zettel import _original, fuzz, id as zid
+from zettel.id import Id, IdScheme
+
+
+class TestReference(TestCase):
+    def test_next(self):
+        separators = zid.DEFAULT_SEPARATORS
+        self.assertEqual("21b", fuzz.reference_next("21a", separators))
+        self.assertEqual("21A", fuzz.reference_next("21z", separators))
+        self.assertEqual("21aa", fuzz.reference_next("21Z", separators))
+        self.assertEqual("21.000.", fuzz.reference_next("21.99.", separators))
+        self.assertEqual("202101010000", fuzz.reference_next("202012312359", separators))
+
+    def test_parent_and_compare(self):
+        separators = zid.DEFAULT_SEPARATORS
+        self.assertEqual("21", fuzz.reference_parent("21.3", separators))
+        self.assertEqual("21", fuzz.reference_parent("21a", separators))
+        self.assertIsNone(fuzz.reference_parent("21", separators))
+        self.assertEqual(-1, fuzz.reference_compare("202001020304", "1", separators))
+        self.assertEqual(-1, fuzz.reference_compare("9", "10", separators))
+        self.assertEqual(-1, fuzz.reference_compare("21z", "21A", separators))
+        self.assertEqual(0, fuzz.reference_compare("21/3", "21.3", separators))
+        self.assertEqual(0, fuzz.reference_compare("21.1", "21b", separators))
+        self.assertEqual(0, fuzz.reference_compare("a", "0", separators))
+
+    def test_without_deviations_is_the_original(self):
+        rng = random.Random(8)
+        for separators in [zid.DEFAULT_SEPARATORS, "_!"]:
+            scheme = IdScheme(separators)
+            values = [fuzz.random_luhmann(rng, scheme) for _ in range(500)] + [fuzz.random_structure(rng)]
+            values += [fuzz.random_text(rng) for _ in range(500)]
+            with mock.patch.object(_original, 'SEPARATORS', set(separators)):
+                for value in values:
+                    if fuzz._is_structure(value):
+                        continue
+                    original = [(p.start, p.end, p.sep_start, p.is_num) for p in _original.Id(value).parts]
+                    self.assertEqual(original, fuzz.reference_parse(value, separators, ()), value)
+                for a, b in zip(values, reversed(values)):
+                    try:
+                        expected = _original.Id(a).compare(_original.Id(b))
+                    except AttributeError:
+                        self.assertRaises(AttributeError, fuzz.reference_compare, a, b, separators, ())
+                        continue
+                    self.assertEqual(expected, fuzz.reference_compare(a, b, separators, ()), (a, b))
+
+    def test_deviations(self):
+        separators = zid.DEFAULT_SEPARATORS
+        self.assertEqual([(0, 2, 2, True), (3, 5, -1, True)], fuzz.reference_parse("21.3a", separators, ()))
+        self.assertEqual([(0, 2, 2, True), (3, 4, -1, True), (4, 5, -1, False)],
+                         fuzz.reference_parse("21.3a", separators))
+        self.assertEqual(-1, fuzz.reference_compare("22", "21a", separators, ()))
+        self.assertEqual(1, fuzz.reference_compare("22", "21a", separators))
+        self.assertEqual(1, fuzz.reference_compare("a.1", "a1", separators, ()))
+        self.assertEqual(0, fuzz.reference_compare("a.1", "a1", separators))
+        self.assertEqual(2, len(fuzz.reference_parse("21..", separators, ())))
+        self.assertEqual(1, len(fuzz.reference_parse("21..", separators)))
+        report = fuzz.run(300, seed=6)
+        self.assertTrue(report.ok, str(report))
+        self.assertEqual(set(fuzz.DEVIATIONS), set(report.deviations))
+        self.assertTrue(all(report.deviations.values()), str(report))
+
+    def test_other_kind(self):
+        separators = zid.DEFAULT_SEPARATORS
+        self.assertEqual("b", fuzz.other_kind("1", separators))
+        self.assertEqual("21.1", fuzz.other_kind("21.b", separators))
+        self.assertEqual("21a-b", fuzz.other_kind("21a1", separators))
+        self.assertIsNone(fuzz.other_kind("21a1", ""))
+        self.assertIsNone(fuzz.other_kind("21aZ", separators))
+        self.assertIsNone(fuzz.other_kind("202001020304", separators))
+
+
+class TestRun(TestCase):
+    def test_clean(self):
+        report = fuzz.run(500, seed=1)
+        self.assertTrue(report.ok, str(report))
+        self.assertEqual(1500, report.cases)
+        self.assertGreater(report.parse_rate, 0)
+        self.assertGreater(report.parse_many_rate, 0)
+        self.assertGreater(report.next_rate, 0)
+        self.assertIn("seed 1 ", str(report))
+
+    def test_schemes(self):
+        for separators in ["_!", "", "."]:
+            report = fuzz.run(300, seed=2, scheme=IdScheme(separators))
+            self.assertTrue(report.ok, str(report))
+
+    def test_catches_wrong_next(self):
+        def next_part(value, start, last, is_num):
+            # Forgets to roll z over to A.
+            return value[:last] + chr(ord(value[last]) + 1) + value[last + 1:]
+        with mock.patch.object(zid, '_next_part', next_part):
+            report = fuzz.run(300, seed=3)
+        self.assertFalse(report.ok)
+        self.assertTrue(any(f.startswith("next differs from the reference") for f in report.failures))
+
+    def test_catches_wrong_order(self):
+        # Letters ranked by code point put A-Z before a-z.
+        with mock.patch.object(zid, '_LETTER_RANKS', {}), mock.patch.object(zid, '_ASCII_LETTER_RANKS', {}), \
+                mock.patch.object(zid, '_KEY_PIECES', zid._KeyPieces()):
+            report = fuzz.run(300, seed=4, scheme=IdScheme(), max_failures=10 ** 6)
+        self.assertFalse(report.ok)
+        self.assertTrue(any(f.startswith("compare differs from the reference") for f in report.failures))
+
+    def test_replay(self):
+        with mock.patch.object(Id, 'parent', lambda self: Id(self.value[:-1])):
+            first = fuzz.run(200, seed=5, max_failures=5)
+            second = fuzz.run(200, seed=5, max_failures=5)
+        self.assertEqual(5, len(first.failures))
+        self.assertGreater(first.failed, 5)
+        self.assertEqual(first.failures, second.failures)
+
+
+class TestMain(TestCase):
+    def _main(self, *argv):
+        out = io.StringIO()
+        err = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            code = fuzz.main(list(argv))
+        return code, out.getvalue(), err.getvalue()
+
+    def test_ok(self):
+        code, out, _ = self._main("-n", "200", "--seed", "7", "--separators", "./")
+        self.assertEqual(0, code)
+        self.assertIn("ids/s", out)
+
+    def test_too_slow(self):
+        code, _, err = self._main("-n", "50", "--min-parse", "1e12")
+        self.assertEqual(1, code)
+        self.assertIn("parse is below", err)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
+import random
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from unittest import TestCase
 
-from zettel.id import Id
+from zettel import id as zid
+from zettel.fuzz import reference_parse
+from zettel.id import Id, IdCache, IdPart, IdRange, IdScheme
 
 
 class TestIdParse(TestCase):
@@ -73,6 +78,24 @@ class TestIdParse(TestCase):
         self.assertEqual("0", repr(a.parts[0]))
         self.assertEqual("a", repr(a.parts[1]))
 
+    def test_separator_then_alternating_parts(self):
+        a = Id("21.3a.4")
+        self.assertEqual(4, len(a.parts))
+        self.assertEqual("21", repr(a.parts[0]))
+        self.assertEqual("3", repr(a.parts[1]))
+        self.assertEqual("a", repr(a.parts[2]))
+        self.assertEqual("4", repr(a.parts[3]))
+
+    def test_digit_part_before_letter_is_numeric(self):
+        a = Id("1a")
+        self.assertTrue(a.parts[0].is_num)
+        self.assertFalse(a.parts[1].is_num)
+
+    def test_no_instance_dict(self):
+        a = Id("21.3a")
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertFalse(hasattr(a.parts[0], '__dict__'))
+
     def test_from_filename(self):
         a = Id.from_filename("200010111213 my test note.md")
         self.assertEqual("200010111213", a.value)
@@ -416,6 +439,20 @@ class TestIdCompare(TestCase):
         self.assertEqual(-1, l.compare(r))
         self.assertEqual(1, r.compare(l))
 
+    def test_separator_count_does_not_matter(self):
+        self.assertEqual(0, Id("a..0").compare(Id("a.0")))
+        self.assertEqual(0, Id("21/3a").compare(Id("21.3a")))
+
+    def test_longer_first_part_with_separator(self):
+        l = Id("a..0")
+        r = Id("ab.0")
+        self.assertEqual(-1, l.compare(r))
+        self.assertEqual(1, r.compare(l))
+
+    def test_sort(self):
+        ids = [Id(v) for v in ["21a", "21.3", "21", "1", "21.2b", "21.2a"]]
+        self.assertEqual(["1", "21", "21a", "21.2a", "21.2b", "21.3"], [i.value for i in sorted(ids)])
+
     def test_equality(self):
         a = Id('a')
         b = Id('a')
@@ -448,5 +485,426 @@ class TestIdCompare(TestCase):
         self.assertEqual(a, f)
 
 
+class TestIdIntern(TestCase):
+    def test_same_instance(self):
+        cache = IdCache()
+        a = cache.get("21.3a")
+        self.assertIs(a, cache.get("21.3a"))
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(1, cache.hits)
+
+    def test_lru_eviction(self):
+        cache = IdCache(maxsize=2)
+        cache.get("a")
+        cache.get("b")
+        cache.get("a")
+        cache.get("c")
+        self.assertEqual(2, len(cache))
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+
+    def test_shrink(self):
+        cache = IdCache(maxsize=3)
+        for v in ["a", "b", "c"]:
+            cache.get(v)
+        cache.maxsize = 1
+        self.assertEqual(1, len(cache))
+        self.assertIn("c", cache)
+
+    def test_invalid_size(self):
+        self.assertRaises(ValueError, IdCache, 0)
+
+    def test_separators_changed(self):
+        cache = IdCache()
+        self.assertEqual(1, len(cache.get("a_b").parts))
+        zid.SEPARATORS.add('_')
+        try:
+            self.assertEqual(2, len(cache.get("a_b").parts))
+        finally:
+            zid.SEPARATORS.discard('_')
+        self.assertEqual(1, len(cache.get("a_b").parts))
+
+    def test_id_intern(self):
+        self.assertIs(Id.intern("21.3a"), Id.intern("21.3a"))
+
+
+class TestIdOrdering(TestCase):
+    def test_structure_before_luhmann(self):
+        ids = [Id(v) for v in ["21a", "200010111224", "1", "200010111223"]]
+        expected = ["200010111223", "200010111224", "1", "21a"]
+        self.assertEqual(expected, [i.value for i in sorted(ids)])
+        self.assertEqual(expected, [i.value for i in sorted(ids, key=Id.sort_key)])
+
+    def test_compare_mixed(self):
+        self.assertEqual(-1, Id("200010111223").compare(Id("1")))
+        self.assertEqual(1, Id("1").compare(Id("200010111223")))
+        self.assertEqual(0, Id("200010111223").compare(Id("200010111223")))
+        self.assertNotEqual(Id("200010111223"), Id("1"))
+
+    def test_hash_matches_equality(self):
+        ids = {Id("21.3a"), Id("21/3a"), Id("21-3a"), Id("21..3a")}
+        self.assertEqual(1, len(ids))
+        self.assertIn(Id("21/3a"), ids)
+        self.assertEqual("note", {Id("21.3"): "note"}.get(Id("21/3")))
+
+    def test_numeric_and_letter_siblings_in_a_set(self):
+        ids = {Id("21.1"), Id("21b")}
+        self.assertEqual(1, len(ids))
+        self.assertIn(Id("21/1"), ids)
+        self.assertIn(Id("21b"), ids)
+        self.assertNotIn(Id("21a"), ids)
+        self.assertEqual(1, len({Id("1"), Id("b")}))
+        self.assertEqual(1, len({Id("2.0"), Id("2a")}))
+
+    def test_not_an_id(self):
+        self.assertNotEqual(Id("a"), "a")
+        self.assertFalse(Id("a") == 1)
+
+
+class TestIdScheme(TestCase):
+    def test_custom_separators(self):
+        scheme = IdScheme("_")
+        a = Id("21_3a", scheme)
+        self.assertEqual(["21", "3", "a"], [repr(p) for p in a.parts])
+        self.assertEqual(["21.3", "a"], [repr(p) for p in Id("21.3a", scheme).parts])
+
+    def test_side_by_side(self):
+        underscore = IdScheme("_")
+        dot = IdScheme(".")
+        self.assertEqual(3, len(Id("1_2a", underscore).parts))
+        self.assertEqual(2, len(Id("1_2a", dot).parts))
+        self.assertEqual(3, len(dot.parse("1.2a").parts))
+
+    def test_derived_ids_keep_scheme(self):
+        scheme = IdScheme("_")
+        a = Id("21_3a", scheme)
+        self.assertIs(scheme, a.next().scheme)
+        self.assertIs(scheme, a.parent().scheme)
+        self.assertEqual("21_3", a.parent().value)
+        self.assertIs(scheme, Id.from_filename("21_3 Note.md", scheme).scheme)
+        self.assertIs(scheme, scheme.parse_many(["21_3"])[0].scheme)
+
+    def test_equal_across_schemes(self):
+        self.assertEqual(Id("21_3", IdScheme("_")), Id("21.3"))
+
+    def test_intern(self):
+        scheme = IdScheme("_")
+        a = Id.intern("21_3", scheme)
+        self.assertIs(a, scheme.intern("21_3"))
+        self.assertIs(scheme, a.scheme)
+
+    def test_default_follows_separators(self):
+        default = zid.default_scheme()
+        self.assertIs(default, Id("a").scheme)
+        zid.SEPARATORS.add('_')
+        try:
+            self.assertIn('_', zid.default_scheme().separators)
+            self.assertEqual(2, len(Id("a_b").parts))
+        finally:
+            zid.SEPARATORS.discard('_')
+
+    def test_default_follows_any_change_of_separators(self):
+        separators = zid.SEPARATORS
+        try:
+            zid.SEPARATORS |= {'_'}
+            self.assertEqual(2, len(Id("a_b").parts))
+            zid.SEPARATORS -= {'_'}
+            self.assertEqual(1, len(Id("a_b").parts))
+            zid.SEPARATORS = {'_'}
+            self.assertEqual(2, len(Id("a_b").parts))
+            zid.SEPARATORS.add('x')
+            self.assertEqual(['x'], sorted(Id("a_b").scheme.separators - {'_'}))
+        finally:
+            zid.SEPARATORS = separators
+        self.assertEqual(1, len(Id("a_b").parts))
+
+    def test_threads(self):
+        schemes = [IdScheme("_"), IdScheme(".")]
+
+        def parse(n):
+            scheme = schemes[n % 2]
+            return [len(Id("1_2.3", scheme).parts) for _ in range(200)]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(parse, range(8)))
+        for n, lengths in enumerate(results):
+            self.assertEqual({2}, set(lengths))
+
+
+def _datetime_advance(value, minutes):
+    d = datetime.strptime(value, "%Y%m%d%H%M")
+    return (d + timedelta(minutes=minutes)).strftime("%Y%m%d%H%M")
+
+
+class TestIdStructureArithmetic(TestCase):
+    def test_next_end_of_year(self):
+        self.assertEqual("200101010000", Id("200012312359").next().value)
+
+    def test_next_leap_day(self):
+        self.assertEqual("200002290000", Id("200002282359").next().value)
+        self.assertEqual("190003010000", Id("190002282359").next().value)
+
+    def test_advance(self):
+        self.assertEqual("200010111323", Id("200010111223").advance(60).value)
+        self.assertEqual("200010111222", Id("200010111223").advance(-1).value)
+
+    def test_distance(self):
+        a = Id("200002282359")
+        self.assertEqual(2, a.distance(Id("200002290001")))
+        self.assertEqual(-2, Id("200002290001").distance(a))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Id("200013011200").next)
+        self.assertRaises(ValueError, Id("200102291200").next)
+        self.assertRaises(ValueError, Id("2001022812000").next)
+        self.assertRaises(ValueError, Id("a").advance, 1)
+        self.assertRaises(OverflowError, Id("999912312359").next)
+
+    def test_matches_datetime(self):
+        rng = random.Random(1234)
+        d = datetime(1896, 1, 1)
+        end = datetime(2104, 12, 31)
+        one_day = timedelta(days=1)
+        last_minute = timedelta(hours=23, minutes=59)
+        while d <= end:
+            n = d + one_day
+            self.assertEqual(n.strftime("%Y%m%d%H%M"), Id((d + last_minute).strftime("%Y%m%d%H%M")).next().value)
+            if d.day % 10 == 0:
+                value = (d + timedelta(minutes=rng.randrange(24 * 60))).strftime("%Y%m%d%H%M")
+                step = rng.randrange(-10 ** 6, 10 ** 6)
+                expected = _datetime_advance(value, step)
+                self.assertEqual(expected, Id(value).advance(step).value)
+                self.assertEqual(step, Id(value).distance(Id(expected)))
+            d = n
+
+    def test_every_minute_matches_datetime(self):
+        value = "199912310000"
+        for _ in range(3 * 24 * 60):
+            n = Id(value).next().value
+            self.assertEqual(_datetime_advance(value, 1), n)
+            value = n
+
+
+def _spans(i):
+    if i.is_structure:
+        return None
+    return [(p.start, p.end, p.sep_start, p.is_num) for p in i.parts]
+
+
+def _random_values(n, seed=5):
+    rng = random.Random(seed)
+    values = ["a.", "0..", "a..0", "21.3a.4-", ".a", "..1", "-", "a\\b"]
+    for _ in range(n):
+        length = rng.randint(1, 14)
+        values.append(''.join(rng.choice("0129azAZé._-/\\!_") for _ in range(length)))
+    return values
+
+
+class TestIdParseReference(TestCase):
+    def test_matches_reference(self):
+        for v in _random_values(5000):
+            if len(v) >= 12 and v.isdigit():
+                continue
+            self.assertEqual(reference_parse(v, zid.SEPARATORS), _spans(Id(v)), v)
+
+    def test_matches_reference_custom_separators(self):
+        scheme = IdScheme("_!")
+        for v in _random_values(2000, seed=6):
+            if len(v) >= 12 and v.isdigit():
+                continue
+            self.assertEqual(reference_parse(v, {"_", "!"}), _spans(Id(v, scheme)), v)
+
+    def test_empty(self):
+        self.assertRaises(ValueError, Id, "")
+
+
+class TestIdParseMany(TestCase):
+    def test_columns(self):
+        batch = Id.parse_many(["21.3a", "200010111223", "b"])
+        self.assertEqual(3, len(batch))
+        self.assertEqual([0, 3, 3, 4], list(batch.offsets))
+        self.assertEqual([0, 3, 4, 0], list(batch.part_starts))
+        self.assertEqual([1, 1, 0, 0], list(batch.part_kinds))
+        self.assertEqual([0, 1, 0], list(batch.is_structure))
+        self.assertEqual([Id(v).sort_key() for v in ["21.3a", "200010111223", "b"]], batch.keys)
+
+    def test_build_on_demand(self):
+        batch = Id.parse_many(["21.3a", "200010111223"])
+        a = batch[0]
+        self.assertEqual("21.3a", a.value)
+        self.assertEqual(["21", "3", "a"], [repr(p) for p in a.parts])
+        self.assertEqual("21.3b", a.next().value)
+        self.assertTrue(batch[1].is_structure)
+        self.assertEqual("200010111224", batch[1].next().value)
+
+    def test_matches_parse(self):
+        values = ["200010111223", "2000101112234"] + _random_values(5000)
+        for v, parsed in zip(values, Id.parse_many(values)):
+            expected = Id(v)
+            self.assertEqual(v, parsed.value)
+            self.assertEqual(_spans(expected), _spans(parsed), v)
+            self.assertEqual(0, expected.compare(parsed), v)
+
+    def test_plain_ids(self):
+        # Ids of only ASCII digits, letters and separators get their keys without the full tokenizer.
+        values = ["21.3a", "/21a", "1" * 70, "a" * 64 + "1", "21/3..Z", "200010111223", "9zZ-0"]
+        for scheme in [None, IdScheme(""), IdScheme("/")]:
+            batch = Id.parse_many(values, scheme)
+            self.assertEqual([Id(v, scheme).sort_key() for v in values], batch.keys)
+            for v, i, j in zip(values, batch.offsets, batch.offsets[1:]):
+                self.assertEqual(len(Id(v, scheme).parts) if j > i else 0, j - i, v)
+        self.assertRaises(ValueError, Id.parse_many, ["21", "", "3"])
+
+    def test_separators_changed(self):
+        zid.SEPARATORS.add('_')
+        try:
+            self.assertEqual(2, len(Id.parse_many(["a_b"])[0].parts))
+        finally:
+            zid.SEPARATORS.discard('_')
+        self.assertEqual(1, len(Id.parse_many(["a_b"])[0].parts))
+
+    def test_empty(self):
+        self.assertEqual(0, len(Id.parse_many([])))
+        self.assertRaises(ValueError, Id.parse_many, ["a", ""])
+
+    def test_newline(self):
+        self.assertRaises(ValueError, Id.parse_many, ["a\nb"])
+
+
+class TestIdCanonical(TestCase):
+    def test_separators(self):
+        for value in ["xy.3k", "xy/3k", "xy..3-k", "xy3k/", "xy.3.k", "xy\\3k"]:
+            self.assertEqual("xy3k", Id(value).canonical())
+        self.assertEqual("21a1b", Id("21.a.1-b").canonical())
+        self.assertEqual("1k.m", Id("1/k-m").canonical())
+        self.assertEqual("k.m", Id("k//m").canonical())
+        self.assertEqual("202001020304", Id("202001020304").canonical())
+
+    def test_parts_of_either_kind_alternate(self):
+        for value in ["21.3a", "21d0", "21.d.0", "cb.d.a"]:
+            self.assertEqual("21d0", Id(value).canonical())
+        self.assertEqual("21b", Id("21.1").canonical())
+        self.assertEqual("0", Id("a").canonical())
+        self.assertEqual("cb3k", Id("21.3.k").canonical())
+        self.assertEqual("1!a", Id("1!.0").canonical())
+
+    def test_same_canonical_is_equal(self):
+        for value in _random_values(2000):
+            i = Id(value)
+            canonical = Id(i.canonical())
+            self.assertEqual(i, canonical)
+            self.assertEqual(hash(i), hash(canonical))
+            self.assertEqual(canonical.value, canonical.canonical())
+
+    def test_equal_exactly_when_canonical_is_equal(self):
+        by_key = {}
+        by_canonical = {}
+        for value in _random_values(20000, seed=7) + ["21.1", "21b", "2.0", "2a", "1", "b", "21a.1", "21ab"]:
+            try:
+                i = Id(value)
+            except ValueError:
+                continue
+            by_key.setdefault(i.sort_key(), set()).add(i.canonical())
+            by_canonical.setdefault(i.canonical(), set()).add(i.sort_key())
+        for canonicals in by_key.values():
+            self.assertEqual(1, len(canonicals), canonicals)
+        for keys in by_canonical.values():
+            self.assertEqual(1, len(keys), keys)
+        for a, b in [("21.1", "21b"), ("2.0", "2a"), ("1", "b")]:
+            self.assertEqual(Id(a), Id(b))
+            self.assertEqual(Id(a).canonical(), Id(b).canonical())
+
+    def test_joiner(self):
+        self.assertEqual("k-m", Id("k_m", IdScheme("_-")).canonical())
+        self.assertEqual("k-m", Id("k/m", IdScheme("/-")).canonical())
+        self.assertEqual(".", IdScheme().joiner)
+        self.assertIsNone(IdScheme("").joiner)
+
+    def test_unique(self):
+        ids = [Id(v) for v in ["21.3a", "22", "21/3a", "21..3a", "22", "21.3"]]
+        self.assertEqual(["21.3a", "22", "21.3"], [i.value for i in zid.unique(ids)])
+        self.assertEqual(["21.1"], [i.value for i in zid.unique([Id("21.1"), Id("21b"), Id("21/1")])])
+
+
+class TestIdPartOrdinal(TestCase):
+    def test_follows_next(self):
+        for value, is_num in [("0", True), ("a", False)]:
+            for ordinal in range(3000):
+                part = Id(value).parts[-1]
+                self.assertEqual(ordinal, part.ordinal())
+                self.assertEqual(value, IdPart.text_for_ordinal(ordinal, is_num))
+                value = Id(value).next().value
+
+    def test_rollover(self):
+        self.assertEqual(10, Id("00").parts[0].ordinal())
+        self.assertEqual(52, Id("aa").parts[0].ordinal())
+        self.assertEqual("aa", IdPart.text_for_ordinal(52, False))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Id("1_").parts[0].ordinal)
+        self.assertRaises(ValueError, IdPart.text_for_ordinal, -1, True)
+
+
+def _next_values(value, n):
+    i = Id(value)
+    values = []
+    for _ in range(n):
+        i = i.next()
+        values.append(i.value)
+    return values
+
+
+class TestIdRange(TestCase):
+    def test_next_n_follows_next(self):
+        for value in ["21.3", "21a", "1z", "9", "21.Y", "b.98", "21.3/", "202012312358", "202402282350"]:
+            r = Id(value).next_n(3000)
+            expected = _next_values(value, 3000)
+            self.assertEqual(expected, list(r.values()))
+            ids = list(r)
+            self.assertEqual(expected, [i.value for i in ids])
+            self.assertEqual([Id(v).sort_key() for v in expected], [i.sort_key() for i in ids])
+
+    def test_parts_of_built_ids(self):
+        i = Id("21.3a").next_n(60)[-1]
+        self.assertEqual("21.3ai", i.value)
+        self.assertEqual(["21", "3", "ai"], [str(p) for p in i.parts])
+        self.assertEqual(Id("21.3"), i.parent())
+
+    def test_len_and_index(self):
+        r = Id("21.9").next_n(5)
+        self.assertEqual(5, len(r))
+        self.assertEqual("21.00", r.value(0))
+        self.assertEqual("21.04", r[-1].value)
+        self.assertRaises(IndexError, r.value, 5)
+        self.assertEqual(0, len(Id("21").next_n(0)))
+        self.assertRaises(ValueError, Id("21").next_n, -1)
+
+    def test_contains(self):
+        r = Id("21.3").next_n(10 ** 12)
+        self.assertIn("21.4", r)
+        self.assertIn(Id("21/999999"), r)
+        self.assertNotIn("21.3", r)
+        self.assertNotIn("21.4a", r)
+        self.assertNotIn("22.4", r)
+        self.assertNotIn("202001020304", r)
+        self.assertNotIn("", r)
+        r = Id("202001020304").next_n(60)
+        self.assertIn("202001020404", r)
+        self.assertNotIn("202001020405", r)
+        self.assertNotIn("202001029999", r)
+        self.assertNotIn("21", r)
+
+    def test_between(self):
+        r = IdRange(Id("21.3"), Id("21/7"))
+        self.assertEqual(["21.3", "21.4", "21.5", "21.6"], list(r.values()))
+        self.assertEqual(26, len(IdRange(Id("21a"), Id("21A"))))
+        self.assertEqual(0, len(IdRange(Id("21.7"), Id("21.3"))))
+        self.assertEqual(1440, len(IdRange(Id("202001020000"), Id("202001030000"))))
+        self.assertRaises(ValueError, IdRange, Id("21.3"), Id("22.7"))
+        self.assertRaises(ValueError, IdRange, Id("21.3"), Id("21.3a"))
+        self.assertRaises(ValueError, IdRange, Id("21a"), Id("21.3"))
+        self.assertRaises(ValueError, IdRange, Id("21"), Id("202001020000"))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
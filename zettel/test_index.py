@@ -0,0 +1,125 @@
+import unittest
+from unittest import TestCase
+
+from zettel.id import Id
+from zettel.index import ZettelIndex
+
+
+def _index(*values):
+    return ZettelIndex(Id(v) for v in values)
+
+
+def _values(ids):
+    return [i.value for i in ids]
+
+
+class TestZettelIndex(TestCase):
+    def test_sorted(self):
+        index = _index("21.3", "1", "21", "21a")
+        self.assertEqual(["1", "21", "21a", "21.3"], _values(index))
+        self.assertEqual(4, len(index))
+
+    def test_add_existing(self):
+        index = _index("21.3")
+        self.assertFalse(index.add(Id("21/3")))
+        self.assertEqual(1, len(index))
+        self.assertIn(Id("21-3"), index)
+        self.assertEqual("21.3", index.get(Id("21/3")).value)
+
+    def test_add_letter_spelling_of_numeric_part(self):
+        index = _index("21.1")
+        self.assertFalse(index.add(Id("21b")))
+        self.assertEqual(["21.1"], _values(index))
+        self.assertFalse(index.add(Id("21/1")))
+        self.assertEqual(1, len(index))
+
+    def test_remove(self):
+        index = _index("21", "21a", "21b")
+        index.remove(Id("21a"))
+        self.assertNotIn(Id("21a"), index)
+        self.assertEqual(["21b"], _values(index.children(Id("21"))))
+        self.assertEqual("21a", index.first_free_child(Id("21")).value)
+        self.assertRaises(KeyError, index.remove, Id("21a"))
+
+    def test_remove_without_ordinal(self):
+        # 1_2 is a single numeric part whose underscore has no ordinal.
+        index = _index("1_2", "3")
+        index.remove(Id("1_2"))
+        self.assertEqual(["3"], _values(index))
+        self.assertEqual("4", index.first_free_sibling(Id("3")).value)
+        index = _index("1_2")
+        index.remove(Id("1_2"))
+        self.assertEqual(0, len(index))
+
+    def test_children(self):
+        index = _index("21", "21a", "21a1", "21a1a", "21b", "21c3", "22", "21.1")
+        self.assertEqual(["21a", "21b"], _values(index.children(Id("21"))))
+        self.assertEqual(["21a1"], _values(index.children(Id("21a"))))
+        self.assertEqual([], _values(index.children(Id("22"))))
+
+    def test_descendants(self):
+        index = _index("21", "21a", "21a1", "21a1a", "21b", "22", "2")
+        self.assertEqual(["21a", "21a1", "21a1a", "21b"], _values(index.descendants(Id("21"))))
+        self.assertEqual(["21a1", "21a1a"], _values(index.descendants(Id("21a"))))
+        self.assertEqual([], _values(index.descendants(Id("2"))))
+
+    def test_first_free_sibling(self):
+        index = _index("21", "21a", "21b", "21c", "21e")
+        self.assertEqual("21d", index.first_free_sibling(Id("21a")).value)
+        self.assertEqual("21f", index.first_free_sibling(Id("21e")).value)
+        self.assertEqual("22", index.first_free_sibling(Id("21")).value)
+
+    def test_first_free_sibling_rollover(self):
+        index = _index(*[f"1.{n}" for n in range(10)], "1.00")
+        self.assertEqual("1.01", index.first_free_sibling(Id("1.3")).value)
+
+    def test_first_free_sibling_letters_rollover(self):
+        index = _index("1z", "1A", "1Z", "1aa")
+        self.assertEqual("1B", index.first_free_sibling(Id("1z")).value)
+        self.assertEqual("1ab", index.first_free_sibling(Id("1Z")).value)
+
+    def test_first_free_sibling_mixed_separators(self):
+        index = _index("21/1", "21.2", "21-3")
+        self.assertEqual("21.4", index.first_free_sibling(Id("21.1")).value)
+
+    def test_first_free_counts_either_spelling(self):
+        index = _index("21", "21a", "21.0", "21/1")
+        self.assertEqual(["21a", "21/1"], _values(index.children(Id("21"))))
+        self.assertEqual("21c", index.first_free_sibling(Id("21a")).value)
+        self.assertEqual("21.2", index.first_free_sibling(Id("21.0")).value)
+        index = _index("21", "21a", "21b", "21c")
+        self.assertEqual("21.3", index.first_free_sibling(Id("21.0")).value)
+        self.assertEqual("21d", index.first_free_sibling(Id("21a")).value)
+        self.assertTrue(index.add(Id("21.3")))
+        self.assertEqual("21.4", index.first_free_sibling(Id("21.0")).value)
+        self.assertEqual("21e", index.first_free_sibling(Id("21a")).value)
+        index.remove(Id("21b"))
+        self.assertEqual("21.1", index.first_free_sibling(Id("21.0")).value)
+        self.assertEqual("21b", index.first_free_sibling(Id("21a")).value)
+
+    def test_first_free_child(self):
+        index = _index("21", "21a", "21b", "21a1", "21a2")
+        self.assertEqual("21c", index.first_free_child(Id("21")).value)
+        self.assertEqual("21a3", index.first_free_child(Id("21a")).value)
+        self.assertEqual("21b1", index.first_free_child(Id("21b")).value)
+        self.assertEqual("3a", index.first_free_child(Id("3")).value)
+
+    def test_structure(self):
+        index = _index("200010111223", "200010111224", "200010111259", "200010111300")
+        self.assertEqual("200010111225", index.first_free_sibling(Id("200010111223")).value)
+        self.assertEqual("200010111301", index.first_free_sibling(Id("200010111259")).value)
+        self.assertEqual([], index.children(Id("200010111223")))
+        self.assertRaises(ValueError, index.first_free_child, Id("200010111223"))
+
+    def test_matches_next_loop(self):
+        values = {"1", "1a"} | {f"1a{n}" for n in (1, 2, 3, 5, 6, 9, 10, 11, 12)}
+        index = _index(*values)
+        for start in ["1a1", "1a3", "1a6", "1a9", "1a12"]:
+            n = Id(start).next()
+            while n.value in values:
+                n = n.next()
+            self.assertEqual(n.value, index.first_free_sibling(Id(start)).value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest import TestCase
+
+from zettel import instrument
+from zettel.id import Id
+
+
+class TestInstrument(TestCase):
+    def setUp(self):
+        instrument.stats.reset()
+
+    def tearDown(self):
+        instrument.disable()
+
+    def test_counts(self):
+        stats = instrument.enable()
+        i = Id("21a3")
+        i.next()
+        i.parent()
+        i.compare(Id("21a4"))
+        Id.from_filename("21a Title.md")
+        ops = stats.snapshot()
+        # Two ids are built directly, next, parent and from_filename each parse one more, and next splits 21a3 into
+        # its parts, which parent then reuses.
+        self.assertEqual(6, ops['parse']['count'])
+        for name in ['next', 'parent', 'compare', 'from_filename']:
+            self.assertEqual(1, ops[name]['count'])
+            self.assertEqual(1, sum(ops[name]['buckets']))
+            self.assertGreater(ops[name]['total_ns'], 0)
+
+    def test_rich_comparisons(self):
+        stats = instrument.enable()
+        a = Id("21a")
+        b = Id("21b")
+        results = [a == b, a != b, a < b, a <= b, a > b, a >= b]
+        self.assertEqual([False, True, True, True, False, False], results)
+        self.assertEqual(6, stats.ops['compare'].count)
+        ids = [Id(v) for v in ["3", "1", "2"]]
+        stats.reset()
+        self.assertEqual(["1", "2", "3"], [i.value for i in sorted(ids)])
+        self.assertGreater(stats.ops['compare'].count, 0)
+
+    def test_callback(self):
+        calls = []
+        instrument.enable(lambda name, ns: calls.append(name))
+        Id("21").next()
+        self.assertEqual(['parse', 'parse', 'parse', 'next'], calls)
+
+    def test_every_way_of_making_ids(self):
+        stats = instrument.enable()
+        Id("202001020304")
+        self.assertEqual(1, stats.ops['parse'].count)
+        batch = Id.parse_many(["21a", "3"])
+        batch[0]
+        self.assertEqual(2, stats.ops['parse'].count)
+        self.assertEqual(["21", "a"], [p.id_str() for p in batch[0].parts])
+        self.assertEqual(4, stats.ops['parse'].count)
+        list(Id("21").next_n(3))
+        self.assertEqual(9, stats.ops['parse'].count)
+
+    def test_errors_are_counted(self):
+        stats = instrument.enable()
+        self.assertRaises(ValueError, Id("21").parent)
+        self.assertEqual(1, stats.ops['parent'].count)
+
+    def test_disable(self):
+        original = Id.next
+        original_eq = Id.__eq__
+        instrument.enable()
+        self.assertTrue(instrument.enabled())
+        self.assertIsNot(original, Id.next)
+        instrument.enable()
+        instrument.disable()
+        self.assertFalse(instrument.enabled())
+        self.assertIs(original, Id.next)
+        self.assertIs(original_eq, Id.__eq__)
+        self.assertIsInstance(Id.__dict__['from_filename'], staticmethod)
+        Id("21").next()
+        self.assertEqual(0, instrument.stats.ops['parse'].count)
+
+
+if __name__ == '__main__':
+    unittest.main()
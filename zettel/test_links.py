@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from zettel.id import Id, IdScheme
+from zettel.links import LinkIndex, link_target, read_links
+
+
+def _write(path, text=""):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+class TestLinkTarget(TestCase):
+    def test_target(self):
+        scheme = IdScheme()
+        self.assertEqual(Id("21a"), link_target(b"21a", scheme))
+        self.assertEqual(Id("202001020304"), link_target(b"202001020304 A title", scheme))
+
+    def test_not_a_note(self):
+        scheme = IdScheme()
+        self.assertIsNone(link_target(b"Wiki page", scheme))
+        self.assertIsNone(link_target(b"a1", scheme))
+        self.assertIsNone(link_target(b"\xff", scheme))
+
+    def test_interned(self):
+        scheme = IdScheme()
+        self.assertIs(link_target(b"21a", scheme), link_target(b"21a Title", scheme))
+
+
+class TestLinkIndex(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = self._dir.name
+        _write(self._note("21 Root.md"), "See [[21a]] and [[21a1 Child]], [[21a]] again.\n")
+        _write(self._note("21a Second.md"), "Up: [[21]]\n[[Wiki]] [[202001020304]]\n")
+        _write(self._note("21a1 Child.md"), "Back to [[21/a]].")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _note(self, name):
+        return os.path.join(self.vault, name)
+
+    def test_read_links(self):
+        self.assertEqual([Id("21a"), Id("21a1"), Id("21a")], list(read_links(self._note("21 Root.md"))))
+
+    def test_from_vault(self):
+        index = LinkIndex.from_vault(self.vault)
+        self.assertEqual(3, len(index))
+        self.assertEqual((Id("21a"), Id("21a1")), index.links(self._note("21 Root.md")))
+        self.assertEqual([self._note("21 Root.md"), self._note("21a1 Child.md")], index.backlinks(Id("21a")))
+        self.assertEqual([self._note("21a Second.md")], index.backlinks(Id("202001020304")))
+        self.assertEqual([], index.backlinks(Id("22")))
+
+    def test_update(self):
+        index = LinkIndex.from_vault(self.vault)
+        _write(self._note("21 Root.md"), "Only [[21a1]] and [[22]] now.")
+        index.update(self._note("21 Root.md"))
+        self.assertEqual([self._note("21a1 Child.md")], index.backlinks(Id("21a")))
+        self.assertEqual([self._note("21 Root.md")], index.backlinks(Id("22")))
+        self.assertEqual([self._note("21 Root.md")], index.backlinks(Id("21a1")))
+
+    def test_deleted(self):
+        index = LinkIndex.from_vault(self.vault)
+        os.remove(self._note("21a1 Child.md"))
+        index.update(self._note("21a1 Child.md"))
+        self.assertNotIn(self._note("21a1 Child.md"), index)
+        self.assertEqual([self._note("21 Root.md")], index.backlinks(Id("21a")))
+        index.remove(self._note("21 Root.md"))
+        self.assertEqual([], index.backlinks(Id("21a")))
+        self.assertEqual(1, len(index))
+
+
+if __name__ == '__main__':
+    unittest.main()
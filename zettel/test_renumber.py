@@ -0,0 +1,191 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+from zettel import renumber
+from zettel.id import Id
+from zettel.renumber import move, plan_move
+from zettel.tree import IdTree
+
+
+def _tree(*values):
+    return IdTree(Id(v) for v in values)
+
+
+def _plan(plan):
+    return {old.value: new.value for old, new in plan.items()}
+
+
+def _write(path, text=""):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+class TestPlanMove(TestCase):
+    def test_subtree(self):
+        plan = plan_move(_tree("21", "21a", "21a1", "21a1.3b", "21b", "22"), Id("21a"), Id("23c"))
+        self.assertEqual({"21a": "23c", "21a1": "23c1", "21a1.3b": "23c1.3b"}, _plan(plan))
+
+    def test_kind_changes(self):
+        plan = plan_move(_tree("21a", "21a1", "21a.2", "21ab"), Id("21a"), Id("22"))
+        self.assertEqual({"21a": "22", "21a1": "22.1", "21a.2": "22.2"}, _plan(plan))
+        plan = plan_move(_tree("3.2", "3.2a", "3.2a1", "3.21"), Id("3.2"), Id("4a"))
+        self.assertEqual({"3.2": "4a", "3.2a": "4a.a", "3.2a1": "4a.a1"}, _plan(plan))
+
+    def test_up_to_ancestor(self):
+        plan = plan_move(_tree("21a1", "21a1a", "21a1a1"), Id("21a1"), Id("21"))
+        self.assertEqual({"21a1": "21", "21a1a": "21a", "21a1a1": "21a1"}, _plan(plan))
+
+    def test_taken(self):
+        self.assertRaises(ValueError, plan_move, _tree("21a", "21a1", "22", "22.1"), Id("21a"), Id("22"))
+        self.assertRaises(ValueError, plan_move, _tree("21a", "21a1", "23a1"), Id("21a"), Id("23a"))
+
+    def test_own_subtree(self):
+        self.assertRaises(ValueError, plan_move, _tree("21a", "21a1"), Id("21a"), Id("21a1b"))
+        self.assertRaises(ValueError, plan_move, _tree("202001020304"), Id("202001020304"), Id("21"))
+
+    def test_nothing_to_move(self):
+        with self.assertRaisesRegex(ValueError, "21b"):
+            plan_move(_tree("21a", "21a1"), Id("21b"), Id("23"))
+        plan = plan_move(_tree("21a1", "21a2", "3"), Id("21a"), Id("23"))
+        self.assertEqual({"21a1": "23.1", "21a2": "23.2"}, _plan(plan))
+
+
+class TestMove(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = os.path.join(self._dir.name, "vault")
+        os.mkdir(self.vault)
+        os.mkdir(os.path.join(self.vault, "sub"))
+        self.journal = os.path.join(self._dir.name, "journal")
+        _write(self._note("21 Root.md"), "See [[21a]] and [[21a1 Child]].\n")
+        _write(self._note("21a Moved.md"), "Child: [[21a1]]\nParent: [[21]]")
+        _write(self._note("sub", "21a1 Child.md"), "[[21a]]\n" * 3)
+        _write(self._note("22 Other.md"), "Nothing to see.\n[[22]] [[21ab]]\n")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _note(self, *name):
+        return os.path.join(self.vault, *name)
+
+    def _check_moved(self):
+        self.assertEqual("See [[23]] and [[23.1 Child]].\n", _read(self._note("21 Root.md")))
+        self.assertEqual("Child: [[23.1]]\nParent: [[21]]", _read(self._note("23 Moved.md")))
+        self.assertEqual("[[23]]\n" * 3, _read(self._note("sub", "23.1 Child.md")))
+        self.assertEqual("Nothing to see.\n[[22]] [[21ab]]\n", _read(self._note("22 Other.md")))
+        self.assertFalse(os.path.exists(self._note("21a Moved.md")))
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_move(self):
+        self.assertEqual((3, 2), move(self.vault, Id("21a"), Id("23"), self.journal))
+        self._check_moved()
+
+    def test_workers(self):
+        self.assertEqual((3, 2), move(self.vault, Id("21a"), Id("23"), self.journal, workers=2))
+        self._check_moved()
+
+    def test_again(self):
+        move(self.vault, Id("21a"), Id("23"), self.journal)
+        self.assertEqual((0, 0), move(self.vault, Id("21a"), Id("23"), self.journal))
+        self._check_moved()
+
+    def test_again_without_root_note(self):
+        os.remove(self._note("21a Moved.md"))
+        _write(self._note("21a2 Second.md"))
+        self.assertEqual((1, 2), move(self.vault, Id("21a"), Id("23"), self.journal))
+        self.assertEqual((0, 0), move(self.vault, Id("21a"), Id("23"), self.journal))
+        self.assertTrue(os.path.exists(self._note("23.2 Second.md")))
+        self.assertRaises(ValueError, move, self.vault, Id("21b"), Id("24"), self.journal)
+
+    def test_names_that_are_not_ids(self):
+        _write(self._note("21a\nx.md"))
+        self.assertEqual((3, 2), move(self.vault, Id("21a"), Id("23"), self.journal))
+        self._check_moved()
+        self.assertTrue(os.path.exists(self._note("21a\nx.md")))
+
+    def test_resume(self):
+        plan = plan_move(_tree("21", "21a", "21a1", "22"), Id("21a"), Id("23"))
+        original = renumber._commit
+
+        def interrupt(log, paths, results):
+            # Rewrite the first note but stop right after recording the second, before its copy is moved.
+            results = iter(results)
+            original(log, paths[:1], results)
+            log.record(paths[1])
+            next(results)
+            raise KeyboardInterrupt
+        renumber._commit = interrupt
+        try:
+            self.assertRaises(KeyboardInterrupt, renumber.renumber, self.vault, plan, self.journal)
+        finally:
+            renumber._commit = original
+        self.assertTrue(os.path.exists(self.journal))
+        move(self.vault, Id("21a"), Id("23"), self.journal)
+        self._check_moved()
+
+    def test_resume_other_mapping(self):
+        _write(self.journal, '{"mapping": {"21a": "24"}, "separators": "-./\\\\", "renames": []}\n')
+        plan = plan_move(_tree("21", "21a", "21a1", "22"), Id("21a"), Id("23"))
+        self.assertRaises(ValueError, renumber.renumber, self.vault, plan, self.journal)
+
+    def test_up_to_ancestor(self):
+        _write(self._note("5a1 Same.md"), "[[5a1a1]]")
+        _write(self._note("5a1a Middle.md"))
+        _write(self._note("5a1a1 Same.md"), "[[5a1]]")
+        self.assertEqual((2, 3), move(self.vault, Id("5a1"), Id("5"), self.journal))
+        self.assertEqual("[[5a1]]", _read(self._note("5 Same.md")))
+        self.assertTrue(os.path.exists(self._note("5a Middle.md")))
+        self.assertEqual("[[5]]", _read(self._note("5a1 Same.md")))
+
+    def test_resume_while_renaming(self):
+        _write(self._note("5a1 Same.md"), "[[5a1a1]]")
+        _write(self._note("5a1a Middle.md"))
+        _write(self._note("5a1a1 Same.md"), "[[5a1]]")
+        original = os.rename
+        calls = []
+
+        def interrupt(old_path, path):
+            calls.append(old_path)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            original(old_path, path)
+        with mock.patch.object(renumber.os, 'rename', interrupt):
+            self.assertRaises(KeyboardInterrupt, move, self.vault, Id("5a1"), Id("5"), self.journal)
+        self.assertTrue(os.path.exists(self.journal))
+        move(self.vault, Id("5a1"), Id("5"), self.journal)
+        self.assertEqual("[[5a1]]", _read(self._note("5 Same.md")))
+        self.assertTrue(os.path.exists(self._note("5a Middle.md")))
+        self.assertEqual("[[5]]", _read(self._note("5a1 Same.md")))
+        self.assertFalse(os.path.exists(self.journal))
+
+    def test_journal_closed_on_error(self):
+        plan = plan_move(_tree("21", "21a", "21a1", "22"), Id("21a"), Id("23"))
+        opened = []
+        original = renumber._Journal.__init__
+
+        def init(log, *args):
+            original(log, *args)
+            opened.append(log)
+        with mock.patch.object(renumber._Journal, '__init__', init), \
+                mock.patch.object(renumber, '_commit', side_effect=KeyboardInterrupt):
+            self.assertRaises(KeyboardInterrupt, renumber.renumber, self.vault, plan, self.journal)
+        self.assertTrue(opened[0]._file.closed)
+
+    def test_large_file(self):
+        lines = ["line %d\n" % n for n in range(100000)]
+        lines[50000] = "[[21a]]\n"
+        _write(self._note("24 Large.md"), ''.join(lines))
+        move(self.vault, Id("21a"), Id("23"), self.journal)
+        lines[50000] = "[[23]]\n"
+        self.assertEqual(''.join(lines), _read(self._note("24 Large.md")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from zettel.id import Id
+from zettel.scan import note_id, note_stem, scan
+
+
+def _touch(*parts):
+    with open(os.path.join(*parts), 'w'):
+        pass
+
+
+class TestNoteStem(TestCase):
+    def test_note(self):
+        self.assertEqual("202001020304 Title", note_stem("202001020304 Title.md"))
+        self.assertEqual("21a", note_stem("21a.txt"))
+
+    def test_not_a_note(self):
+        self.assertIsNone(note_stem("README.md"))
+        self.assertIsNone(note_stem("21a Title.png"))
+        self.assertIsNone(note_stem(""))
+        # Letter-start ids cannot be told apart from other files by name.
+        self.assertIsNone(note_stem("a1 Title.md"))
+
+    def test_extensions(self):
+        self.assertEqual("21a", note_stem("21a.org", extensions=('.org',)))
+        self.assertIsNone(note_stem("21a.md", extensions=('.org',)))
+
+
+class TestScan(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = self._dir.name
+        _touch(self.vault, "202001020304 First note.md")
+        _touch(self.vault, "21a Second note.md")
+        _touch(self.vault, "README.md")
+        _touch(self.vault, "21b.png")
+        os.mkdir(os.path.join(self.vault, "sub"))
+        _touch(self.vault, "sub", "21a1 Nested.txt")
+        os.mkdir(os.path.join(self.vault, ".git"))
+        _touch(self.vault, ".git", "1 Hidden.md")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _found(self, **kwargs):
+        return sorted((i.value, os.path.relpath(p, self.vault)) for i, p in scan(self.vault, **kwargs))
+
+    def test_scan(self):
+        expected = [
+            ("202001020304", "202001020304 First note.md"),
+            ("21a", "21a Second note.md"),
+            ("21a1", os.path.join("sub", "21a1 Nested.txt")),
+        ]
+        self.assertEqual(expected, self._found())
+
+    def test_names_that_are_not_ids(self):
+        _touch(self.vault, "1\nx.md")
+        _touch(self.vault, "sub", "2\ny.md")
+        self.assertEqual(3, len(self._found()))
+        self.assertEqual(3, len(self._found(workers=2)))
+        self.assertEqual(Id("21a"), note_id("21a Second note.md"))
+        self.assertIsNone(note_id("1\nx.md"))
+        self.assertIsNone(note_id("README.md"))
+
+    def test_not_recursive(self):
+        self.assertEqual(["202001020304", "21a"], [v for v, _ in self._found(recursive=False)])
+
+    def test_threaded(self):
+        self.assertEqual(self._found(), self._found(workers=4))
+
+    def test_threaded_many(self):
+        for n in range(20):
+            d = os.path.join(self.vault, f"d{n}")
+            os.mkdir(d)
+            for m in range(50):
+                _touch(d, f"{n}.{m} Note.md")
+        self.assertEqual(1003, len(self._found(workers=4)))
+        self.assertEqual(self._found(), self._found(workers=4))
+
+    def test_threaded_stop_early(self):
+        it = scan(self.vault, workers=2)
+        next(it)
+        it.close()
+
+    def test_missing(self):
+        missing = os.path.join(self.vault, "missing")
+        self.assertRaises(FileNotFoundError, list, scan(missing))
+        self.assertRaises(FileNotFoundError, list, scan(missing, workers=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
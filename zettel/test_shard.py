@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from zettel.id import Id, IdScheme
+from zettel.shard import ShardedIndex
+
+_NOTES = {
+    "physics": ["21 Energy.md", "21a Heat.md", "3 Light.md", "202001020304 Log.md"],
+    "history": ["21 Rome.md", "21b Carthage.md", "4.1 Greece.md"],
+    "art": ["1 Color.md", "21c Form.md", "sub/21c.4 Line.md"],
+}
+
+
+class TestShardedIndex(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vaults = {}
+        for name, files in _NOTES.items():
+            vault = self.vaults[name] = os.path.join(self._dir.name, name)
+            for f in files:
+                path = os.path.join(vault, f)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w'):
+                    pass
+        self.shards = os.path.join(self._dir.name, "shards")
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _path(self, name, f):
+        return os.path.join(self.vaults[name], f)
+
+    def test_merged_order(self):
+        with ShardedIndex(self.shards, self.vaults) as index:
+            self.assertEqual({"art": (3, 0), "history": (3, 0), "physics": (4, 0)}, index.refresh())
+            self.assertEqual(10, len(index))
+            values = [(value, name) for value, name, _ in index.values()]
+            self.assertEqual([
+                ("202001020304", "physics"), ("1", "art"), ("3", "physics"), ("4.1", "history"),
+                ("21", "history"), ("21", "physics"), ("21a", "physics"), ("21b", "history"), ("21c", "art"),
+                ("21c.4", "art"),
+            ], values)
+            ids = [i for i, _, _ in index]
+            self.assertEqual(sorted(Id(v) for v, _ in values), ids)
+            self.assertEqual([Id(v).sort_key() for v, _ in values], [i.sort_key() for i in ids])
+            self.assertTrue(ids[0].is_structure)
+            self.assertEqual(["4", "1"], [repr(p) for p in ids[3].parts])
+
+    def test_lookup(self):
+        with ShardedIndex(self.shards, self.vaults) as index:
+            index.refresh()
+            self.assertEqual([("history", self._path("history", "21 Rome.md")),
+                              ("physics", self._path("physics", "21 Energy.md"))], index.lookup(Id("21")))
+            self.assertEqual([("art", self._path("art", "sub/21c.4 Line.md"))], index.lookup(Id("21c/4")))
+            self.assertEqual([[], [("history", self._path("history", "4.1 Greece.md"))]],
+                             index.lookup_many([Id("5"), Id("4-1")]))
+            self.assertIn(Id("21c"), index)
+            self.assertNotIn(Id("21d"), index)
+
+    def test_first_free_sibling(self):
+        with ShardedIndex(self.shards, self.vaults) as index:
+            index.refresh()
+            self.assertEqual(Id("21d"), index.first_free_sibling(Id("21a")))
+            self.assertEqual(Id("2"), index.first_free_sibling(Id("1")))
+            self.assertEqual(Id("4"), index.first_free_sibling(Id("3")))
+            self.assertEqual(Id("202001020305"), index.first_free_sibling(Id("202001020303")))
+        # Runs longer than one batch of candidates.
+        i = Id("5a1")
+        for k in range(70):
+            with open(os.path.join(self.vaults["art" if k % 2 else "history"], f"{i.value} Note.md"), 'w'):
+                pass
+            i = i.next()
+        with ShardedIndex(self.shards, self.vaults) as index:
+            index.refresh()
+            self.assertEqual(i, index.first_free_sibling(Id("5a1")))
+
+    def test_parallel_refresh(self):
+        with ShardedIndex(self.shards, self.vaults) as index:
+            self.assertEqual({"art": (3, 0), "history": (3, 0), "physics": (4, 0)}, index.refresh(workers=2))
+            self.assertEqual(10, len(index))
+            os.remove(self._path("physics", "3 Light.md"))
+            self.assertEqual({"art": (0, 0), "history": (0, 0), "physics": (0, 1)}, index.refresh(workers=2))
+            self.assertNotIn(Id("3"), index)
+        self.assertEqual(["art.sqlite", "history.sqlite", "physics.sqlite"], sorted(os.listdir(self.shards)))
+
+    def test_reopen(self):
+        with ShardedIndex(self.shards, self.vaults) as index:
+            index.refresh()
+        with ShardedIndex(self.shards, self.vaults) as index:
+            self.assertEqual(10, len(index))
+            self.assertEqual({"art": (0, 0), "history": (0, 0), "physics": (0, 0)}, index.refresh())
+
+    def test_scheme(self):
+        with open(os.path.join(self.vaults["art"], "21_4 Dot.md"), 'w'):
+            pass
+        with ShardedIndex(self.shards, self.vaults, scheme=IdScheme("_")) as index:
+            index.refresh(workers=2)
+            self.assertEqual([("art", self._path("art", "21_4 Dot.md"))], index.lookup(Id("21_4", IdScheme("_"))))
+            self.assertEqual(2, len(Id("21_4", IdScheme("_")).parts))
+            self.assertTrue(all(i.scheme is index.scheme for i, _, _ in index))
+
+    def test_names(self):
+        for name in ["", ".hidden", os.path.join("a", "b")]:
+            self.assertRaises(ValueError, ShardedIndex, self.shards, {name: self.vaults["art"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
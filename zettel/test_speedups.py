@@ -0,0 +1,125 @@
+import importlib.util
+import os
+import random
+import unittest
+from unittest import TestCase, mock
+
+from zettel import _speedups, id as zid, test_id
+from zettel.fuzz import reference_next_part
+
+# _speedups as plain Python, whether or not a compiled module shadows it.
+_spec = importlib.util.spec_from_file_location(
+    'zettel._speedups_py', os.path.join(os.path.dirname(_speedups.__file__), '_speedups.py'))
+_pure = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_pure)
+COMPILED = not _speedups.__file__.endswith('.py')
+_LETTERS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+# The character by character implementations _speedups replaced, kept as the reference they are checked against
+# (next_part against zettel.fuzz.reference_next_part).
+def _reference_ordinal(ranks, base):
+    n = 0
+    for c in ranks:
+        rank = ord(c) - 48
+        if not 0 <= rank < base:
+            return -1
+        n = n * base + rank
+    return n + (base ** len(ranks) - base) // (base - 1)
+
+
+def _reference_text(ordinal, is_num):
+    base = 10 if is_num else 52
+    length = 1
+    count = base
+    while ordinal >= count:
+        ordinal -= count
+        length += 1
+        count *= base
+    out = []
+    for _ in range(length):
+        ordinal, rank = divmod(ordinal, base)
+        out.append(chr(rank + 48) if is_num else _LETTERS[rank])
+    return ''.join(reversed(out))
+
+
+def _random_part(rng, is_num):
+    # Heavy on 9s and Zs so that every kind of rollover comes up, with the odd character that is neither.
+    if is_num:
+        alphabet = '0123456789999_'
+    else:
+        alphabet = 'abyzzAYZZZ'
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+
+
+class TestSpeedups(TestCase):
+    def _implementations(self):
+        if COMPILED:
+            return [_speedups, _pure]
+        return [_pure]
+
+    def test_next_part(self):
+        rng = random.Random(23)
+        for _ in range(20000):
+            is_num = rng.random() < 0.5
+            head = rng.choice(['', '21.', '3a', '1/b.'])
+            part = _random_part(rng, is_num)
+            tail = rng.choice(['', '.', '/-'])
+            value = head + part + tail
+            start = len(head)
+            last = start + len(part) - 1
+            expected = reference_next_part(value, start, last, is_num)
+            for module in self._implementations():
+                self.assertEqual(expected, module.next_part(value, start, last, is_num), (module, value))
+
+    def test_ordinal(self):
+        rng = random.Random(23)
+        cases = [('', 10), ('', 52)]
+        for _ in range(20000):
+            base = rng.choice([10, 52])
+            cases.append((''.join(chr(48 + rng.randrange(-2, base + 3)) for _ in range(rng.randint(1, 14))), base))
+        for ranks, base in cases:
+            expected = _reference_ordinal(ranks, base)
+            for module in self._implementations():
+                self.assertEqual(expected, module.ordinal(ranks, base), (module, ranks, base))
+
+    def test_text_for_ordinal(self):
+        rng = random.Random(23)
+        ordinals = list(range(3000)) + [rng.randrange(2 ** 80) for _ in range(5000)]
+        for ordinal in ordinals:
+            for is_num in (True, False):
+                expected = _reference_text(ordinal, is_num)
+                for module in self._implementations():
+                    text = module.text_for_ordinal(ordinal, is_num)
+                    self.assertEqual(expected, text, (module, ordinal, is_num))
+                    key = text if is_num else text.translate(zid._LETTER_RANKS)
+                    self.assertEqual(ordinal, module.ordinal(key, 10 if is_num else 52))
+
+    def test_selected(self):
+        self.assertIs(zid._next_part, _speedups.next_part)
+        self.assertIs(zid._ordinal, _speedups.ordinal)
+
+
+# With a compiled module, every test of zettel.id runs a second time on the plain Python functions.
+def _with_pure(case):
+    def setUp(self):
+        patches = [
+            mock.patch.object(zid, '_next_part', _pure.next_part),
+            mock.patch.object(zid, '_ordinal', _pure.ordinal),
+            mock.patch.object(zid, '_text_for_ordinal', _pure.text_for_ordinal),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        case.setUp(self)
+    return type(f'{case.__name__}Pure', (case,), {'setUp': setUp})
+
+
+if COMPILED:
+    for case in [c for c in vars(test_id).values() if isinstance(c, type) and c.__module__ == test_id.__name__]:
+        globals()[case.__name__ + 'Pure'] = _with_pure(case)
+    del case
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from zettel import store
+from zettel.id import Id, IdScheme
+from zettel.store import VaultIndex
+
+
+def _write(path, text=""):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+class TestVaultIndex(TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = os.path.join(self._dir.name, "vault")
+        os.mkdir(self.vault)
+        self.database = os.path.join(self._dir.name, "index.sqlite")
+        _write(self._note("21a Second.md"))
+        _write(self._note("21 First.md"))
+        _write(self._note("21.3 Third.md"))
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def _note(self, name):
+        return os.path.join(self.vault, name)
+
+    def test_refresh(self):
+        with VaultIndex(self.database, self.vault) as index:
+            self.assertEqual((3, 0), index.refresh())
+            self.assertEqual(3, len(index))
+            self.assertEqual(["21", "21a", "21.3"], [v for v, _ in index.values()])
+            self.assertEqual([self._note("21a Second.md")], index.lookup(Id("21a")))
+            self.assertIn(Id("21/3"), index)
+            self.assertNotIn(Id("22"), index)
+
+    def test_names_that_are_not_ids(self):
+        _write(self._note("1\nx.md"))
+        with VaultIndex(self.database, self.vault) as index:
+            self.assertEqual((3, 0), index.refresh())
+            self.assertEqual((0, 0), index.refresh())
+
+    def test_only_changed_files_are_parsed(self):
+        with VaultIndex(self.database, self.vault) as index:
+            index.refresh()
+            self.assertEqual((0, 0), index.refresh())
+            _write(self._note("22 New.md"))
+            os.remove(self._note("21a Second.md"))
+            self.assertEqual((1, 1), index.refresh())
+            self.assertEqual(["21", "21.3", "22"], [i.value for i, _ in index])
+
+    def test_modified_file(self):
+        with VaultIndex(self.database, self.vault) as index:
+            index.refresh()
+            path = self._note("21 First.md")
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertEqual((1, 0), index.refresh())
+
+    def test_reopen(self):
+        with VaultIndex(self.database, self.vault) as index:
+            index.refresh()
+        with VaultIndex(self.database, self.vault) as index:
+            self.assertEqual(3, len(index))
+            self.assertEqual((0, 0), index.refresh())
+
+    def test_key_version_changed(self):
+        with VaultIndex(self.database, self.vault) as index:
+            index.refresh()
+        store.KEY_VERSION += 1
+        try:
+            with VaultIndex(self.database, self.vault) as index:
+                self.assertEqual(0, len(index))
+                self.assertEqual((3, 0), index.refresh())
+        finally:
+            store.KEY_VERSION -= 1
+
+    def test_scheme(self):
+        _write(self._note("21_4 Fourth.md"))
+        scheme = IdScheme("._")
+        with VaultIndex(self.database, self.vault, scheme=scheme) as index:
+            index.refresh()
+            self.assertIn(Id("21.4", scheme), index)
+            self.assertEqual([scheme], list({i.scheme for i, _ in index}))
+
+    def test_scheme_changed(self):
+        with VaultIndex(self.database, self.vault) as index:
+            index.refresh()
+        with VaultIndex(self.database, self.vault, scheme=IdScheme("._")) as index:
+            self.assertEqual(0, len(index))
+            self.assertEqual((3, 0), index.refresh())
+        with VaultIndex(self.database, self.vault, scheme=IdScheme("_.")) as index:
+            self.assertEqual((0, 0), index.refresh())
+
+
+if __name__ == '__main__':
+    unittest.main()
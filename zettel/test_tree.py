@@ -0,0 +1,82 @@
+import unittest
+from unittest import TestCase
+
+from zettel.id import Id
+from zettel.tree import IdTree
+
+
+def _tree(*values):
+    return IdTree(Id(v) for v in values)
+
+
+def _values(nodes):
+    return [n.id.value for n in nodes]
+
+
+class TestIdTree(TestCase):
+    def test_parent_and_depth(self):
+        tree = _tree("21", "21a", "21a1")
+        node = tree.node(Id("21a1"))
+        self.assertEqual("21a", node.parent.id.value)
+        self.assertEqual(2, node.depth)
+        self.assertIsNone(tree.node(Id("21")).parent)
+
+    def test_children_ordered(self):
+        tree = _tree("21", "21c", "21a", "21b", "3")
+        self.assertEqual(["21a", "21b", "21c"], _values(tree.node(Id("21")).children))
+        self.assertEqual(["3", "21"], _values(tree.roots))
+
+    def test_missing_ancestors(self):
+        tree = _tree("21a1")
+        self.assertEqual(["21", "21a"], _values(tree.ancestors(Id("21a1"))))
+        self.assertFalse(tree.node(Id("21a")).present)
+        self.assertNotIn(Id("21a"), tree)
+        self.assertEqual(1, len(tree))
+
+    def test_add_missing_ancestor_later(self):
+        tree = _tree("21a1", "21a2")
+        tree.add(Id("21a"))
+        node = tree.node(Id("21a"))
+        self.assertTrue(node.present)
+        self.assertEqual(["21a1", "21a2"], _values(node.children))
+        self.assertEqual(3, node.size)
+
+    def test_equivalent_ids_share_node(self):
+        tree = _tree("21.3", "21/3a")
+        self.assertIs(tree.node(Id("21-3")), tree.node(Id("21/3a")).parent)
+
+    def test_subtree_size(self):
+        tree = _tree("21", "21a", "21a1", "21a2", "21b", "22")
+        self.assertEqual(5, tree.subtree_size(Id("21")))
+        self.assertEqual(3, tree.subtree_size(Id("21a")))
+        self.assertEqual(1, tree.subtree_size(Id("22")))
+        self.assertEqual(0, tree.subtree_size(Id("23")))
+
+    def test_lowest_common_ancestor(self):
+        tree = _tree("21", "21a", "21a1", "21a2b", "21b", "22")
+        self.assertEqual("21a", tree.lowest_common_ancestor(Id("21a1"), Id("21a2b")).id.value)
+        self.assertEqual("21", tree.lowest_common_ancestor(Id("21a1"), Id("21b")).id.value)
+        self.assertEqual("21a", tree.lowest_common_ancestor(Id("21a"), Id("21a1")).id.value)
+        self.assertIsNone(tree.lowest_common_ancestor(Id("21a1"), Id("22")))
+
+    def test_remove(self):
+        tree = _tree("21", "21a1", "21b")
+        tree.remove(Id("21a1"))
+        self.assertEqual(["21b"], _values(tree.node(Id("21")).children))
+        self.assertRaises(KeyError, tree.node, Id("21a"))
+        self.assertEqual(2, tree.subtree_size(Id("21")))
+        self.assertRaises(KeyError, tree.remove, Id("21a1"))
+
+    def test_iter(self):
+        tree = _tree("22", "21b", "21a1", "21")
+        self.assertEqual(["21", "21a1", "21b", "22"], _values(tree))
+
+    def test_structure(self):
+        tree = _tree("200010111223", "21")
+        node = tree.node(Id("200010111223"))
+        self.assertEqual(0, node.depth)
+        self.assertEqual([], node.ancestors())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import random
+import unittest
+from unittest import TestCase
+
+from zettel.id import Id, IdScheme
+from zettel.trie import IdTrie
+
+
+def _trie(*values):
+    return IdTrie(Id(v) for v in values)
+
+
+def _values(ids):
+    return [i.value for i in ids]
+
+
+class TestIdTrie(TestCase):
+    def test_order(self):
+        trie = _trie("21a", "3", "21", "202001020304", "21.3b", "21a1")
+        self.assertEqual(["202001020304", "3", "21", "21a", "21a1", "21.3b"], _values(trie))
+        self.assertEqual(6, len(trie))
+
+    def test_separators_do_not_matter(self):
+        trie = _trie("21/3a", "21.3a1", "21-3")
+        self.assertEqual(["21-3", "21/3a", "21.3a1"], _values(trie.subtree(Id("21.3"))))
+        self.assertEqual(2, trie.count(Id("21\\3a")))
+        self.assertIn(Id("21.3a"), trie)
+        self.assertEqual("21/3a", trie.get(Id("21.3a")).value)
+
+    def test_subtree(self):
+        trie = _trie("21", "21a", "21a1", "21b", "211", "22")
+        self.assertEqual(["21", "21a", "21a1", "21b"], _values(trie.subtree(Id("21"))))
+        self.assertEqual(["21a1"], _values(trie.subtree(Id("21a1"))))
+        self.assertEqual([], _values(trie.subtree(Id("23"))))
+        self.assertEqual(4, trie.count(Id("21")))
+        self.assertEqual(0, trie.count(Id("23")))
+
+    def test_missing_ancestors(self):
+        trie = _trie("21a1", "21a2")
+        self.assertNotIn(Id("21a"), trie)
+        self.assertIsNone(trie.get(Id("21a")))
+        self.assertEqual(2, trie.count(Id("21")))
+
+    def test_add_twice(self):
+        trie = _trie("21a")
+        self.assertFalse(trie.add(Id("21a")))
+        self.assertEqual(1, len(trie))
+
+    def test_numeric_and_letter_spellings(self):
+        trie = _trie("21", "21.1", "21.1a")
+        self.assertFalse(trie.add(Id("21b")))
+        self.assertEqual(["21", "21.1", "21.1a"], _values(trie))
+        self.assertEqual(["21.1", "21.1a"], _values(trie.subtree(Id("21b"))))
+        self.assertEqual(2, trie.count(Id("21b")))
+        trie.remove(Id("21b"))
+        self.assertNotIn(Id("21.1"), trie)
+        self.assertIn(Id("21b.a"), trie)
+        loaded = IdTrie.loads(_trie("21.1", "21b").dumps())
+        self.assertEqual(["21.1"], _values(loaded))
+
+    def test_deepest(self):
+        trie = _trie("21", "21a", "21b", "21b3c", "21a1.2", "21c")
+        self.assertEqual("21a1.2", trie.deepest(Id("21")).value)
+        self.assertEqual("21c", trie.deepest(Id("21c")).value)
+        self.assertIsNone(trie.deepest(Id("23")))
+        trie.remove(Id("21a1.2"))
+        self.assertEqual("21b3c", trie.deepest(Id("21")).value)
+        trie.remove(Id("21b3c"))
+        self.assertEqual("21a", trie.deepest(Id("21")).value)
+
+    def test_remove(self):
+        trie = _trie("21", "21a1", "22")
+        trie.remove(Id("21a1"))
+        self.assertEqual(["21", "22"], _values(trie))
+        self.assertEqual(0, trie.count(Id("21a")))
+        self.assertRaises(KeyError, trie.remove, Id("21a1"))
+        self.assertRaises(KeyError, trie.remove, Id("21a"))
+        trie.remove(Id("21"))
+        trie.remove(Id("22"))
+        self.assertEqual(0, len(trie))
+        self.assertEqual([], _values(trie))
+
+    def test_dumps(self):
+        values = ["202001020304", "21", "21.3b", "21a1", "3", "21a1b4"]
+        trie = _trie(*values)
+        loaded = IdTrie.loads(trie.dumps())
+        self.assertEqual(_values(trie), _values(loaded))
+        self.assertEqual([Id(v).sort_key() for v in _values(trie)], [i.sort_key() for i in loaded])
+        self.assertEqual(2, loaded.count(Id("21a")))
+        self.assertEqual("21a1b4", loaded.deepest(Id("21")).value)
+        self.assertEqual(["21", "a", "1", "b", "4"], [str(p) for p in loaded.get(Id("21a1b4")).parts])
+        self.assertTrue(loaded.get(Id("202001020304")).is_structure)
+        self.assertEqual(0, len(IdTrie.loads(IdTrie().dumps())))
+
+    def test_loads_other_scheme(self):
+        data = _trie("21a").dumps()
+        self.assertRaises(ValueError, IdTrie.loads, data, IdScheme("._"))
+
+    def test_random(self):
+        rng = random.Random(3)
+        values = set()
+        for _ in range(500):
+            parts = [str(rng.randint(1, 9))]
+            for depth in range(rng.randint(0, 4)):
+                parts.append(rng.choice("abc") if depth % 2 == 0 else str(rng.randint(1, 3)))
+            values.add(''.join(parts))
+        ids = [Id(v) for v in values]
+        trie = IdTrie(ids)
+        for i in ids:
+            under = [j for j in ids if j.sort_key().startswith(i.sort_key())]
+            self.assertEqual(sorted(under), list(trie.subtree(i)))
+            self.assertEqual(len(under), trie.count(i))
+            deepest = max(len(j.parts) for j in under)
+            self.assertEqual(deepest, len(trie.deepest(i).parts))
+        self.assertEqual(sorted(ids), list(IdTrie.loads(trie.dumps())))
+
+
+if __name__ == '__main__':
+    unittest.main()
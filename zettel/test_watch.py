@@ -0,0 +1,207 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase, mock
+
+from zettel import watch
+from zettel.id import Id
+from zettel.watch import VaultSnapshot, VaultWatcher, inotify_available
+
+
+def _touch(*parts):
+    with open(os.path.join(*parts), 'w'):
+        pass
+
+
+def _values(snapshot):
+    return [i.value for i, _ in snapshot]
+
+
+class TestVaultSnapshot(TestCase):
+    def test_lookup(self):
+        ids = {"/v/21 A.md": Id("21"), "/v/21a.md": Id("21a"), "/v/21 B.md": Id("21")}
+        order = sorted((i.sort_key(), path) for path, i in ids.items())
+        snapshot = VaultSnapshot(1, ids, order)
+        self.assertEqual(["/v/21 A.md", "/v/21 B.md"], snapshot.paths(Id("21")))
+        self.assertIn(Id("21a"), snapshot)
+        self.assertNotIn(Id("2"), snapshot)
+        self.assertEqual(["21", "21", "21a"], _values(snapshot))
+        self.assertEqual(Id("21a"), snapshot.get("/v/21a.md"))
+
+    def test_updates_share_unchanged_chunks(self):
+        rng = random.Random(21)
+        with mock.patch.object(watch, '_CHUNK', 4):
+            ids = {}
+            snapshot = VaultSnapshot(0, {}, [])
+            for _ in range(200):
+                removed = set(rng.sample(sorted(ids), min(len(ids), rng.randint(0, 6))))
+                added = {}
+                for _ in range(rng.randint(0, 8)):
+                    path = f"/v/{rng.randint(0, 400)}.md"
+                    if path not in ids:
+                        added[path] = Id(str(rng.randint(1, 40)) + rng.choice(["", "a", "b1"]))
+                old = snapshot
+                snapshot = snapshot._updated(added, removed)
+                for path in removed:
+                    del ids[path]
+                ids.update(added)
+                expected = VaultSnapshot(snapshot.version, ids, sorted((i.sort_key(), p) for p, i in ids.items()))
+                self.assertEqual(list(expected), list(snapshot))
+                self.assertEqual(len(ids), len(snapshot))
+                for path, i in ids.items():
+                    self.assertIs(i, snapshot.get(path))
+                    self.assertIn(i, snapshot)
+                    self.assertEqual(expected.paths(i), snapshot.paths(i))
+                self.assertNotIn(Id("99"), snapshot)
+                self.assertEqual(sorted(ids), list(snapshot._paths))
+                # The old snapshot is left as it was, and shares the chunks nothing happened in.
+                self.assertEqual(old.version + 1, snapshot.version)
+                if len(old._order.chunks) > 10 and len(added) + len(removed) < 3:
+                    shared = set(map(id, old._order.chunks)) & set(map(id, snapshot._order.chunks))
+                    self.assertGreater(len(shared), 0)
+
+    def test_notes_under_a_directory(self):
+        paths = ["/v/sub/21.md", "/v/sub/deep/3.md", "/v/sub2/4.md", "/v/sub.md", "/v/1.md"]
+        with mock.patch.object(watch, '_CHUNK', 2):
+            snapshot = VaultSnapshot(0, {p: Id("1") for p in paths}, sorted((Id("1").sort_key(), p) for p in paths))
+            self.assertEqual(["/v/sub/21.md", "/v/sub/deep/3.md"],
+                             list(snapshot._under(os.path.join("/v", "sub"))))
+            self.assertEqual(["/v/sub/deep/3.md"], list(snapshot._under("/v/sub/deep")))
+            self.assertEqual([], list(snapshot._under("/v/none")))
+            snapshot = snapshot._updated({"/v/sub/b.md": Id("2")}, {"/v/sub/21.md"})
+            self.assertEqual(["/v/sub/b.md", "/v/sub/deep/3.md"], list(snapshot._under("/v/sub")))
+
+
+class WatcherTests:
+    backend = None
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.vault = self._dir.name
+        _touch(self.vault, "21 First.md")
+        os.mkdir(os.path.join(self.vault, "sub"))
+        _touch(self.vault, "sub", "21a Nested.md")
+        self.watcher = VaultWatcher(self.vault, backend=self.backend, poll_interval=0.05).start()
+
+    def tearDown(self):
+        self.watcher.stop()
+        self._dir.cleanup()
+
+    def _next(self, snapshot):
+        new = self.watcher.wait(snapshot.version, timeout=5)
+        self.assertGreater(new.version, snapshot.version)
+        return new
+
+    def test_initial(self):
+        self.assertEqual(["21", "21a"], _values(self.watcher.snapshot))
+
+    def test_create_and_delete(self):
+        snapshot = self.watcher.snapshot
+        _touch(self.vault, "3 Third.md")
+        _touch(self.vault, "README.md")
+        snapshot = self._next(snapshot)
+        self.assertEqual(["3", "21", "21a"], _values(snapshot))
+        os.remove(os.path.join(self.vault, "21 First.md"))
+        snapshot = self._next(snapshot)
+        self.assertEqual(["3", "21a"], _values(snapshot))
+
+    def test_rename(self):
+        snapshot = self.watcher.snapshot
+        os.rename(os.path.join(self.vault, "21 First.md"), os.path.join(self.vault, "22 First.md"))
+        snapshot = self._next(snapshot)
+        self.assertEqual(["21a", "22"], _values(snapshot))
+
+    def test_directories(self):
+        snapshot = self.watcher.snapshot
+        shutil.move(os.path.join(self.vault, "sub"), os.path.join(self.vault, "moved"))
+        snapshot = self._next(snapshot)
+        self.assertEqual([os.path.join(self.vault, "moved", "21a Nested.md")], snapshot.paths(Id("21a")))
+        os.makedirs(os.path.join(self.vault, "new", "deeper"))
+        _touch(self.vault, "new", "deeper", "4 Deep.md")
+        while Id("4") not in snapshot:
+            snapshot = self._next(snapshot)
+        shutil.rmtree(os.path.join(self.vault, "moved"))
+        while Id("21a") in snapshot:
+            snapshot = self._next(snapshot)
+        self.assertEqual(["4", "21"], _values(snapshot))
+        # Notes created in a directory after it was picked up are seen too.
+        _touch(self.vault, "new", "deeper", "5 Later.md")
+        while Id("5") not in snapshot:
+            snapshot = self._next(snapshot)
+
+    def test_names_that_are_not_ids(self):
+        snapshot = self.watcher.snapshot
+        _touch(self.vault, "1\nx.md")
+        _touch(self.vault, "3 Third.md")
+        while Id("3") not in snapshot:
+            snapshot = self._next(snapshot)
+        self.assertEqual(["3", "21", "21a"], _values(snapshot))
+        self.assertIsNone(self.watcher.error)
+
+    def test_batch_errors_list_the_vault_again(self):
+        snapshot = self.watcher.snapshot
+        with mock.patch.object(self.watcher, '_changes', side_effect=OSError("gone")):
+            _touch(self.vault, "3 Third.md")
+            while Id("3") not in snapshot:
+                snapshot = self._next(snapshot)
+        self.assertIsNone(self.watcher.error)
+
+    def test_errors_stop_the_watcher(self):
+        errors = []
+        self.watcher.stop()
+        self.watcher = VaultWatcher(self.vault, backend=self.backend, poll_interval=0.05, on_error=errors.append).start()
+        snapshot = self.watcher.snapshot
+        error = PermissionError("denied")
+        with mock.patch.object(self.watcher, '_changes', side_effect=error), \
+                mock.patch.object(self.watcher, '_list', side_effect=error):
+            _touch(self.vault, "3 Third.md")
+            with self.assertRaises(RuntimeError) as raised:
+                self.watcher.wait(snapshot.version, timeout=5)
+        self.assertIs(error, raised.exception.__cause__)
+        self.assertIs(error, self.watcher.error)
+        self.watcher.stop()
+        self.assertEqual([error], errors)
+
+    def test_burst_is_batched(self):
+        snapshot = self.watcher.snapshot
+        start = snapshot.version
+        for n in range(100):
+            _touch(self.vault, f"{n + 100} Burst.md")
+        while len(snapshot) < 102:
+            snapshot = self._next(snapshot)
+        self.assertLess(snapshot.version - start, 10)
+
+
+class TestPollingWatcher(WatcherTests, TestCase):
+    backend = 'poll'
+
+    def test_known_notes_are_not_parsed_again(self):
+        snapshot = self.watcher.snapshot
+        with mock.patch.object(watch.Id, 'from_filename', wraps=Id.from_filename) as from_filename:
+            _touch(self.vault, "3 Third.md")
+            snapshot = self._next(snapshot)
+            self.assertEqual(["3", "21", "21a"], _values(snapshot))
+            self.assertEqual(1, from_filename.call_count)
+
+
+@unittest.skipUnless(inotify_available(), "inotify is not available")
+class TestInotifyWatcher(WatcherTests, TestCase):
+    backend = 'inotify'
+
+    def test_burst_is_one_batch(self):
+        snapshot = self.watcher.snapshot
+        for n in range(100):
+            _touch(self.vault, f"{n + 100} Burst.md")
+        snapshot = self._next(snapshot)
+        self.assertEqual(102, len(snapshot))
+
+
+class TestBackend(TestCase):
+    def test_unknown(self):
+        self.assertRaises(ValueError, VaultWatcher, ".", backend='kqueue')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id
+
+
+class IdNode:
+    __slots__ = ('id', 'parent', 'children', 'depth', 'present', 'size')
+
+    def __init__(self, i: Id, parent: Optional[IdNode], depth: int):
+        self.id = i
+        self.parent = parent
+        self.children: list[IdNode] = []
+        self.depth = depth
+        # Ancestors of an added id that were never added themselves are kept as nodes that are not present, so the
+        # shape of the tree does not depend on the order ids are added in.
+        self.present = False
+        # Number of present nodes in the subtree rooted at this node, including itself.
+        self.size = 0
+
+    def ancestors(self) -> list[IdNode]:
+        chain = []
+        node = self.parent
+        while node is not None:
+            chain.append(node)
+            node = node.parent
+        chain.reverse()
+        return chain
+
+    def __repr__(self):
+        return f"IdNode({self.id.value})"
+
+
+def _insert_child(children: list[IdNode], node: IdNode):
+    key = node.id._key
+    lo = 0
+    hi = len(children)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if children[mid].id._key < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    children.insert(lo, node)
+
+
+# Folgezettel hierarchy of a set of ids. Every node stores its parent, its children in Id.compare order, its depth and
+# the size of its subtree once, so ancestry queries only follow pointers instead of calling Id.parent() over and over.
+class IdTree:
+    def __init__(self, ids: Iterable[Id] = ()):
+        self._nodes: dict[str, IdNode] = {}
+        self.roots: list[IdNode] = []
+        for i in ids:
+            self.add(i)
+
+    def add(self, i: Id) -> IdNode:
+        node = self._nodes.get(i._key)
+        if node is None:
+            node = self._create(i)
+        if not node.present:
+            node.present = True
+            n = node
+            while n is not None:
+                n.size += 1
+                n = n.parent
+        return node
+
+    def remove(self, i: Id):
+        node = self._nodes.get(i._key)
+        if node is None or not node.present:
+            raise KeyError(i)
+        node.present = False
+        n = node
+        while n is not None:
+            n.size -= 1
+            n = n.parent
+        # Drop nodes that no longer lead to any present id.
+        while node is not None and node.size == 0:
+            siblings = self.roots if node.parent is None else node.parent.children
+            siblings.remove(node)
+            del self._nodes[node.id._key]
+            node = node.parent
+
+    def node(self, i: Id) -> IdNode:
+        return self._nodes[i._key]
+
+    def ancestors(self, i: Id) -> list[IdNode]:
+        return self.node(i).ancestors()
+
+    def lowest_common_ancestor(self, a: Id, b: Id) -> Optional[IdNode]:
+        left = self.node(a)
+        right = self.node(b)
+        while left.depth > right.depth:
+            left = left.parent
+        while right.depth > left.depth:
+            right = right.parent
+        while left is not right:
+            if left is None or right is None:
+                return None
+            left = left.parent
+            right = right.parent
+        return left
+
+    def subtree_size(self, i: Id) -> int:
+        node = self._nodes.get(i._key)
+        if node is None:
+            return 0
+        return node.size
+
+    def _create(self, i: Id) -> IdNode:
+        # Walk up until an existing node or a root is found, then create the missing nodes top down.
+        missing = [i]
+        parent = None
+        while missing[-1].has_parent:
+            p = missing[-1].parent()
+            parent = self._nodes.get(p._key)
+            if parent is not None:
+                break
+            missing.append(p)
+        node = None
+        for m in reversed(missing):
+            if m.is_structure:
+                depth = 0
+            else:
+                depth = len(m.parts) - 1
+            node = IdNode(m, parent, depth)
+            self._nodes[m._key] = node
+            if parent is None:
+                _insert_child(self.roots, node)
+            else:
+                _insert_child(parent.children, node)
+            parent = node
+        return node
+
+    def __contains__(self, i: Id):
+        node = self._nodes.get(i._key)
+        return node is not None and node.present
+
+    def __len__(self):
+        return sum(root.size for root in self.roots)
+
+    def __iter__(self) -> Iterator[IdNode]:
+        # Depth first in Id.compare order, present nodes only.
+        stack = list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            if node.present:
+                yield node
+            stack.extend(reversed(node.children))
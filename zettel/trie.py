@@ -0,0 +1,219 @@
+from __future__ import annotations
+import marshal
+from array import array
+from bisect import bisect_left, insort
+from typing import Iterable, Iterator, Optional
+
+from zettel.id import Id, IdScheme, _STRUCTURE_KEY_PREFIX, default_scheme
+
+# Bump whenever the layout written by IdTrie.dumps changes.
+FORMAT_VERSION = 1
+
+
+def _part_keys(key: str) -> Iterator[str]:
+    # The sort key of an Id is the concatenation of the keys of its parts, each starting with the length of the part,
+    # so the parts can be cut out of it without splitting the value again. A structure id is a single part.
+    if key.startswith(_STRUCTURE_KEY_PREFIX):
+        yield key
+        return
+    pos = 0
+    while pos < len(key):
+        end = pos + 1 + ord(key[pos])
+        yield key[pos:end]
+        pos = end
+
+
+class _Node:
+    __slots__ = ('children', 'order', 'id', 'size', 'height')
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        # Keys of children in Id.compare order.
+        self.order: list[str] = []
+        # The Id stored at this node, None if it only leads to deeper ids.
+        self.id: Optional[Id] = None
+        # Number of ids in the subtree rooted at this node, including its own.
+        self.size = 0
+        # How many levels below this node its deepest id is, -1 if there is none.
+        self.height = -1
+
+    def _update_height(self):
+        height = -1 if self.id is None else 0
+        for child in self.children.values():
+            if child.height >= height:
+                height = child.height + 1
+        self.height = height
+
+
+# Ids stored by their parts, one trie level per part. A child is keyed by the sort key of its part (see
+# IdPart.sort_key), which is the same whatever separators were used, so 21/3a and 21.3a end up at the same node.
+# Every node knows the size and height of its subtree, so subtree queries only visit the nodes they return.
+class IdTrie:
+    def __init__(self, ids: Iterable[Id] = ()):
+        self._root = _Node()
+        for i in ids:
+            self.add(i)
+
+    def add(self, i: Id) -> bool:
+        path = [self._root]
+        node = self._root
+        for part in _part_keys(i._key):
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+                insort(node.order, part)
+            node = child
+            path.append(node)
+        if node.id is not None:
+            return False
+        node.id = i
+        for height, n in enumerate(reversed(path)):
+            n.size += 1
+            if n.height < height:
+                n.height = height
+        return True
+
+    def remove(self, i: Id):
+        path = self._path(i)
+        if path is None or path[-1].id is None:
+            raise KeyError(i)
+        path[-1].id = None
+        parts = list(_part_keys(i._key))
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            node.size -= 1
+            if node.size == 0 and depth > 0:
+                parent = path[depth - 1]
+                del parent.children[parts[depth - 1]]
+                del parent.order[bisect_left(parent.order, parts[depth - 1])]
+            else:
+                node._update_height()
+
+    def _path(self, i: Id) -> Optional[list[_Node]]:
+        path = [self._root]
+        node = self._root
+        for part in _part_keys(i._key):
+            node = node.children.get(part)
+            if node is None:
+                return None
+            path.append(node)
+        return path
+
+    def _node(self, i: Id) -> Optional[_Node]:
+        node = self._root
+        for part in _part_keys(i._key):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def get(self, i: Id) -> Optional[Id]:
+        node = self._node(i)
+        if node is None:
+            return None
+        return node.id
+
+    def count(self, i: Id) -> int:
+        # Number of stored ids at or below i, whether or not i itself is stored.
+        node = self._node(i)
+        if node is None:
+            return 0
+        return node.size
+
+    def subtree(self, i: Id) -> Iterator[Id]:
+        # The stored ids at or below i, in Id.compare order.
+        node = self._node(i)
+        if node is not None:
+            yield from _walk(node)
+
+    def deepest(self, i: Id) -> Optional[Id]:
+        # The stored id at or below i with the most parts, the first one in Id.compare order if there are several.
+        node = self._node(i)
+        if node is None:
+            return None
+        while node.height > 0:
+            for part in node.order:
+                child = node.children[part]
+                if child.height == node.height - 1:
+                    node = child
+                    break
+        return node.id
+
+    def dumps(self) -> bytes:
+        # The trie in preorder: the depth of every node, its part key and the value of its Id (None for nodes that
+        # only lead to deeper ids). Shared ancestors are written once, and loads() rebuilds the Ids from the part
+        # keys without parsing anything.
+        depths = array('H')
+        parts: list[str] = []
+        values: list[Optional[str]] = []
+        stack = [(0, part, self._root.children[part]) for part in reversed(self._root.order)]
+        while stack:
+            depth, part, node = stack.pop()
+            depths.append(depth)
+            parts.append(part)
+            values.append(None if node.id is None else node.id.value)
+            stack.extend((depth + 1, p, node.children[p]) for p in reversed(node.order))
+        scheme = default_scheme() if self._root.size == 0 else next(iter(self)).scheme
+        return marshal.dumps((FORMAT_VERSION, ''.join(sorted(scheme.separators)), depths.tobytes(), parts, values))
+
+    @staticmethod
+    def loads(data: bytes, scheme: Optional[IdScheme] = None) -> IdTrie:
+        if scheme is None:
+            scheme = default_scheme()
+        version, separators, depth_bytes, parts, values = marshal.loads(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Cannot load an IdTrie written in format {version}")
+        if separators != ''.join(sorted(scheme.separators)):
+            raise ValueError(f"Cannot load an IdTrie written with separators {separators!r} into {scheme}")
+        depths = array('H')
+        depths.frombytes(depth_bytes)
+        trie = IdTrie()
+        path = [trie._root]
+        keys = ['']
+        for depth, part, value in zip(depths, parts, values):
+            del path[depth + 1:]
+            del keys[depth + 1:]
+            node = _Node()
+            parent = path[-1]
+            parent.children[part] = node
+            # Written in order, so appending keeps order sorted.
+            parent.order.append(part)
+            key = keys[-1] + part
+            if value is not None:
+                node.id = Id._build(value, scheme, part.startswith(_STRUCTURE_KEY_PREFIX), None, key)
+            path.append(node)
+            keys.append(key)
+        _count(trie._root)
+        return trie
+
+    def __contains__(self, i: Id):
+        node = self._node(i)
+        return node is not None and node.id is not None
+
+    def __len__(self):
+        return self._root.size
+
+    def __iter__(self) -> Iterator[Id]:
+        return _walk(self._root)
+
+
+def _walk(node: _Node) -> Iterator[Id]:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.id is not None:
+            yield node.id
+        children = node.children
+        stack.extend(children[part] for part in reversed(node.order))
+
+
+def _count(root: _Node):
+    # Fills in size and height bottom up, children before their parents.
+    order = [root]
+    for node in order:
+        order.extend(node.children.values())
+    for node in reversed(order):
+        node.size = 0 if node.id is None else 1
+        node._update_height()
+        for child in node.children.values():
+            node.size += child.size
@@ -0,0 +1,467 @@
+from __future__ import annotations
+import ctypes
+import errno
+import os
+import select
+import struct
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Iterable, Iterator, Optional
+
+from zettel.id import Id, IdScheme, default_scheme
+from zettel.scan import NOTE_EXTENSIONS, _visit, note_stem
+
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+# Ids only come from file names, so only events that add or remove names matter.
+_WATCH_MASK = _IN_CREATE | _IN_DELETE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+_EVENT = struct.Struct('iIII')
+
+
+# Entries per chunk of a snapshot. A new snapshot shares every chunk a batch leaves alone with the snapshot before it,
+# so publishing a batch copies the chunks it touches and one list with a reference per chunk, not every note.
+_CHUNK = 512
+
+
+# Sorted items ((sort key, path) pairs or paths), cut into chunks of about _CHUNK. first[k] is the first item of
+# chunks[k].
+class _SortedChunks:
+    __slots__ = ('chunks', 'first', 'size')
+
+    def __init__(self, items: list):
+        self.chunks = [items[k:k + _CHUNK] for k in range(0, len(items), _CHUNK)]
+        self.first = [chunk[0] for chunk in self.chunks]
+        self.size = len(items)
+
+    def updated(self, added: list, removed: list) -> _SortedChunks:
+        chunks = list(self.chunks)
+        first = list(self.first)
+        copied = set()
+
+        def chunk_for(item) -> list:
+            # first is not updated until the end, but removing a first item or adding one before it leaves every
+            # chunk between the same bounds, so bisecting the old first pairs still finds the right chunk.
+            k = max(bisect_right(first, item) - 1, 0)
+            if k not in copied:
+                chunks[k] = list(chunks[k])
+                copied.add(k)
+            return chunks[k]
+        for item in removed:
+            chunk = chunk_for(item)
+            del chunk[bisect_left(chunk, item)]
+        if added and not chunks:
+            chunks.append([])
+            first.append(added[0])
+        for item in added:
+            insort(chunk_for(item), item)
+        for k in sorted(copied, reverse=True):
+            chunk = chunks[k]
+            if not chunk:
+                del chunks[k]
+                del first[k]
+            elif len(chunk) > 2 * _CHUNK:
+                pieces = [chunk[j:j + _CHUNK] for j in range(0, len(chunk), _CHUNK)]
+                chunks[k:k + 1] = pieces
+                first[k:k + 1] = [piece[0] for piece in pieces]
+            else:
+                first[k] = chunk[0]
+        result = object.__new__(_SortedChunks)
+        result.chunks = chunks
+        result.first = first
+        result.size = self.size + len(added) - len(removed)
+        return result
+
+    def from_item(self, item) -> Iterator:
+        # The items from the first one that is not less than item on, in order.
+        k = max(bisect_left(self.first, item) - 1, 0)
+        for chunk in self.chunks[k:]:
+            yield from chunk[bisect_left(chunk, item):]
+
+    def __iter__(self) -> Iterator:
+        for chunk in self.chunks:
+            yield from chunk
+
+
+# path -> Id, spread over a power of two of dicts by the hash of the path, with about _CHUNK paths in each, so that a
+# new map only copies the dicts of the paths that changed.
+class _PathMap:
+    __slots__ = ('buckets', 'size')
+
+    def __init__(self, ids: dict[str, Id]):
+        count = 1
+        while count * _CHUNK < len(ids):
+            count *= 2
+        self.buckets: list[dict[str, Id]] = [{} for _ in range(count)]
+        for path, i in ids.items():
+            self.buckets[hash(path) & (count - 1)][path] = i
+        self.size = len(ids)
+
+    def updated(self, added: dict[str, Id], removed: set[str]) -> _PathMap:
+        size = self.size + len(added) - len(removed)
+        if size > 2 * _CHUNK * len(self.buckets):
+            # Twice as many buckets, which happens after the vault doubled, so it costs the same per note as a dict.
+            ids = {path: i for path, i in self.items() if path not in removed}
+            ids.update(added)
+            return _PathMap(ids)
+        buckets = list(self.buckets)
+        mask = len(buckets) - 1
+        copied = set()
+        for path in removed:
+            k = hash(path) & mask
+            if k not in copied:
+                buckets[k] = dict(buckets[k])
+                copied.add(k)
+            del buckets[k][path]
+        for path, i in added.items():
+            k = hash(path) & mask
+            if k not in copied:
+                buckets[k] = dict(buckets[k])
+                copied.add(k)
+            buckets[k][path] = i
+        result = object.__new__(_PathMap)
+        result.buckets = buckets
+        result.size = size
+        return result
+
+    def get(self, path: str) -> Optional[Id]:
+        return self.buckets[hash(path) & (len(self.buckets) - 1)].get(path)
+
+    def items(self) -> Iterator[tuple[str, Id]]:
+        for bucket in self.buckets:
+            yield from bucket.items()
+
+    def __contains__(self, path: str):
+        return path in self.buckets[hash(path) & (len(self.buckets) - 1)]
+
+    def __iter__(self) -> Iterator[str]:
+        for bucket in self.buckets:
+            yield from bucket
+
+    def __getitem__(self, path: str) -> Id:
+        return self.buckets[hash(path) & (len(self.buckets) - 1)][path]
+
+
+# The notes of a vault at one point in time. A snapshot never changes after it is made, so it can be read from any
+# thread without locking, and a watcher replaces it with a new one instead of modifying it. The new one shares what did
+# not change with the old one (see _CHUNK), so a batch costs about as much as the notes it touches.
+class VaultSnapshot:
+    __slots__ = ('version', '_ids', '_order', '_paths')
+
+    def __init__(self, version: int, ids: dict[str, Id], order: list[tuple[str, str]]):
+        self.version = version
+        # path -> Id, (sort key, path) for every note in Id.compare order, and the paths in order, which puts the
+        # notes under a directory next to each other.
+        self._ids = _PathMap(ids)
+        self._order = _SortedChunks(order)
+        self._paths = _SortedChunks(sorted(ids))
+
+    def _updated(self, added: dict[str, Id], removed: set[str]) -> VaultSnapshot:
+        ids = self._ids
+        snapshot = object.__new__(VaultSnapshot)
+        snapshot.version = self.version + 1
+        snapshot._order = self._order.updated(sorted((i._key, path) for path, i in added.items()),
+                                              sorted((ids[path]._key, path) for path in removed))
+        snapshot._paths = self._paths.updated(sorted(added), sorted(removed))
+        snapshot._ids = ids.updated(added, removed)
+        return snapshot
+
+    def _under(self, directory: str) -> Iterator[str]:
+        # The paths of the notes anywhere under directory.
+        prefix = directory + os.sep
+        for path in self._paths.from_item(prefix):
+            if not path.startswith(prefix):
+                break
+            yield path
+
+    def get(self, path: str) -> Optional[Id]:
+        return self._ids.get(path)
+
+    def paths(self, i: Id) -> list[str]:
+        key = i._key
+        found = []
+        for item_key, path in self._order.from_item((key, '')):
+            if item_key != key:
+                break
+            found.append(path)
+        return found
+
+    def __contains__(self, i: Id):
+        for key, _ in self._order.from_item((i._key, '')):
+            return key == i._key
+        return False
+
+    def __len__(self):
+        return self._order.size
+
+    def __iter__(self) -> Iterator[tuple[Id, str]]:
+        ids = self._ids
+        for _, path in self._order:
+            yield ids[path], path
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self.fd = fd
+        self._directories: dict[int, str] = {}
+
+    def watch(self, directory: str):
+        wd = self._add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            e = ctypes.get_errno()
+            # Gone again before it could be watched, its removal is reported by its parent.
+            if e in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(e, os.strerror(e), directory)
+        self._directories[wd] = directory
+
+    def read(self, timeout: float) -> Optional[list[tuple[str, int]]]:
+        # (path, mask) of the events that arrive within timeout. None means events were lost and the whole vault has
+        # to be listed again.
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+            pos += length
+            if mask & _IN_Q_OVERFLOW:
+                return None
+            directory = self._directories.get(wd)
+            if mask & _IN_IGNORED:
+                self._directories.pop(wd, None)
+                continue
+            if directory is None or not name:
+                continue
+            events.append((os.path.join(directory, name), mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def inotify_available() -> bool:
+    try:
+        _Inotify().close()
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+# Keeps the notes of a vault in memory and up to date while it runs. Changes are picked up with inotify where it is
+# available, and by listing the vault every poll_interval seconds otherwise. Changes that arrive close together are
+# applied together: after the first one, the watcher waits until nothing happened for debounce seconds (but no
+# longer than max_delay) and then publishes one new snapshot for the whole burst.
+#
+# Notes whose names are not ids are left out, and a batch of events that cannot be applied is caught up by listing the
+# vault again. Anything else stops the watcher: the exception is kept in error, passed to on_error and raised (as the
+# cause of a RuntimeError) by wait.
+class VaultWatcher:
+    def __init__(self, vault: str, recursive: bool = True, extensions: Iterable[str] = NOTE_EXTENSIONS,
+                 scheme: Optional[IdScheme] = None, backend: Optional[str] = None, debounce: float = 0.05,
+                 max_delay: float = 1.0, poll_interval: float = 1.0,
+                 callback: Optional[Callable[[VaultSnapshot], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None):
+        if backend is None:
+            backend = 'inotify' if inotify_available() else 'poll'
+        if backend not in ('inotify', 'poll'):
+            raise ValueError(f"Unknown watcher backend {backend!r}")
+        if scheme is None:
+            scheme = default_scheme()
+        self.vault = vault
+        self.recursive = recursive
+        self.extensions = tuple(extensions)
+        self.scheme = scheme
+        self.backend = backend
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._callback = callback
+        self._on_error = on_error
+        self.error: Optional[BaseException] = None
+        self._inotify: Optional[_Inotify] = None
+        self._stop = threading.Event()
+        self._published = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.snapshot = VaultSnapshot(0, {}, [])
+
+    def start(self) -> VaultWatcher:
+        # Lists the vault once, then keeps watching it on a background thread.
+        if self.backend == 'inotify':
+            self._inotify = _Inotify()
+        self._publish(self._list(self.vault), set())
+        self._thread = threading.Thread(target=self._run, name=f"VaultWatcher({self.vault})", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> VaultWatcher:
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> VaultSnapshot:
+        # Blocks until there is a snapshot newer than version, or timeout passes, and returns the latest snapshot.
+        with self._published:
+            self._published.wait_for(lambda: self.snapshot.version > version or self.error is not None, timeout)
+            if self.error is not None:
+                raise RuntimeError(f"Watching {self.vault} stopped") from self.error
+            return self.snapshot
+
+    def _run(self):
+        try:
+            self._watch()
+        except BaseException as e:
+            with self._published:
+                self.error = e
+                self._published.notify_all()
+            if self._on_error is not None:
+                self._on_error(e)
+
+    def _watch(self):
+        while not self._stop.is_set():
+            if self._inotify is None:
+                if self._stop.wait(self.poll_interval):
+                    return
+                self._rescan()
+                continue
+            events = self._inotify.read(0.1)
+            if events == []:
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while events is not None:
+                more = self._inotify.read(min(self.debounce, max(0.0, deadline - time.monotonic())))
+                if more == []:
+                    break
+                if more is None:
+                    events = None
+                else:
+                    events.extend(more)
+            if events is None:
+                self._rescan()
+                continue
+            try:
+                added, removed = self._changes(events)
+            except Exception:
+                # Say a directory that could not be listed halfway through: listing the whole vault catches up.
+                self._rescan()
+                continue
+            if added or removed:
+                self._publish(added, removed)
+
+    def _parse(self, stem: str) -> Optional[Id]:
+        # The id of a note, or None if its name is not an id of the scheme. Such notes are left out.
+        try:
+            return Id.from_filename(stem, self.scheme)
+        except ValueError:
+            return None
+
+    def _list(self, directory: str) -> dict[str, Id]:
+        # All notes under directory, watching every directory on the way when inotify is used. Notes the snapshot
+        # already has keep their Id, since the path, and with it the file name, is the same.
+        known = self.snapshot._ids
+        found = {}
+        directories = [directory]
+        while directories:
+            d = directories.pop()
+            if self._inotify is not None:
+                self._inotify.watch(d)
+            try:
+                entries = list(_visit(d, self.recursive, self.extensions))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for is_dir, entry in entries:
+                if is_dir:
+                    directories.append(entry.path)
+                else:
+                    i = known.get(entry.path)
+                    if i is None:
+                        i = self._parse(note_stem(entry.name, self.extensions))
+                    if i is not None:
+                        found[entry.path] = i
+        return found
+
+    def _rescan(self):
+        found = self._list(self.vault)
+        current = self.snapshot._ids
+        removed = {path for path in current if path not in found}
+        added = {path: i for path, i in found.items() if path not in current}
+        if added or removed:
+            self._publish(added, removed)
+
+    def _changes(self, events: list[tuple[str, int]]) -> tuple[dict[str, Id], set[str]]:
+        # The notes added and removed by events. Only the final state of every path matters, so a file that was created and deleted in the same burst is
+        # looked at once and ignored.
+        paths = {}
+        for path, mask in events:
+            paths[path] = mask
+        snapshot = self.snapshot
+        current = snapshot._ids
+        added: dict[str, Id] = {}
+        removed: set[str] = set()
+        for path, mask in paths.items():
+            name = os.path.basename(path)
+            if name.startswith('.'):
+                continue
+            if mask & _IN_ISDIR:
+                if not self.recursive:
+                    continue
+                removed.update(snapshot._under(path))
+                if os.path.isdir(path):
+                    added.update(self._list(path))
+                continue
+            stem = note_stem(name, self.extensions)
+            if stem is None:
+                continue
+            if os.path.isfile(path):
+                if path not in current:
+                    i = self._parse(stem)
+                    if i is not None:
+                        added[path] = i
+            elif path in current:
+                removed.add(path)
+        # A directory that was moved away and back keeps its notes.
+        removed.difference_update(p for p in added if p in current)
+        added = {p: i for p, i in added.items() if p not in current}
+        return added, removed
+
+    def _publish(self, added: dict[str, Id], removed: set[str]):
+        snapshot = self.snapshot._updated(added, removed)
+        with self._published:
+            self.snapshot = snapshot
+            self._published.notify_all()
+        if self._callback is not None:
+            self._callback(snapshot)